@@ -2,14 +2,28 @@
 AI обработчик для работы с OpenAI
 """
 import random
+import asyncio
+from collections import OrderedDict
 from typing import List, Dict, Optional
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
+
+from bot.services.async_cache import SingleFlight, make_key
 
 
 class AIHandler:
     """Обработчик AI запросов"""
     
-    def __init__(self, api_key: str, model_mini: str, model_full: str, gpt4o_probability: float):
+    # Сколько расшифровок голосовых хранить в памяти
+    TRANSCRIPT_CACHE_SIZE = 1000
+    
+    def __init__(
+        self,
+        api_key: str,
+        model_mini: str,
+        model_full: str,
+        gpt4o_probability: float,
+        audio_preprocessor=None
+    ):
         """
         Инициализация AI обработчика
         
@@ -18,11 +32,17 @@ class AIHandler:
             model_mini: Модель GPT-4o-mini
             model_full: Модель GPT-4o
             gpt4o_probability: Вероятность использования GPT-4o (0.0-1.0)
+            audio_preprocessor: AudioPreprocessor для голосовых (опционально)
         """
         self.client = OpenAI(api_key=api_key)
+        self.async_client = AsyncOpenAI(api_key=api_key)
         self.model_mini = model_mini
         self.model_full = model_full
         self.gpt4o_probability = gpt4o_probability
+        self.audio_preprocessor = audio_preprocessor
+        self._transcripts: OrderedDict = OrderedDict()
+        # Одинаковые одновременные запросы ждут одну генерацию
+        self.flight = SingleFlight()
     
     def _select_model(self, user_message: str) -> str:
         """
@@ -60,7 +80,8 @@ class AIHandler:
         user_message: str,
         system_prompt: str,
         history: List[Dict] = None,
-        language: str = 'hy'
+        language: str = 'hy',
+        cache_key: Optional[str] = None
     ) -> tuple[str, str]:
         """
         Получить ответ от AI
@@ -70,30 +91,39 @@ class AIHandler:
             system_prompt: Системный промпт
             history: История сообщений
             language: Язык ответа
+            cache_key: Ключ кеша ответов - одновременные запросы с тем же ключом
+                получат один ответ (None - объединяются только полностью одинаковые промпты)
             
         Returns:
             Tuple (ответ, использованная модель)
         """
+        # Формирование сообщений
+        messages = [
+            {"role": "system", "content": system_prompt}
+        ]
+        
+        # Добавление истории
+        if history:
+            for msg in history:  # Использовать всю переданную историю
+                messages.append({"role": "user", "content": msg['user']})
+                messages.append({"role": "assistant", "content": msg['bot']})
+        
+        # Текущее сообщение
+        messages.append({"role": "user", "content": user_message})
+        
+        key = ('cache', cache_key) if cache_key is not None else ('prompt', make_key(messages))
+        if key in self.flight:
+            print("🔗 Ответ на такой же запрос уже генерируется - ждем его")
+        return await self.flight.do(key, lambda: self._generate(user_message, messages))
+    
+    async def _generate(self, user_message: str, messages: List[Dict]) -> tuple[str, str]:
+        """Один запрос к OpenAI (выполняется в single-flight)"""
         try:
             # Выбор модели
             model = self._select_model(user_message)
             
-            # Формирование сообщений
-            messages = [
-                {"role": "system", "content": system_prompt}
-            ]
-            
-            # Добавление истории
-            if history:
-                for msg in history:  # Использовать всю переданную историю
-                    messages.append({"role": "user", "content": msg['user']})
-                    messages.append({"role": "assistant", "content": msg['bot']})
-            
-            # Текущее сообщение
-            messages.append({"role": "user", "content": user_message})
-            
             # Запрос к OpenAI
-            response = self.client.chat.completions.create(
+            response = await self.async_client.chat.completions.create(
                 model=model,
                 messages=messages,
                 temperature=0.7,
@@ -110,26 +140,82 @@ class AIHandler:
             print(f"❌ Ошибка AI: {e}")
             return None, None
     
-    async def transcribe_audio(self, audio_file_path: str) -> Optional[str]:
+    def get_cached_transcript(self, cache_key: str) -> Optional[str]:
+        """
+        Расшифровка из кеша (ключ - file_unique_id из Telegram)
+        
+        Args:
+            cache_key: Ключ кеша
+            
+        Returns:
+            Текст или None
+        """
+        text = self._transcripts.get(cache_key)
+        if text is not None:
+            self._transcripts.move_to_end(cache_key)
+        return text
+    
+    async def transcribe_audio(
+        self,
+        audio: bytes,
+        filename: str = "voice.ogg",
+        language: Optional[str] = None,
+        cache_key: Optional[str] = None
+    ) -> Optional[str]:
         """
         Транскрибировать аудио в текст (Whisper)
         
         Args:
-            audio_file_path: Путь к аудио файлу
+            audio: Содержимое аудио файла
+            filename: Имя файла (по расширению Whisper определяет формат)
+            language: Подсказка языка (hy, ru, en) или None для автоопределения
+            cache_key: Ключ для кеша расшифровок (file_unique_id)
             
         Returns:
             Транскрибированный текст или None
         """
+        if cache_key:
+            cached = self.get_cached_transcript(cache_key)
+            if cached is not None:
+                return cached
+        
         try:
-            with open(audio_file_path, 'rb') as audio_file:
-                transcript = self.client.audio.transcriptions.create(
+            params = {}
+            if language in ('hy', 'ru', 'en'):
+                params['language'] = language
+            
+            # 16 кГц моно без тишины; длинные записи режутся по паузам
+            chunks = [audio]
+            if self.audio_preprocessor and self.audio_preprocessor.is_available:
+                try:
+                    chunks = await self.audio_preprocessor.prepare(audio)
+                    filename = "voice.ogg"
+                except Exception as e:
+                    print(f"⚠️ Предобработка аудио не удалась, отправляем оригинал: {e}")
+            
+            if not chunks:
+                print("ℹ️ В голосовом только тишина")
+                return None
+            
+            # Куски расшифровываются параллельно и склеиваются по порядку
+            transcripts = await asyncio.gather(*[
+                self.async_client.audio.transcriptions.create(
                     model="whisper-1",
-                    file=audio_file,
-                    language="hy"  # Армянский по умолчанию
+                    file=(f"{i}_{filename}", chunk),
+                    **params
                 )
+                for i, chunk in enumerate(chunks)
+            ])
+            text = " ".join(t.text.strip() for t in transcripts if t.text).strip()
+            
+            print(f"✅ Аудио транскрибировано: {text[:50]}...")
+            
+            if cache_key:
+                self._transcripts[cache_key] = text
+                if len(self._transcripts) > self.TRANSCRIPT_CACHE_SIZE:
+                    self._transcripts.popitem(last=False)
             
-            print(f"✅ Аудио транскрибировано: {transcript.text[:50]}...")
-            return transcript.text
+            return text
             
         except Exception as e:
             print(f"❌ Ошибка транскрипции: {e}")
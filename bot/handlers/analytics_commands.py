@@ -144,6 +144,74 @@ async def cache_stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE
 🗄️ Записей в кеше: {stats['cache_entries']}
 🎯 Всего попаданий: {stats['total_cache_hits']}
 📊 Среднее попаданий на запись: {stats['avg_hits_per_entry']}
+"""
+    
+    embeddings = context.bot_data.get('embeddings')
+    if embeddings:
+        emb = embeddings.get_stats()
+        histogram = ', '.join(f"{size}: {count}" for size, count in emb['batch_histogram'].items()) or '—'
+        message += f"""
+🧬 **Кеш эмбеддингов** ({emb['model']})
+
+✅ Попаданий: {emb['cache_hits']}
+❌ Промахов: {emb['cache_misses']}
+📈 Hit rate: {emb['hit_rate']}%
+🔗 Объединено запросов: {emb['coalesced']}
+📦 Батчей: {emb['batches']} (средний размер {emb['avg_batch_size']})
+📊 Размеры батчей: {histogram}
+🗄️ Векторов в кеше: {emb['cached_vectors']}
+"""
+    
+    media_cache = context.bot_data.get('media_cache')
+    if media_cache:
+        media = media_cache.get_stats()
+        message += f"""
+🖼 **Кеш медиа**
+
+✅ Попаданий: {media['hits']}
+❌ Промахов: {media['misses']}
+⬇️ Скачано из Telegram: {media['downloads']}
+🛠 Подготовлено для Instagram: {media['processed']}
+🗑 Вытеснено: {media['evictions']}
+💾 Файлов: {media['files']} ({media['size_mb']} / {media['max_mb']} MB)
+"""
+    
+    ai = context.bot_data.get('ai')
+    if ai:
+        from bot.services.async_cache import completion_flight
+        chat = ai.flight.get_stats()
+        services = completion_flight.get_stats()
+        message += f"""
+🔗 **Объединение одинаковых AI-запросов**
+
+💬 Чат: генераций {chat['calls']}, объединено {chat['coalesced']}
+🛠 Сервисы: генераций {services['calls']}, объединено {services['coalesced']}
+"""
+    
+    code_generator = context.bot_data.get('code_generator')
+    if code_generator:
+        code = code_generator.get_stats()
+        message += f"""
+🧑‍💻 **Кеш анализа файлов с кодом**
+
+✅ Попаданий: {code['hits']}
+❌ Промахов: {code['misses']}
+🔗 Объединено запросов: {code['coalesced']}
+🗄️ Файлов в кеше: {code['size']}
+"""
+    
+    web_search = context.bot_data.get('web_search')
+    if web_search and web_search.is_available:
+        search = web_search.get_stats()
+        message += f"""
+🔍 **Кеш поиска**
+
+✅ Попаданий: {search['hits']}
+❌ Промахов: {search['misses']}
+📈 Hit rate: {search['hit_rate']}%
+🔗 Объединено запросов: {search['coalesced']}
+🌐 Запросов к Tavily: {search['upstream_calls']}
+🗄️ Записей: {search['size']} / {search['maxsize']}
 """
     
     await update.message.reply_text(message, parse_mode='Markdown')
@@ -15,6 +15,10 @@ async def autonomy_on_command(update: Update, context: ContextTypes.DEFAULT_TYPE
         return
     db.set_setting(SETTING_KEY, "true")
     context.application.bot_data['autonomy_enabled'] = True
+    scheduler = context.bot_data.get('post_scheduler')
+    if scheduler:
+        # Просроченные за время паузы задачи уйдут сразу
+        scheduler.wake()
     await update.message.reply_text("✅ Автономный режим включен. Задачи будут выполняться фоново.")
 
 
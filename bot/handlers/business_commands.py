@@ -4,10 +4,11 @@
 from telegram import Update
 from telegram.ext import ContextTypes
 import os 
+import time
 
 
 async def youtube_analyze_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Команда /youtube - анализ видео"""
+    """Команда /youtube - анализ видео, нескольких видео или плейлиста"""
     analyst = context.bot_data.get('youtube_analyst')
     
     if not analyst:
@@ -18,23 +19,106 @@ async def youtube_analyze_command(update: Update, context: ContextTypes.DEFAULT_
         await update.message.reply_text(
             "🎥 **Анализ YouTube Видео**\n\n"
             "Использование: `/youtube <ссылка>`\n\n"
-            "Пример:\n`/youtube https://youtu.be/...`"
+            "Пример:\n`/youtube https://youtu.be/...`\n\n"
+            "Сравнительный отчет: несколько ссылок, плейлист или канал "
+            "(`/youtube https://www.youtube.com/playlist?list=...`).\n"
+            "Добавьте `excel`, чтобы получить таблицу."
         , parse_mode='Markdown')
         return
     
-    url = context.args[0]
+    want_excel = any(arg.lower() == 'excel' for arg in context.args)
+    urls = [arg for arg in context.args if arg.lower() != 'excel']
+    is_batch = len(urls) > 1 or any(analyst._get_playlist_id(url) for url in urls)
     
-    await update.message.reply_text("🍿 Смотрю видео... (Это может занять секунд 10-20)")
+    if not is_batch:
+        url = urls[0]
+        
+        await update.message.reply_text("🍿 Смотрю видео... (Это может занять секунд 10-20)")
+        
+        result = await analyst.get_video_summary(url)
+        
+        if result['success']:
+            await update.message.reply_text(
+                f"📺 **РЕЗУЛЬТАТ АНАЛИЗА:**\n\n"
+                f"{result['summary']}"
+            , parse_mode='Markdown')
+        else:
+            await update.message.reply_text(f"❌ Ошибка: {result['error']}")
+        return
     
-    result = await analyst.get_video_summary(url)
+    status_msg = await update.message.reply_text("🍿 Собираю список видео...")
+    lines = []
+    last_edit = 0.0
     
-    if result['success']:
-        await update.message.reply_text(
-            f"📺 **РЕЗУЛЬТАТ АНАЛИЗА:**\n\n"
-            f"{result['summary']}"
-        , parse_mode='Markdown')
-    else:
+    async def progress(done: int, total: int, video: dict):
+        nonlocal last_edit
+        mark = "✅" if video['success'] else "❌"
+        cached = " 💾" if video.get('cached') else ""
+        lines.append(f"{mark} {video['url']}{cached}")
+        # Telegram ограничивает частоту редактирования - не чаще раза в 2 секунды
+        if done < total and time.monotonic() - last_edit < 2:
+            return
+        last_edit = time.monotonic()
+        try:
+            await status_msg.edit_text(
+                f"🍿 Анализирую видео: {done}/{total}\n\n" + "\n".join(lines[-15:]),
+                disable_web_page_preview=True
+            )
+        except Exception:
+            pass
+    
+    result = await analyst.analyze_batch(urls, progress=progress)
+    
+    if not result['success']:
         await update.message.reply_text(f"❌ Ошибка: {result['error']}")
+        return
+    
+    videos = result['videos']
+    failed = [v for v in videos if not v['success']]
+    header = f"📺 СРАВНИТЕЛЬНЫЙ ОТЧЕТ ({len(videos) - len(failed)} из {len(videos)} видео)\n\n"
+    report = header + result['report']
+    if failed:
+        report += "\n\n⚠️ Не удалось проанализировать:\n" + "\n".join(
+            f"- {v['url']}: {v['error']}" for v in failed
+        )
+    
+    # Без Markdown: в ссылках бывают символы разметки
+    max_length = 4000
+    for i in range(0, len(report), max_length):
+        await update.message.reply_text(report[i:i + max_length], disable_web_page_preview=True)
+    
+    if want_excel:
+        reporter = context.bot_data.get('report_generator')
+        if not reporter:
+            await update.message.reply_text("⚠️ Генератор отчетов недоступен")
+            return
+        
+        rows = [
+            {
+                "Видео": v['url'],
+                "Статус": "OK" if v['success'] else f"Ошибка: {v['error']}",
+                "Длительность, мин": round(v.get('duration', 0) / 60, 1) if v['success'] else "",
+                "Фрагментов": v.get('chunks', "") if v['success'] else "",
+                # Лимит ячейки Excel - 32767 символов
+                "Саммари": (v.get('summary') or "")[:32000],
+            }
+            for v in videos
+        ]
+        rows.append({"Видео": "Сравнение", "Статус": "", "Длительность, мин": "", "Фрагментов": "", "Саммари": result['report'][:32000]})
+        
+        file_path = await reporter.create_excel(
+            f"youtube_report_{update.effective_user.id}", "YouTube", rows
+        )
+        if file_path and os.path.exists(file_path):
+            with open(file_path, 'rb') as f:
+                await update.message.reply_document(
+                    document=f,
+                    caption="📊 Отчет по видео",
+                    filename="youtube_report.xlsx"
+                )
+            os.remove(file_path)
+        else:
+            await update.message.reply_text("❌ Не удалось создать Excel файл.")
 
 
 async def excel_report_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -1,9 +1,15 @@
 """
 Команды AI разработчика (Этап 4)
 """
+from typing import Optional, Tuple
+import io
+import time
+
 from telegram import Update
 from telegram.ext import ContextTypes
 
+from bot.services.code_splitter import detect_language
+
 
 async def generate_code_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Команда /generate_code <язык> <описание>"""
@@ -35,34 +41,72 @@ async def generate_code_command(update: Update, context: ContextTypes.DEFAULT_TY
         await update.message.reply_text("❌ Не удалось сгенерировать код")
 
 
+async def _read_code(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Optional[Tuple[str, Optional[str]]]:
+    """
+    Код для команды: файл с подписью-командой, ответ на файл или ответ на текст
+    
+    Returns:
+        (код, имя файла или None) или None, если кода нет / файл не подходит
+    """
+    message = update.message
+    reply = message.reply_to_message
+    document = message.document or (reply.document if reply else None)
+    
+    if document:
+        max_kb = context.bot_data['config'].CODE_MAX_FILE_KB
+        if document.file_size and document.file_size > max_kb * 1024:
+            await message.reply_text(f"❌ Файл больше {max_kb} KB")
+            return None
+        file = await document.get_file()
+        data = bytes(await file.download_as_bytearray())
+        try:
+            return data.decode('utf-8'), document.file_name
+        except UnicodeDecodeError:
+            await message.reply_text("❌ Файл не похож на исходный код (не UTF-8 текст)")
+            return None
+    
+    if reply and reply.text:
+        return reply.text, None
+    return None
+
+
+async def _send_text(update: Update, text: str, max_length: int = 4000):
+    """Длинный текст без разметки - частями"""
+    for i in range(0, len(text), max_length):
+        await update.message.reply_text(text[i:i + max_length])
+
+
 async def analyze_code_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Команда /analyze_code - анализ кода из сообщения"""
+    """Команда /analyze_code - анализ кода из сообщения или файла"""
     code_gen = context.bot_data.get('code_generator')
     
     if not code_gen:
         await update.message.reply_text("❌ Генератор кода недоступен")
         return
     
-    # Проверяем есть ли ответ на сообщение с кодом
-    if not update.message.reply_to_message or not update.message.reply_to_message.text:
+    source = await _read_code(update, context)
+    if not source:
         await update.message.reply_text(
             "💻 Ответьте на сообщение с кодом командой /analyze_code\n\n"
-            "Или используйте: /analyze_code <язык>\n"
-            "И отправьте код следующим сообщением"
+            "Или отправьте файл с подписью /analyze_code [язык]\n"
+            "(или ответьте командой на сообщение с файлом)"
         )
         return
     
-    code = update.message.reply_to_message.text
-    language = context.args[0] if context.args else 'python'
+    code, filename = source
+    language = context.args[0] if context.args else detect_language(filename)
     
-    await update.message.reply_text("⏳ Анализирую код...")
+    await update.message.reply_text(f"⏳ Анализирую {filename or 'код'}...")
     
-    analysis = await code_gen.analyze_code(code, language)
+    analysis = await code_gen.analyze_file(code, language, filename or 'code')
     
     if analysis:
-        message = f"""📊 **Анализ кода:**
-
-⭐ Качество: {analysis.get('quality_score', 'N/A')}/10
+        message = "📊 **Анализ кода:**\n\n"
+        if analysis.get('chunks', 1) > 1:
+            message += f"📄 {filename or 'Код'}: {analysis['lines']} строк, {analysis['chunks']} фрагментов\n"
+            if analysis.get('failed_chunks'):
+                message += f"⚠️ Не удалось проанализировать фрагментов: {analysis['failed_chunks']}\n"
+        message += f"""⭐ Качество: {analysis.get('quality_score', 'N/A')}/10
 
 🐛 **Потенциальные баги:**
 """
@@ -81,7 +125,11 @@ async def analyze_code_command(update: Update, context: ContextTypes.DEFAULT_TYP
         for bp in analysis.get('best_practices', []):
             message += f"• {bp}\n"
         
-        await update.message.reply_text(message, parse_mode='Markdown')
+        if filename is None and len(message) <= 4000:
+            await update.message.reply_text(message, parse_mode='Markdown')
+        else:
+            # Отчет по файлу: без Markdown (в находках бывают символы разметки) и частями
+            await _send_text(update, message.replace('**', ''))
     else:
         await update.message.reply_text("❌ Не удалось проанализировать код")
 
@@ -122,57 +170,88 @@ async def fix_code_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 
 async def explain_code_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Команда /explain_code - объяснение кода"""
+    """Команда /explain_code - объяснение кода из сообщения или файла"""
     code_gen = context.bot_data.get('code_generator')
     
     if not code_gen:
         await update.message.reply_text("❌ Генератор кода недоступен")
         return
     
-    if not update.message.reply_to_message or not update.message.reply_to_message.text:
+    source = await _read_code(update, context)
+    if not source:
         await update.message.reply_text(
-            "💻 Ответьте на сообщение с кодом командой /explain_code"
+            "💻 Ответьте на сообщение с кодом командой /explain_code\n"
+            "Или отправьте файл с подписью /explain_code [язык]"
         )
         return
     
-    code = update.message.reply_to_message.text
-    language = context.args[0] if context.args else 'python'
+    code, filename = source
+    language = context.args[0] if context.args else detect_language(filename)
     
-    await update.message.reply_text("⏳ Объясняю код...")
+    await update.message.reply_text(f"⏳ Объясняю {filename or 'код'}...")
     
-    explanation = await code_gen.explain_code(code, language)
+    explanation = await code_gen.explain_file(code, language, filename or 'code')
     
     if explanation:
-        await update.message.reply_text(explanation)
+        await _send_text(update, explanation)
     else:
         await update.message.reply_text("❌ Не удалось объяснить код")
 
 
 async def refactor_code_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Команда /refactor_code - рефакторинг кода"""
+    """Команда /refactor_code - рефакторинг кода из сообщения или файла"""
     code_gen = context.bot_data.get('code_generator')
     
     if not code_gen:
         await update.message.reply_text("❌ Генератор кода недоступен")
         return
     
-    if not update.message.reply_to_message or not update.message.reply_to_message.text:
+    source = await _read_code(update, context)
+    if not source:
         await update.message.reply_text(
-            "💻 Ответьте на сообщение с кодом командой /refactor_code"
+            "💻 Ответьте на сообщение с кодом командой /refactor_code\n"
+            "Или отправьте файл с подписью /refactor_code [язык]"
         )
         return
     
-    code = update.message.reply_to_message.text
-    language = context.args[0] if context.args else 'python'
+    code, filename = source
+    language = context.args[0] if context.args else detect_language(filename)
     
-    await update.message.reply_text("⏳ Рефакторю код...")
+    await update.message.reply_text(f"⏳ Рефакторю {filename or 'код'}...")
     
-    refactored = await code_gen.refactor_code(code, language)
+    refactored = await code_gen.refactor_file(code, language, filename or 'code')
     
-    if refactored:
-        await update.message.reply_text(f"```{language}\n{refactored}\n```", parse_mode='Markdown')
-    else:
+    if not refactored:
         await update.message.reply_text("❌ Не удалось отрефакторить код")
+    elif filename or len(refactored) > 4000:
+        # Файл целиком в сообщение не помещается - отправляем файлом
+        await update.message.reply_document(
+            document=io.BytesIO(refactored.encode('utf-8')),
+            filename=f"refactored_{filename or 'code.txt'}",
+            caption="✅ Рефакторинг готов"
+        )
+    else:
+        await update.message.reply_text(f"```{language}\n{refactored}\n```", parse_mode='Markdown')
+
+
+# Подписи к файлам: Telegram не передает их в CommandHandler
+DOCUMENT_COMMANDS = {
+    'analyze_code': analyze_code_command,
+    'explain_code': explain_code_command,
+    'refactor_code': refactor_code_command,
+}
+
+
+async def code_document_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Файл с подписью /analyze_code, /explain_code или /refactor_code"""
+    parts = (update.message.caption or '').split()
+    if not parts:
+        return
+    command = parts[0].lstrip('/').split('@')[0]
+    handler = DOCUMENT_COMMANDS.get(command)
+    if handler:
+        context.args = parts[1:]
+        await handler(update, context)
 
 
 async def generate_tests_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -211,7 +290,24 @@ async def github_status_command(update: Update, context: ContextTypes.DEFAULT_TY
         return
     
     if github.is_configured():
-        message = """✅ **GitHub интеграция настроена**
+        user = await github.get_user_info()
+        limits = await github.get_rate_limit()
+        
+        account = f"@{user['username']}" if user['success'] else f"❌ {user['error']}"
+        if limits['success'] and limits.get('limit'):
+            reset = time.strftime('%H:%M', time.localtime(limits['reset']))
+            cache = limits['cache']
+            rate_block = (
+                f"📉 Лимит API: {limits['remaining']}/{limits['limit']} (сброс в {reset})\n"
+                f"♻️ Ответов 304 из кеша: {cache['not_modified']} из {cache['requests']} запросов"
+            )
+        else:
+            rate_block = "📉 Лимит API: нет данных"
+        
+        message = f"""✅ **GitHub интеграция настроена**
+
+👤 Аккаунт: {account}
+{rate_block}
 
 Доступные функции:
 • Создание репозиториев
@@ -177,8 +177,8 @@ async def social_status_command(update: Update, context: ContextTypes.DEFAULT_TY
             "⚠️ **Нет доступных платформ**\n\n"
             "Добавьте API ключи в переменные окружения:\n"
             "- INSTAGRAM_USERNAME, INSTAGRAM_PASSWORD\n"
-            "- YOUTUBE_API_KEY\n"
-            "- TIKTOK_SESSION_ID\n"
+            "- YOUTUBE_ACCESS_TOKEN\n"
+            "- TIKTOK_ACCESS_TOKEN\n"
             "- FACEBOOK_ACCESS_TOKEN"
         )
     
@@ -198,37 +198,41 @@ async def generate_video_command(update: Update, context: ContextTypes.DEFAULT_T
     images = []
     # Берём фото из текущего сообщения или из ответа на фото
     if msg.photo:
-        images.append((msg.photo[-1].file_id, msg.caption or ""))
+        images.append((msg.photo[-1], msg.caption or ""))
     elif msg.reply_to_message and msg.reply_to_message.photo:
-        images.append((msg.reply_to_message.photo[-1].file_id, msg.reply_to_message.caption or ""))
+        images.append((msg.reply_to_message.photo[-1], msg.reply_to_message.caption or ""))
 
     if not images:
         await msg.reply_text("Пришлите фото (или ответьте на фото) и затем вызовите /generate_video.")
         return
 
     import tempfile, os
+    from contextlib import AsyncExitStack
     tempdir = tempfile.mkdtemp(prefix="botsi_vid_")
-    image_paths = []
-    captions = []
-
-    for file_id, cap in images:
-        file = await context.bot.get_file(file_id)
-        local_path = os.path.join(tempdir, f"photo_{file_id}.jpg")
-        await file.download_to_drive(local_path)
-        image_paths.append(local_path)
-        captions.append(cap)
-
-    output_path = os.path.join(tempdir, "video.mp4")
-
-    try:
-        result_path = video_gen.generate_slideshow(
-            image_paths=image_paths,
-            captions=captions,
-            duration_per_image=3.0,
-            output_path=output_path,
-            fps=30,
-        )
-        with open(result_path, "rb") as f:
-            await msg.reply_video(video=f, caption="Готово: видео создано")
-    except Exception as e:
-        await msg.reply_text(f"Не удалось создать видео: {e}")
+    media_cache = bot_data['media_cache']
+
+    async with AsyncExitStack() as stack:
+        # Исходники берем из кеша медиа: повторно присланные фото не скачиваются
+        image_paths = []
+        captions = []
+        for photo, cap in images:
+            path = await stack.enter_async_context(
+                media_cache.use(media_cache.get_original(context.bot, photo.file_id, photo.file_unique_id))
+            )
+            image_paths.append(path)
+            captions.append(cap)
+
+        output_path = os.path.join(tempdir, "video.mp4")
+
+        try:
+            result_path = video_gen.generate_slideshow(
+                image_paths=image_paths,
+                captions=captions,
+                duration_per_image=3.0,
+                output_path=output_path,
+                fps=30,
+            )
+            with open(result_path, "rb") as f:
+                await msg.reply_video(video=f, caption="Готово: видео создано")
+        except Exception as e:
+            await msg.reply_text(f"Не удалось создать видео: {e}")
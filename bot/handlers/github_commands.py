@@ -1,6 +1,8 @@
 """
 Команды для управления GitHub проектами
 """
+import time
+
 from telegram import Update
 from telegram.ext import ContextTypes
 
@@ -118,12 +120,18 @@ async def github_info_command(update: Update, context: ContextTypes.DEFAULT_TYPE
     
     if not context.args:
         await update.message.reply_text(
-            "💡 Использование: /github_info <username/repo>"
+            "💡 Использование: /github_info <username/repo>\n\n"
+            "Глубокий анализ всех исходников:\n"
+            "/github_info <username/repo> deep [ветка]"
         )
         return
     
     repo_name = context.args[0]
     
+    if len(context.args) > 1 and context.args[1].lower() in ('deep', '--deep'):
+        await _deep_analysis(update, context, repo_name, context.args[2] if len(context.args) > 2 else None)
+        return
+    
     await update.message.reply_text(f"📊 Загружаю информацию о {repo_name}...")
     
     result = await github.get_repository_info(repo_name)
@@ -142,3 +150,36 @@ async def github_info_command(update: Update, context: ContextTypes.DEFAULT_TYPE
         await update.message.reply_text(response, parse_mode='Markdown')
     else:
         await update.message.reply_text(f"❌ {result['error']}")
+
+
+async def _deep_analysis(update: Update, context: ContextTypes.DEFAULT_TYPE, repo_name: str, ref):
+    """Анализ всех исходников репозитория (неизменившиеся файлы - из кеша)"""
+    analyzer = context.bot_data.get('repo_analyzer')
+    
+    if not analyzer:
+        await update.message.reply_text("⚠️ Анализатор репозиториев не инициализирован")
+        return
+    
+    status_msg = await update.message.reply_text(f"🔬 Скачиваю {repo_name} и анализирую исходники...")
+    last_edit = 0.0
+    
+    async def progress(done: int, total: int):
+        nonlocal last_edit
+        # Telegram ограничивает частоту редактирования - не чаще раза в 2 секунды
+        if time.monotonic() - last_edit < 2:
+            return
+        last_edit = time.monotonic()
+        try:
+            await status_msg.edit_text(f"🔬 Анализирую {repo_name}...\n📄 Файлов: {done}/{total}")
+        except Exception:
+            pass
+    
+    result = await analyzer.analyze_repository(repo_name, ref=ref, progress=progress)
+    
+    if result['success']:
+        report = f"🔬 ГЛУБОКИЙ АНАЛИЗ РЕПОЗИТОРИЯ\n\n{result['report']}"
+        max_length = 4000
+        for i in range(0, len(report), max_length):
+            await update.message.reply_text(report[i:i + max_length], disable_web_page_preview=True)
+    else:
+        await update.message.reply_text(f"❌ Ошибка анализа: {result['error']}")
@@ -1,12 +1,22 @@
 """
 Обработчики сообщений
 """
-import os
 from telegram import Update
 from telegram.ext import ContextTypes
 
 from bot.language import LanguageDetector, TranslitConverter
 from bot.prompts import get_system_prompt, ModeDetector
+from bot.services.instagram_sync import InstagramSyncService
+
+
+async def _load_instagram_posts(context: ContextTypes.DEFAULT_TYPE, smm) -> dict:
+    """Посты для анализа: локальное хранилище (сотни постов) или живой запрос"""
+    instagram_sync = context.bot_data.get('instagram_sync')
+    if instagram_sync:
+        return await instagram_sync.get_posts()
+    result = await smm.get_my_posts(limit=5)
+    result['source'] = 'live'
+    return result
 
 
 async def handle_text_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -161,24 +171,21 @@ async def handle_text_message(update: Update, context: ContextTypes.DEFAULT_TYPE
     if is_analyze_request and is_instagram_mentioned and (is_my_account or "?" in user_message):
         smm = context.bot_data.get('social_media_real')
         if smm and smm.instagram_available:
-            status_msg = await update.message.reply_text(f"📊 Сканирую последние 5 постов аккаунта @{smm.my_username}...")
+            status_msg = await update.message.reply_text(f"📊 Собираю данные аккаунта @{smm.my_username}...")
             
-            result = await smm.get_my_posts(limit=5)
+            result = await _load_instagram_posts(context, smm)
             
             if result['success']:
-                posts_text = "\n---\n".join([
-                    f"Post {i+1} [{p['type']}]: ❤️ {p['likes']} likes, 💬 {p['comments']} comments.\nТекст: {p['caption'][:200]}..." 
-                    for i, p in enumerate(result['posts'])
-                ])
+                posts_text = InstagramSyncService.format_for_analysis(result)
                 
                 # Подменяем сообщение пользователя для GPT
                 # GPT увидит реальные данные и даст анализ
-                user_message = f"""Проанализируй состояние моего Instagram аккаунта @{smm.my_username} на основе последних постов:
+                user_message = f"""Проанализируй состояние моего Instagram аккаунта @{smm.my_username} на основе последних {len(result['posts'])} постов:
 
 {posts_text}
 
 Дай краткий отчет:
-1. Вовлеченность (лайки/комменты).
+1. Вовлеченность (лайки/комменты) и ее динамика.
 2. Качество контента (судя по текстам).
 3. 3 конкретных совета, что улучшить прямо сейчас."""
                 
@@ -249,7 +256,10 @@ async def handle_text_message(update: Update, context: ContextTypes.DEFAULT_TYPE
         user_message=user_message,
         system_prompt=system_prompt,
         history=history,
-        language=language
+        language=language,
+        # Тот же ключ, что у кеша ответов: пока первый ответ генерируется,
+        # одинаковые вопросы ждут его, а не запускают свою генерацию
+        cache_key=user_message if config.CACHE_ENABLED else None
     )
     
     if not response:
@@ -310,23 +320,20 @@ async def handle_text_message(update: Update, context: ContextTypes.DEFAULT_TYPE
                 if smm and smm.instagram_available:
                     # Если это запрос на анализ Instagram - запускаем реальный анализ
                     if ("анализ" in user_msg_lower or "проанализ" in user_msg_lower or "статистика" in user_msg_lower) and ("инста" in user_msg_lower or "instagram" in user_msg_lower):
-                        status_msg = await update.message.reply_text(f"📊 Сканирую последние 5 постов аккаунта @{smm.my_username}...")
+                        status_msg = await update.message.reply_text(f"📊 Собираю данные аккаунта @{smm.my_username}...")
                         
-                        result = await smm.get_my_posts(limit=5)
+                        result = await _load_instagram_posts(context, smm)
                         
                         if result['success']:
-                            posts_text = "\n---\n".join([
-                                f"Post {i+1} [{p['type']}]: ❤️ {p['likes']} likes, 💬 {p['comments']} comments.\nТекст: {p['caption'][:200]}..." 
-                                for i, p in enumerate(result['posts'])
-                            ])
+                            posts_text = InstagramSyncService.format_for_analysis(result)
                             
                             # Формируем запрос для GPT с реальными данными
-                            analysis_prompt = f"""Проанализируй состояние моего Instagram аккаунта @{smm.my_username} на основе последних постов:
+                            analysis_prompt = f"""Проанализируй состояние моего Instagram аккаунта @{smm.my_username} на основе последних {len(result['posts'])} постов:
 
 {posts_text}
 
 Дай краткий отчет:
-1. Вовлеченность (лайки/комменты).
+1. Вовлеченность (лайки/комменты) и ее динамика.
 2. Качество контента (судя по текстам).
 3. 3 конкретных совета, что улучшить прямо сейчас."""
                             
@@ -403,9 +410,9 @@ async def handle_text_message(update: Update, context: ContextTypes.DEFAULT_TYPE
         elif action_name == 'analyze_posts':
              if smm and smm.instagram_available:
                  status_msg = await update.message.reply_text("📊 Сканирую посты для анализа...")
-                 res = await smm.get_my_posts(limit=5)
+                 res = await _load_instagram_posts(context, smm)
                  if res['success']:
-                     posts_summary = "\n".join([f"- {p['caption'][:50]}... (❤️{p['likes']})" for p in res['posts']])
+                     posts_summary = "\n".join([f"- {p['caption'][:50]}... (❤️{p['likes']})" for p in res['posts'][:10]])
                      await status_msg.edit_text(f"✅ Данные получены:\n{posts_summary}\n\n(Здесь должен быть детальный анализ, я работаю над этим...)")
                  else:
                      await status_msg.edit_text(f"❌ Ошибка сканирования: {res['error']}")
@@ -477,20 +484,23 @@ async def handle_voice_message(update: Update, context: ContextTypes.DEFAULT_TYP
         # Отправляем статус "печатает"
         await update.message.chat.send_action("typing")
         
-        # Скачиваем голосовое сообщение
         voice = update.message.voice
-        file = await context.bot.get_file(voice.file_id)
         
-        # Сохраняем временно
-        temp_file = f"temp_voice_{user_id}.ogg"
-        await file.download_to_drive(temp_file)
+        # Пересланные и повторные голосовые уже расшифрованы - не качаем заново
+        transcribed_text = ai.get_cached_transcript(voice.file_unique_id)
         
-        # Транскрибируем
-        transcribed_text = await ai.transcribe_audio(temp_file)
-        
-        # Удаляем временный файл
-        if os.path.exists(temp_file):
-            os.remove(temp_file)
+        if transcribed_text is None:
+            # Скачиваем голосовое сообщение в память (без временных файлов)
+            file = await context.bot.get_file(voice.file_id)
+            audio = await file.download_as_bytearray()
+            
+            # Транскрибируем
+            transcribed_text = await ai.transcribe_audio(
+                bytes(audio),
+                filename=f"{voice.file_unique_id}.ogg",
+                language=language,
+                cache_key=voice.file_unique_id
+            )
         
         if not transcribed_text:
             error_messages = {
@@ -3,7 +3,6 @@
 """
 from telegram import Update
 from telegram.ext import ContextTypes
-import os
 
 
 async def post_instagram_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -32,19 +31,16 @@ async def post_instagram_command(update: Update, context: ContextTypes.DEFAULT_T
     
     caption = ' '.join(context.args)
     
-    # Скачиваем фото
+    # Фото из кеша медиа (скачивается и подгоняется под Instagram один раз)
     photo = update.message.reply_to_message.photo[-1]
-    file = await context.bot.get_file(photo.file_id)
-    image_path = f"temp_instagram_{update.effective_user.id}.jpg"
-    await file.download_to_drive(image_path)
+    media_cache = context.bot_data['media_cache']
     
     await update.message.reply_text("📸 Публикую в Instagram...")
     
-    result = await social.post_instagram(caption, image_path)
-    
-    # Удаляем временный файл
-    if os.path.exists(image_path):
-        os.remove(image_path)
+    async with media_cache.use(
+        media_cache.get_instagram_image(context.bot, photo.file_id, photo.file_unique_id)
+    ) as image_path:
+        result = await social.post_instagram(caption, image_path)
     
     if result['success']:
         await update.message.reply_text(
@@ -103,6 +99,29 @@ async def social_status_real_command(update: Update, context: ContextTypes.DEFAU
     response += f"Instagram: {'✅' if status['instagram'] else '❌'}\n"
     response += f"Facebook: {'✅' if status['facebook'] else '❌'}\n\n"
     
+    instagram_sync = context.bot_data.get('instagram_sync')
+    if instagram_sync and status['instagram']:
+        sync_status = instagram_sync.get_status()
+        store = sync_status['store']
+        if store:
+            last_sync = store['last_sync'].strftime('%Y-%m-%d %H:%M') if store['last_sync'] else '—'
+            response += (
+                f"🗂 Локальная статистика: постов {store['media']}, "
+                f"срезов метрик {store['snapshots']}, синхронизация {last_sync}\n\n"
+            )
+    
+    executor = status.get('instagram_executor')
+    if executor and executor['lanes']:
+        response += f"⚙️ Пул instagrapi ({executor['max_workers']} потока):\n"
+        for lane, lane_stats in executor['lanes'].items():
+            response += (
+                f"• {lane}: в очереди {lane_stats['queued']}, выполняется {lane_stats['running']}, "
+                f"вызовов {lane_stats['calls']} (ошибок {lane_stats['errors']})\n"
+                f"  ожидание ~{lane_stats['avg_wait_ms']} мс, "
+                f"выполнение ~{lane_stats['avg_run_ms']} мс (макс {lane_stats['max_run_ms']} мс)\n"
+            )
+        response += "\n"
+    
     if status['available_platforms']:
         response += f"**Доступно:** {', '.join(status['available_platforms'])}\n\n"
         response += "**Команды:**\n"
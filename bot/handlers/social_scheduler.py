@@ -2,7 +2,8 @@
 Команды и воркер для автопостинга в соцсети
 """
 from datetime import datetime
-from typing import Optional
+from typing import Optional, List
+import asyncio
 
 from telegram import Update
 from telegram.ext import ContextTypes
@@ -48,21 +49,107 @@ async def schedule_instagram_command(update: Update, context: ContextTypes.DEFAU
 
     # Получаем file_id фото
     photo = update.message.reply_to_message.photo[-1]
-    file_id = photo.file_id
 
     task = db.add_scheduled_post(
         platform='Instagram',
         caption=caption,
         scheduled_at=scheduled_at,
         created_by=update.effective_user.id,
-        telegram_file_id=file_id,
+        telegram_file_id=photo.file_id,
+        telegram_file_unique_id=photo.file_unique_id,
     )
 
+    # Скачиваем и готовим фото заранее - к сроку публикации всё уже на диске
+    context.bot_data['media_cache'].prefetch(context.bot, photo.file_id, photo.file_unique_id)
+
+    scheduler = context.bot_data.get('post_scheduler')
+    if scheduler:
+        scheduler.schedule(task.id, task.scheduled_at)
+
     await update.message.reply_text(
         f"✅ Запланировано (ID: {task.id}) на {scheduled_at:%Y-%m-%d %H:%M}."
     )
 
 
+PLATFORM_ALIASES = {
+    'instagram': 'Instagram', 'insta': 'Instagram', 'ig': 'Instagram',
+    'facebook': 'Facebook', 'fb': 'Facebook',
+}
+
+
+def _parse_platforms(value: str) -> Optional[List[str]]:
+    """Список платформ вида "instagram,facebook" (None - если есть неизвестная)"""
+    platforms = []
+    for name in value.lower().split(','):
+        platform = PLATFORM_ALIASES.get(name.strip())
+        if not platform:
+            return None
+        if platform not in platforms:
+            platforms.append(platform)
+    return platforms or None
+
+
+async def schedule_post_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Команда: /schedule_post YYYY-MM-DD HH:MM instagram,facebook <caption> (фото - ответом)"""
+    db = context.bot_data.get('db')
+    if not db:
+        await update.message.reply_text("⚠️ БД недоступна")
+        return
+
+    usage = (
+        "💡 Использование: /schedule_post YYYY-MM-DD HH:MM instagram,facebook <текст>\n"
+        "Для Instagram ответьте этой командой на фото."
+    )
+    if len(context.args) < 4:
+        await update.message.reply_text(usage)
+        return
+
+    scheduled_at = _parse_datetime(context.args[0], context.args[1])
+    if not scheduled_at:
+        await update.message.reply_text("❌ Неверный формат даты/времени. Пример: 2025-12-07 18:30")
+        return
+
+    platforms = _parse_platforms(context.args[2])
+    if not platforms:
+        await update.message.reply_text("❌ Платформы: instagram, facebook (через запятую)\n\n" + usage)
+        return
+
+    reply = update.message.reply_to_message
+    photo = reply.photo[-1] if reply and reply.photo else None
+    if 'Instagram' in platforms and not photo:
+        await update.message.reply_text("❌ Для Instagram нужно фото\n\n" + usage)
+        return
+
+    social = context.bot_data.get('social_media_real')
+    status = social.get_status() if social else {'available_platforms': []}
+    unavailable = [p for p in platforms if p not in status['available_platforms']]
+    if unavailable:
+        await update.message.reply_text(f"⚠️ Недоступно: {', '.join(unavailable)}. Проверьте /social_status")
+        return
+
+    caption = ' '.join(context.args[3:])
+    task = db.add_scheduled_post(
+        platform=platforms[0] if len(platforms) == 1 else 'Multi',
+        platforms=platforms,
+        caption=caption,
+        scheduled_at=scheduled_at,
+        created_by=update.effective_user.id,
+        telegram_file_id=photo.file_id if photo else None,
+        telegram_file_unique_id=photo.file_unique_id if photo else None,
+    )
+
+    if photo:
+        context.bot_data['media_cache'].prefetch(context.bot, photo.file_id, photo.file_unique_id)
+
+    scheduler = context.bot_data.get('post_scheduler')
+    if scheduler:
+        scheduler.schedule(task.id, task.scheduled_at)
+
+    await update.message.reply_text(
+        f"✅ Запланировано (ID: {task.id}) на {scheduled_at:%Y-%m-%d %H:%M}: {', '.join(platforms)}."
+    )
+
+
 async def list_posts_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     db = context.bot_data.get('db')
     if not db:
@@ -73,7 +160,7 @@ async def list_posts_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
         await update.message.reply_text("🟢 Очередь пуста")
         return
     lines = [
-        f"#{t.id} • {t.platform} • {t.scheduled_at:%Y-%m-%d %H:%M} • {t.status}"
+        f"#{t.id} • {', '.join(t.platforms or [t.platform])} • {t.scheduled_at:%Y-%m-%d %H:%M} • {t.status}"
         for t in tasks
     ]
     await update.message.reply_text("📋 Очередь:\n" + "\n".join(lines))
@@ -93,17 +180,12 @@ async def post_now_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
     caption = ' '.join(context.args)
     photo = update.message.reply_to_message.photo[-1]
-    file = await context.bot.get_file(photo.file_id)
-    tmp_path = f"temp_postnow_{update.effective_user.id}.jpg"
-    await file.download_to_drive(tmp_path)
+    media_cache = context.bot_data['media_cache']
     await update.message.reply_text("🚀 Публикую...")
-    result = await social.post_instagram(caption, tmp_path)
-    import os
-    if os.path.exists(tmp_path):
-        try:
-            os.remove(tmp_path)
-        except Exception:
-            pass
+    async with media_cache.use(
+        media_cache.get_instagram_image(context.bot, photo.file_id, photo.file_unique_id)
+    ) as image_path:
+        result = await social.post_instagram(caption, image_path)
     if result.get('success'):
         await update.message.reply_text(f"✅ Опубликовано: {result.get('url')}")
     else:
@@ -121,7 +203,9 @@ async def autopost_status_command(update: Update, context: ContextTypes.DEFAULT_
         "📅 Автопостинг статус:\n"
         f"Всего: {stats['total']}\n"
         f"Ожидают: {stats['pending']}\n"
+        f"В работе: {stats['in_progress']}\n"
         f"Опубликовано: {stats['posted']}\n"
+        f"Частично: {stats['partial']}\n"
         f"Ошибки: {stats['failed']}"
     )
 
@@ -143,70 +227,86 @@ async def cancel_post_command(update: Update, context: ContextTypes.DEFAULT_TYPE
         return
 
     ok = db.cancel_scheduled_post(task_id)
+    scheduler = context.bot_data.get('post_scheduler')
+    if ok and scheduler:
+        scheduler.cancel(task_id)
     await update.message.reply_text("✅ Отменено" if ok else "❌ Не найдено")
 
 
-async def scheduled_posts_worker(context: ContextTypes.DEFAULT_TYPE):
-    """Фоновый воркер: публикует задачи, у которых наступило время"""
-    application = context.application
+def autonomy_enabled(db) -> bool:
+    """Включен ли автономный режим (фоновые публикации)"""
+    val = db.get_setting("AUTONOMY_ENABLED", default="false") or "false"
+    return val.lower() == "true"
+
+
+def summarize_results(results: dict) -> tuple:
+    """Итоговый статус кросс-поста и текст ошибки по результатам платформ"""
+    failed = {p: r.get('error') for p, r in results.items() if not r.get('success')}
+    if not failed:
+        return 'posted', None
+    error = '; '.join(f"{p}: {e}" for p, e in failed.items())
+    return ('failed' if len(failed) == len(results) else 'partial'), error
+
+
+async def publish_scheduled_post(application, task):
+    """Публикует задачу (одна или несколько платформ) и сохраняет результат в БД"""
     db = application.bot_data.get('db')
     social = application.bot_data.get('social_media_real')
     bot = application.bot
 
     if not db or not social:
         return
-    # Проверяем автономный режим
-    val = db.get_setting("AUTONOMY_ENABLED", default="false") or "false"
-    if val.lower() != "true":
-        return
-
-    from datetime import datetime as dt
-    now_dt = dt.now().astimezone() if hasattr(dt.now(), 'astimezone') else dt.now()
-
-    # Обрабатываем только 1 задачу за раз, чтобы не пропускать интервалы
-    tasks = db.get_due_scheduled_posts(now_dt=now_dt, limit=1)
-    for task in tasks:
-        try:
-            if task.platform == 'Instagram':
-                if not social.instagram_available:
-                    db.mark_scheduled_post_result(task.id, 'failed', error='Instagram недоступен')
-                    continue
-
-                if not task.telegram_file_id:
-                    db.mark_scheduled_post_result(task.id, 'failed', error='Нет фото для Instagram')
-                    continue
-
-                # Скачиваем фото из Telegram во временный файл
-                file = await bot.get_file(task.telegram_file_id)
-                tmp_path = f"temp_autopost_{task.id}.jpg"
-                await file.download_to_drive(tmp_path)
-
-                result = await social.post_instagram(task.caption, tmp_path)
-
-                # Удаление временного файла (асинхронно, не блокируем)
-                import os
-                try:
-                    if os.path.exists(tmp_path):
-                        os.remove(tmp_path)
-                except Exception:
-                    pass  # Игнорируем ошибки удаления
-
-                if result.get('success'):
-                    db.mark_scheduled_post_result(task.id, 'posted', error=None)
-                else:
-                    db.mark_scheduled_post_result(task.id, 'failed', error=result.get('error'))
-
-            elif task.platform == 'Facebook':
-                if not social.facebook_available:
-                    db.mark_scheduled_post_result(task.id, 'failed', error='Facebook недоступен')
-                    continue
-                result = await social.post_facebook(task.caption)
-                if result.get('success'):
-                    db.mark_scheduled_post_result(task.id, 'posted', error=None)
-                else:
-                    db.mark_scheduled_post_result(task.id, 'failed', error=result.get('error'))
-            else:
-                db.mark_scheduled_post_result(task.id, 'failed', error='Неизвестная платформа')
-
-        except Exception as e:
-            db.mark_scheduled_post_result(task.id, 'failed', error=str(e))
\ No newline at end of file
+
+    platforms = task.platforms or [task.platform]
+    media_cache = application.bot_data['media_cache']
+
+    try:
+        if task.telegram_file_id:
+            # Фото обычно уже подготовлено при планировании - без скачивания;
+            # один файл используется всеми платформами
+            async with media_cache.use(media_cache.get_instagram_image(
+                bot, task.telegram_file_id, task.telegram_file_unique_id
+            )) as image_path:
+                results = await social.post_to_platforms(task.caption, platforms, image_path=image_path)
+        else:
+            results = await social.post_to_platforms(task.caption, platforms)
+        status, error = summarize_results(results)
+
+    except Exception as e:
+        results = None
+        status, error = 'failed', str(e)
+
+    # owner: результат пишем, только пока аренда задачи за нами
+    db.mark_scheduled_post_result(
+        task.id, status, error=error, owner=task.lease_owner, results=results
+    )
+
+
+async def publish_scheduled_facebook_batch(application, tasks):
+    """Публикует пачку текстовых Facebook-задач одним batch-запросом Graph API"""
+    db = application.bot_data.get('db')
+    social = application.bot_data.get('social_media_real')
+
+    if not db or not social:
+        return
+
+    # Посты с фото требуют загрузки файла - публикуются по одному
+    with_photo = [task for task in tasks if task.telegram_file_id]
+    tasks = [task for task in tasks if not task.telegram_file_id]
+    if with_photo:
+        await asyncio.gather(*[publish_scheduled_post(application, task) for task in with_photo])
+    if not tasks:
+        return
+
+    if not social.facebook_available:
+        for task in tasks:
+            db.mark_scheduled_post_result(task.id, 'failed', error='Facebook недоступен', owner=task.lease_owner)
+        return
+
+    results = await social.post_facebook_batch([task.caption for task in tasks])
+
+    for task, result in zip(tasks, results):
+        status, error = summarize_results({'Facebook': result})
+        db.mark_scheduled_post_result(
+            task.id, status, error=error, owner=task.lease_owner, results={'Facebook': result}
+        )
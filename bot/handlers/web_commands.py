@@ -1,6 +1,8 @@
 """
 Команды для веб-разработки (Project Architect)
 """
+import time
+
 from telegram import Update
 from telegram.ext import ContextTypes
 
@@ -43,12 +45,69 @@ async def create_site_command(update: Update, context: ContextTypes.DEFAULT_TYPE
             f"📁 **Репозиторий:**\n{result['repo_url']}\n\n"
             f"📄 **Созданные файлы:**\n{files_list}\n\n"
             f"🌐 **Ссылка (если подключен Vercel):**\n{result['deploy_url']}\n\n"
+            f"✏️ **Правки:** `/edit_site {result['repo_name']} <что изменить>`\n\n"
             "💡 *Совет: Подключи этот репозиторий в Vercel, и сайт будет онлайн!*"
         , parse_mode='Markdown', disable_web_page_preview=True)
     else:
         await update.message.reply_text(f"❌ Ошибка строительства: {result['error']}")
 
 
+async def edit_site_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Команда /edit_site - точечная правка сайта, созданного через /create_site"""
+    architect = context.bot_data.get('project_architect')
+    
+    if not architect:
+        await update.message.reply_text("⚠️ Модуль Архитектора не инициализирован")
+        return
+    
+    if len(context.args) < 2:
+        await update.message.reply_text(
+            "✏️ **Правка сайта**\n\n"
+            "Использование: `/edit_site <репозиторий> <что изменить>`\n\n"
+            "Перегенерируются только затронутые файлы - остальные остаются как есть.\n\n"
+            "Пример:\n"
+            "`/edit_site pizza-neon-landing Сделай кнопки в шапке красными`"
+        , parse_mode='Markdown')
+        return
+    
+    repo_name = context.args[0]
+    change_request = ' '.join(context.args[1:])
+    status_msg = await update.message.reply_text(f"✏️ Вношу правку в {repo_name}...")
+    last_edit = 0.0
+    
+    async def progress(stage: str):
+        nonlocal last_edit
+        # Telegram ограничивает частоту редактирования - не чаще раза в 2 секунды
+        if time.monotonic() - last_edit < 2:
+            return
+        last_edit = time.monotonic()
+        try:
+            await status_msg.edit_text(f"✏️ Вношу правку в {repo_name}...\n{stage}")
+        except Exception:
+            pass
+    
+    result = await architect.edit_site(repo_name, change_request, progress=progress)
+    
+    if not result['success']:
+        await update.message.reply_text(f"❌ Ошибка правки: {result['error']}")
+        return
+    
+    if not result['changed']:
+        await update.message.reply_text("ℹ️ Правка не изменила ни одного файла - коммит не нужен.")
+        return
+    
+    # Без Markdown: в путях файлов бывают символы разметки
+    changed = "\n".join(f"- {path}" for path in result['changed'])
+    text = (
+        f"✅ Правка внесена (коммит {result['commit']})\n\n"
+        f"📄 Изменены файлы:\n{changed}\n"
+    )
+    if result['unchanged']:
+        text += f"\nБез изменений: {', '.join(result['unchanged'])}\n"
+    text += f"\n📁 {result['repo_url']}"
+    await update.message.reply_text(text, disable_web_page_preview=True)
+
+
 async def audit_site_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Команда /audit_site - проверить сайт на ошибки"""
     auditor = context.bot_data.get('site_auditor')
@@ -61,6 +120,7 @@ async def audit_site_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
         await update.message.reply_text(
             "🕵️‍♂️ **QA Аудит сайта**\n\n"
             "Использование: `/audit_site <url>`\n\n"
+            "Бот обойдет страницы сайта, проверит ссылки и составит отчет.\n\n"
             "Пример:\n/audit_site https://example.com"
         , parse_mode='Markdown')
         return
@@ -69,14 +129,27 @@ async def audit_site_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
     if not url.startswith('http'):
         url = 'https://' + url
         
-    await update.message.reply_text(f"🕵️‍♂️ Сканирую сайт {url}... Ищу баги...")
+    status_msg = await update.message.reply_text(f"🕵️‍♂️ Сканирую сайт {url}... Ищу баги...")
+    last_edit = 0.0
     
-    result = await auditor.audit_page(url)
+    async def progress(done: int, found: int):
+        nonlocal last_edit
+        # Telegram ограничивает частоту редактирования - не чаще раза в 2 секунды
+        if time.monotonic() - last_edit < 2:
+            return
+        last_edit = time.monotonic()
+        try:
+            await status_msg.edit_text(f"🕵️‍♂️ Сканирую сайт {url}...\n📄 Страниц: {done}/{found}")
+        except Exception:
+            pass
+    
+    result = await auditor.audit_site(url, progress=progress)
     
     if result['success']:
-        await update.message.reply_text(
-            f"📋 **ОТЧЕТ ПО АУДИТУ:**\n\n"
-            f"{result['report']}"
-        , parse_mode='Markdown')
+        # Без Markdown: в адресах битых ссылок бывают символы разметки
+        report = f"📋 ОТЧЕТ ПО АУДИТУ: {url}\n\n{result['report']}"
+        max_length = 4000
+        for i in range(0, len(report), max_length):
+            await update.message.reply_text(report[i:i + max_length], disable_web_page_preview=True)
     else:
         await update.message.reply_text(f"❌ Ошибка аудита: {result['error']}")
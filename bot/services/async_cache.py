@@ -0,0 +1,156 @@
+"""
+Примитивы кеширования для асинхронных сервисов: LRU-кеш со сроком жизни
+записей и объединение одинаковых одновременных запросов (single-flight)
+"""
+from typing import Any, Callable, Awaitable, Dict, Hashable, Optional
+from collections import OrderedDict
+import asyncio
+import hashlib
+import inspect
+import json
+import time
+
+
+def normalize_text(text: str) -> str:
+    """Нормализация текста для ключа кеша (регистр и пробелы не важны)"""
+    return ' '.join(text.lower().split())
+
+
+def make_key(*parts: Any) -> str:
+    """Стабильный хеш-ключ из параметров запроса (словари, списки, строки)"""
+    raw = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class TTLCache:
+    """LRU-кеш в памяти с ограничением по числу записей и сроком жизни"""
+
+    def __init__(self, maxsize: int = 256, ttl: float = 3600):
+        """
+        Инициализация кеша
+
+        Args:
+            maxsize: Максимум записей (старые по использованию вытесняются)
+            ttl: Срок жизни записи по умолчанию (секунды)
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()  # ключ -> (истекает, значение)
+        self.stats = {'hits': 0, 'misses': 0, 'expired': 0, 'evictions': 0}
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Значение по ключу или default, если записи нет или она устарела"""
+        entry = self._data.get(key)
+        if entry is None:
+            self.stats['misses'] += 1
+            return default
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.stats['expired'] += 1
+            self.stats['misses'] += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.stats['hits'] += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """Сохранить значение (ttl - свой срок жизни для этой записи)"""
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.stats['evictions'] += 1
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get_stats(self) -> Dict:
+        """Метрики кеша"""
+        lookups = self.stats['hits'] + self.stats['misses']
+        return {
+            **self.stats,
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hit_rate': round(self.stats['hits'] / lookups * 100, 1) if lookups else 0,
+        }
+
+
+class SingleFlight:
+    """
+    Одновременные вызовы с одинаковым ключом выполняются один раз:
+    первый запускает работу, остальные ждут его результат
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.stats = {'calls': 0, 'coalesced': 0}
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Выполнить func() или дождаться уже идущего вызова с тем же ключом
+
+        Работа идет в отдельной задаче: отмена одного из ожидающих
+        не прерывает запрос для остальных.
+
+        Args:
+            key: Ключ запроса
+            func: Фабрика корутины
+
+        Returns:
+            Результат func()
+        """
+        task = self._inflight.get(key)
+        if task is not None:
+            self.stats['coalesced'] += 1
+        else:
+            self.stats['calls'] += 1
+            task = asyncio.create_task(func())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+        return await asyncio.shield(task)
+
+    def __contains__(self, key: Hashable) -> bool:
+        """Идет ли сейчас вызов с этим ключом"""
+        return key in self._inflight
+
+    def _done(self, key: Hashable, task: asyncio.Task):
+        self._inflight.pop(key, None)
+        # Если все ожидающие отменились, ошибку никто не прочитает - не шумим в лог
+        if not task.cancelled():
+            task.exception()
+
+    def get_stats(self) -> Dict:
+        return {**self.stats, 'inflight': len(self._inflight)}
+
+
+# Общий single-flight для промптов всех сервисов
+completion_flight = SingleFlight()
+
+
+async def create_completion(client, **params):
+    """
+    chat.completions.create вне event loop: одинаковые одновременные
+    промпты (модель, сообщения, параметры) уходят в OpenAI один раз
+
+    Args:
+        client: OpenAI или AsyncOpenAI клиент
+        **params: Параметры chat.completions.create
+
+    Returns:
+        Ответ OpenAI (общий для всех объединенных вызовов)
+    """
+    create = client.chat.completions.create
+
+    async def call():
+        # У AsyncOpenAI метод обернут декоратором - смотрим на исходную функцию
+        if inspect.iscoroutinefunction(inspect.unwrap(create)):
+            return await create(**params)
+        return await asyncio.to_thread(create, **params)
+
+    return await completion_flight.do(make_key('completion', params), call)
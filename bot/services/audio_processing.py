@@ -0,0 +1,159 @@
+"""
+Подготовка голосовых перед Whisper: 16 кГц моно, обрезка тишины,
+компактное перекодирование и нарезка длинных записей по паузам
+"""
+from typing import Optional, List, Tuple
+import asyncio
+import shutil
+
+import numpy as np
+
+
+class AudioPreprocessor:
+    """Предобработка аудио через ffmpeg (отдельный процесс на каждый шаг)"""
+
+    SAMPLE_RATE = 16000
+    FRAME_MS = 20
+
+    def __init__(
+        self,
+        ffmpeg_path: Optional[str] = None,
+        max_chunk_seconds: int = 120,
+        silence_threshold_db: float = -40.0,
+        padding_ms: int = 200,
+        bitrate: str = "24k"
+    ):
+        """
+        Инициализация
+
+        Args:
+            ffmpeg_path: Путь к ffmpeg (по умолчанию ищем в PATH и imageio-ffmpeg)
+            max_chunk_seconds: Максимальная длина куска для параллельной расшифровки
+            silence_threshold_db: Порог тишины (dBFS)
+            padding_ms: Запас тишины, оставляемый по краям речи
+            bitrate: Битрейт Opus
+        """
+        self.ffmpeg = ffmpeg_path or self._find_ffmpeg()
+        self.is_available = self.ffmpeg is not None
+        self.max_chunk_seconds = max_chunk_seconds
+        self.silence_threshold_db = silence_threshold_db
+        self.padding_ms = padding_ms
+        self.bitrate = bitrate
+
+        if self.is_available:
+            print("✅ Предобработка голосовых включена (ffmpeg)")
+        else:
+            print("ℹ️ ffmpeg не найден - голосовые уходят в Whisper без предобработки")
+
+    @staticmethod
+    def _find_ffmpeg() -> Optional[str]:
+        path = shutil.which('ffmpeg')
+        if path:
+            return path
+        try:
+            import imageio_ffmpeg
+            return imageio_ffmpeg.get_ffmpeg_exe()
+        except Exception:
+            return None
+
+    async def _run_ffmpeg(self, args: List[str], data: bytes) -> bytes:
+        """Запускает ffmpeg с передачей данных через pipe (без диска)"""
+        process = await asyncio.create_subprocess_exec(
+            self.ffmpeg, '-hide_banner', '-loglevel', 'error', *args,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        stdout, stderr = await process.communicate(data)
+        if process.returncode != 0:
+            raise RuntimeError(f"ffmpeg: {stderr.decode(errors='ignore').strip()[:200]}")
+        return stdout
+
+    async def decode(self, audio: bytes) -> np.ndarray:
+        """Декодирует в PCM 16 бит, 16 кГц, моно"""
+        raw = await self._run_ffmpeg(
+            ['-i', 'pipe:0', '-ac', '1', '-ar', str(self.SAMPLE_RATE), '-f', 's16le', 'pipe:1'],
+            audio
+        )
+        return np.frombuffer(raw, dtype=np.int16)
+
+    async def encode(self, pcm: np.ndarray) -> bytes:
+        """Кодирует PCM в OGG/Opus (речевой профиль)"""
+        return await self._run_ffmpeg(
+            [
+                '-f', 's16le', '-ar', str(self.SAMPLE_RATE), '-ac', '1', '-i', 'pipe:0',
+                '-c:a', 'libopus', '-b:a', self.bitrate, '-application', 'voip',
+                '-f', 'ogg', 'pipe:1'
+            ],
+            pcm.tobytes()
+        )
+
+    def _frame_levels(self, pcm: np.ndarray) -> np.ndarray:
+        """Громкость каждого фрейма в dBFS"""
+        frame = self.SAMPLE_RATE * self.FRAME_MS // 1000
+        count = len(pcm) // frame
+        if count == 0:
+            return np.zeros(0)
+        frames = pcm[:count * frame].astype(np.float32).reshape(count, frame) / 32768.0
+        rms = np.sqrt(np.mean(frames ** 2, axis=1))
+        return 20 * np.log10(np.maximum(rms, 1e-6))
+
+    def split_points(self, pcm: np.ndarray) -> List[Tuple[int, int]]:
+        """
+        Границы кусков в сэмплах: без тишины по краям, разрезы - в самых
+        тихих местах ближе к концу каждого окна
+
+        Returns:
+            Список (начало, конец); пустой, если речи нет
+        """
+        levels = self._frame_levels(pcm)
+        voiced = np.flatnonzero(levels > self.silence_threshold_db)
+        if len(voiced) == 0:
+            return []
+
+        frame = self.SAMPLE_RATE * self.FRAME_MS // 1000
+        pad = self.padding_ms // self.FRAME_MS
+        first = max(voiced[0] - pad, 0)
+        last = min(voiced[-1] + pad + 1, len(levels))
+
+        max_frames = self.max_chunk_seconds * 1000 // self.FRAME_MS
+        segments = []
+        start = first
+        while last - start > max_frames:
+            # Ищем паузу в последней трети окна, чтобы не резать слово
+            window_from = start + max_frames * 2 // 3
+            window_to = start + max_frames
+            cut = window_from + int(np.argmin(levels[window_from:window_to]))
+            segments.append((start * frame, cut * frame))
+            start = cut
+        segments.append((start * frame, min(last * frame, len(pcm))))
+        return segments
+
+    async def prepare(self, audio: bytes) -> List[bytes]:
+        """
+        Подготовить запись к расшифровке
+
+        Args:
+            audio: Исходный файл (OGG/Opus из Telegram и т.п.)
+
+        Returns:
+            Куски OGG/Opus по порядку (пустой список - в записи только тишина)
+        """
+        if not self.is_available:
+            return [audio]
+
+        pcm = await self.decode(audio)
+        segments = await asyncio.to_thread(self.split_points, pcm)
+        if not segments:
+            return []
+
+        chunks = await asyncio.gather(*[
+            self.encode(pcm[start:end]) for start, end in segments
+        ])
+
+        duration = len(pcm) / self.SAMPLE_RATE
+        print(
+            f"🎛️ Аудио {duration:.1f} с: {len(audio) // 1024} KB → "
+            f"{sum(len(c) for c in chunks) // 1024} KB, кусков: {len(chunks)}"
+        )
+        return list(chunks)
@@ -0,0 +1,125 @@
+"""
+Выделенный пул потоков для блокирующих SDK (instagrapi и т.п.)
+с последовательными очередями по аккаунтам и метриками
+"""
+from typing import Optional, Dict, Callable, Any
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import functools
+import time
+
+
+class LaneExecutor:
+    """
+    Ограниченный пул потоков: вызовы одной "полосы" (аккаунта) идут строго
+    по очереди, разные полосы выполняются параллельно. Event loop не блокируется.
+    """
+
+    def __init__(self, name: str, max_workers: int = 2):
+        """
+        Инициализация
+
+        Args:
+            name: Имя пула (префикс потоков и подпись в метриках)
+            max_workers: Максимум одновременно работающих потоков
+        """
+        self.name = name
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._lanes: Dict[str, Dict] = {}
+
+    def _lane(self, lane: str) -> Dict:
+        if lane not in self._lanes:
+            self._locks[lane] = asyncio.Lock()
+            self._lanes[lane] = {
+                'queued': 0,
+                'running': 0,
+                'calls': 0,
+                'errors': 0,
+                'wait_total': 0.0,
+                'run_total': 0.0,
+                'run_max': 0.0,
+            }
+        return self._lanes[lane]
+
+    async def run(self, lane: str, func: Callable, *args, **kwargs) -> Any:
+        """
+        Выполнить блокирующую функцию в пуле
+
+        Args:
+            lane: Полоса (например, имя аккаунта) - вызовы в ней сериализуются
+            func: Синхронная функция
+            *args, **kwargs: Аргументы функции
+
+        Returns:
+            Результат функции (исключения пробрасываются)
+        """
+        stats = self._lane(lane)
+        stats['queued'] += 1
+        enqueued = time.perf_counter()
+        waiting = True
+
+        try:
+            async with self._locks[lane]:
+                started = time.perf_counter()
+                waiting = False
+                stats['queued'] -= 1
+                stats['running'] += 1
+                stats['wait_total'] += started - enqueued
+
+                loop = asyncio.get_running_loop()
+                future = loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+                try:
+                    return await asyncio.shield(future)
+                except asyncio.CancelledError:
+                    # Поток прервать нельзя - держим полосу, пока вызов не завершится
+                    await asyncio.wait([future])
+                    raise
+                except Exception:
+                    stats['errors'] += 1
+                    raise
+                finally:
+                    elapsed = time.perf_counter() - started
+                    stats['running'] -= 1
+                    stats['calls'] += 1
+                    stats['run_total'] += elapsed
+                    stats['run_max'] = max(stats['run_max'], elapsed)
+        finally:
+            if waiting:
+                # Отменили, пока вызов ждал своей очереди
+                stats['queued'] -= 1
+
+    def get_stats(self, lane: Optional[str] = None) -> Dict:
+        """
+        Метрики пула
+
+        Args:
+            lane: Только одна полоса (по умолчанию все)
+
+        Returns:
+            Глубина очереди и задержки (мс) по полосам
+        """
+        lanes = {}
+        for name, stats in self._lanes.items():
+            if lane and name != lane:
+                continue
+            calls = stats['calls']
+            lanes[name] = {
+                'queued': stats['queued'],
+                'running': stats['running'],
+                'calls': calls,
+                'errors': stats['errors'],
+                'avg_wait_ms': round(stats['wait_total'] / calls * 1000) if calls else 0,
+                'avg_run_ms': round(stats['run_total'] / calls * 1000) if calls else 0,
+                'max_run_ms': round(stats['run_max'] * 1000),
+            }
+        return {
+            'name': self.name,
+            'max_workers': self.max_workers,
+            'lanes': lanes,
+        }
+
+    def shutdown(self):
+        """Остановить пул (дожидаясь текущих вызовов)"""
+        self._executor.shutdown(wait=True)
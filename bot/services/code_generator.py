@@ -1,21 +1,46 @@
 """
 AI Разработчик - генерация и анализ кода
 """
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Callable, Awaitable, Any
+import re
+import json
+import asyncio
+import hashlib
+
 from openai import OpenAI
 
+from .async_cache import TTLCache, SingleFlight, create_completion
+from .code_splitter import split_code
+
+CODE_BLOCK_RE = re.compile(r'```[\w+-]*\n(.*?)```', re.DOTALL)
+
 
 class CodeGenerator:
     """Генератор кода через OpenAI"""
     
-    def __init__(self, api_key: str):
+    def __init__(
+        self,
+        api_key: str,
+        chunk_chars: int = 8000,
+        concurrency: int = 4,
+        cache_ttl: float = 24 * 3600,
+        cache_size: int = 128
+    ):
         """
         Инициализация генератора
         
         Args:
             api_key: OpenAI API ключ
+            chunk_chars: Размер фрагмента при разборе больших файлов (символы)
+            concurrency: Фрагментов в обработке одновременно
+            cache_ttl: Сколько хранить результаты по файлам (секунды)
+            cache_size: Максимум файлов в кеше
         """
         self.client = OpenAI(api_key=api_key)
+        self.chunk_chars = chunk_chars
+        self.cache = TTLCache(maxsize=cache_size, ttl=cache_ttl)
+        self.flight = SingleFlight()
+        self._semaphore = asyncio.Semaphore(concurrency)
     
     async def generate_code(
         self,
@@ -49,7 +74,8 @@ Requirements:
 
 Provide only the code, no explanations."""
 
-            response = self.client.chat.completions.create(
+            response = await create_completion(
+                self.client,
                 model='gpt-4o',  # Используем GPT-4o для генерации кода
                 messages=[
                     {"role": "system", "content": "You are an expert software developer."},
@@ -99,7 +125,8 @@ Provide analysis in JSON format:
     "best_practices": ["violations"]
 }}"""
 
-            response = self.client.chat.completions.create(
+            response = await create_completion(
+                self.client,
                 model='gpt-4o-mini',
                 messages=[
                     {"role": "system", "content": "You are a code review expert."},
@@ -109,21 +136,21 @@ Provide analysis in JSON format:
                 max_tokens=1500
             )
             
-            import json
-            result = response.choices[0].message.content
-            
-            # Извлекаем JSON из ответа
-            if "```json" in result:
-                result = result.split("```json")[1].split("```")[0].strip()
-            elif "```" in result:
-                result = result.split("```")[1].split("```")[0].strip()
-            
-            return json.loads(result)
+            return self._parse_json(response.choices[0].message.content)
             
         except Exception as e:
             print(f"❌ Ошибка анализа кода: {e}")
             return None
     
+    @staticmethod
+    def _parse_json(result: str) -> Dict:
+        """JSON из ответа модели (возможно, обернутый в ```json)"""
+        if "```json" in result:
+            result = result.split("```json")[1].split("```")[0].strip()
+        elif "```" in result:
+            result = result.split("```")[1].split("```")[0].strip()
+        return json.loads(result)
+    
     async def fix_code(self, code: str, issue: str, language: str = 'python') -> Optional[str]:
         """
         Исправление кода
@@ -149,7 +176,8 @@ Original code:
 Provide the fixed code with comments explaining the changes.
 Provide only the code, no explanations outside the code."""
 
-            response = self.client.chat.completions.create(
+            response = await create_completion(
+                self.client,
                 model='gpt-4o',
                 messages=[
                     {"role": "system", "content": "You are an expert debugger."},
@@ -189,7 +217,8 @@ Provide:
 3. Key concepts used
 4. Potential use cases"""
 
-            response = self.client.chat.completions.create(
+            response = await create_completion(
+                self.client,
                 model='gpt-4o-mini',
                 messages=[
                     {"role": "system", "content": "You are a programming teacher."},
@@ -231,7 +260,8 @@ Original code:
 Provide the refactored code with comments explaining improvements.
 Provide only the code, no explanations outside the code."""
 
-            response = self.client.chat.completions.create(
+            response = await create_completion(
+                self.client,
                 model='gpt-4o',
                 messages=[
                     {"role": "system", "content": "You are a senior software engineer specializing in code refactoring."},
@@ -281,7 +311,8 @@ Include:
 
 Provide only the test code."""
 
-            response = self.client.chat.completions.create(
+            response = await create_completion(
+                self.client,
                 model='gpt-4o',
                 messages=[
                     {"role": "system", "content": "You are a test-driven development expert."},
@@ -296,3 +327,252 @@ Provide only the test code."""
         except Exception as e:
             print(f"❌ Ошибка генерации тестов: {e}")
             return None
+
+    # ---------- Большие файлы: фрагменты параллельно, результат по хешу содержимого ----------
+    
+    async def _cached_file_op(
+        self,
+        operation: str,
+        code: str,
+        language: str,
+        func: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """
+        Результат операции над файлом из кеша по sha256 содержимого;
+        одинаковые одновременные запросы выполняются один раз
+        """
+        key = (operation, language, hashlib.sha256(code.encode('utf-8')).hexdigest())
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        
+        async def run():
+            result = await func()
+            if result is not None:
+                self.cache.set(key, result)
+            return result
+        
+        return await self.flight.do(key, run)
+    
+    @staticmethod
+    def _chunk_prompt(chunk: Dict, filename: str, language: str) -> str:
+        """Фрагмент кода с номерами строк и контекстом (класс, к которому он относится)"""
+        context = f"\n(inside: {chunk['context']})" if chunk.get('context') else ''
+        return (
+            f"File {filename}, lines {chunk['start']}-{chunk['end']}{context}:\n\n"
+            f"```{language}\n{chunk['code']}\n```"
+        )
+    
+    async def _map_chunks(self, chunks: List[Dict], func: Callable[[Dict], Awaitable[Any]]) -> List[Any]:
+        """func для каждого фрагмента, не больше concurrency одновременно"""
+        async def limited(chunk: Dict):
+            async with self._semaphore:
+                return await func(chunk)
+        
+        return await asyncio.gather(*[limited(chunk) for chunk in chunks])
+    
+    async def _analyze_chunk(self, chunk: Dict, filename: str, language: str) -> Optional[Dict]:
+        """Анализ одного фрагмента (ошибка фрагмента не валит весь отчет)"""
+        prompt = f"""Analyze this part of a larger {language} file. Report only issues visible in this part.
+
+{self._chunk_prompt(chunk, filename, language)}
+
+Reference line numbers where possible. Respond in JSON:
+{{
+    "quality_score": <1-10>,
+    "bugs": ["list of potential bugs"],
+    "security": ["security concerns"],
+    "performance": ["performance suggestions"],
+    "best_practices": ["violations"]
+}}"""
+        try:
+            response = await create_completion(
+                self.client,
+                model='gpt-4o-mini',
+                messages=[
+                    {"role": "system", "content": "You are a code review expert."},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=0.3,
+                max_tokens=1500,
+                response_format={"type": "json_object"}
+            )
+            return self._parse_json(response.choices[0].message.content)
+        except Exception as e:
+            print(f"⚠️ Ошибка анализа строк {chunk['start']}-{chunk['end']}: {e}")
+            return None
+    
+    async def analyze_file(self, code: str, language: str = 'python', filename: str = 'code') -> Optional[Dict]:
+        """
+        Анализ файла любого размера: фрагменты по границам функций/классов
+        анализируются параллельно, находки сводятся в один отчет
+        
+        Args:
+            code: Содержимое файла
+            language: Язык программирования
+            filename: Имя файла (для ссылок на строки)
+            
+        Returns:
+            Отчет как у analyze_code + 'chunks' и 'lines'
+        """
+        async def run():
+            chunks = split_code(code, language, self.chunk_chars)
+            if len(chunks) <= 1:
+                result = await self.analyze_code(code, language)
+                return {**result, 'chunks': 1, 'lines': len(code.splitlines())} if result else None
+            
+            results = await self._map_chunks(
+                chunks, lambda chunk: self._analyze_chunk(chunk, filename, language)
+            )
+            merged: Dict[str, Any] = {key: [] for key in ('bugs', 'security', 'performance', 'best_practices')}
+            weighted, weight = 0.0, 0
+            for chunk, result in zip(chunks, results):
+                if not result:
+                    continue
+                size = len(chunk['code'])
+                try:
+                    weighted += float(result.get('quality_score', 0)) * size
+                    weight += size
+                except (TypeError, ValueError):
+                    pass
+                for key in merged:
+                    for item in result.get(key) or []:
+                        entry = f"[{chunk['start']}-{chunk['end']}] {item}"
+                        if entry not in merged[key]:
+                            merged[key].append(entry)
+            
+            if not any(results):
+                return None
+            merged['quality_score'] = round(weighted / weight, 1) if weight else 'N/A'
+            merged['chunks'] = len(chunks)
+            merged['failed_chunks'] = sum(1 for result in results if not result)
+            merged['lines'] = len(code.splitlines())
+            return merged
+        
+        return await self._cached_file_op('analyze', code, language, run)
+    
+    async def explain_file(self, code: str, language: str = 'python', filename: str = 'code') -> Optional[str]:
+        """
+        Объяснение файла любого размера: конспект каждого фрагмента
+        параллельно, затем общее объяснение по конспектам
+        
+        Args:
+            code: Содержимое файла
+            language: Язык программирования
+            filename: Имя файла
+            
+        Returns:
+            Объяснение кода
+        """
+        async def summarize(chunk: Dict) -> Optional[str]:
+            try:
+                response = await create_completion(
+                    self.client,
+                    model='gpt-4o-mini',
+                    messages=[
+                        {"role": "system", "content": "You are a programming teacher."},
+                        {"role": "user", "content": (
+                            "Briefly describe what this part of the file defines and does "
+                            "(key functions/classes, their purpose, notable logic):\n\n"
+                            + self._chunk_prompt(chunk, filename, language)
+                        )}
+                    ],
+                    temperature=0.3,
+                    max_tokens=600
+                )
+                return response.choices[0].message.content
+            except Exception as e:
+                print(f"⚠️ Ошибка конспекта строк {chunk['start']}-{chunk['end']}: {e}")
+                return None
+        
+        async def run():
+            chunks = split_code(code, language, self.chunk_chars)
+            if len(chunks) <= 1:
+                return await self.explain_code(code, language)
+            
+            notes = await self._map_chunks(chunks, summarize)
+            if not any(notes):
+                return None
+            outline = "\n\n".join(
+                f"Lines {chunk['start']}-{chunk['end']}:\n{note}"
+                for chunk, note in zip(chunks, notes) if note
+            )
+            try:
+                response = await create_completion(
+                    self.client,
+                    model='gpt-4o-mini',
+                    messages=[
+                        {"role": "system", "content": "You are a programming teacher."},
+                        {"role": "user", "content": f"""Here are notes on consecutive parts of the {language} file {filename}:
+
+{outline}
+
+Explain the whole file in simple terms. Provide:
+1. What the code does (high-level)
+2. How it works (step-by-step, referencing line ranges)
+3. Key concepts used
+4. Potential use cases"""}
+                    ],
+                    temperature=0.7,
+                    max_tokens=1500
+                )
+                return response.choices[0].message.content
+            except Exception as e:
+                print(f"❌ Ошибка объяснения кода: {e}")
+                return None
+        
+        return await self._cached_file_op('explain', code, language, run)
+    
+    async def refactor_file(self, code: str, language: str = 'python', filename: str = 'code') -> Optional[str]:
+        """
+        Рефакторинг файла любого размера: фрагменты переписываются
+        параллельно и собираются в исходном порядке
+        
+        Args:
+            code: Содержимое файла
+            language: Язык программирования
+            filename: Имя файла
+            
+        Returns:
+            Отрефакторенный код (None, если не удался хотя бы один фрагмент)
+        """
+        async def refactor(chunk: Dict) -> Optional[str]:
+            try:
+                response = await create_completion(
+                    self.client,
+                    model='gpt-4o',
+                    messages=[
+                        {"role": "system", "content": "You are a senior software engineer specializing in code refactoring."},
+                        {"role": "user", "content": f"""Refactor this part of a larger {language} file to improve readability,
+maintainability and performance. Keep public names and signatures so the rest of the file still works.
+Keep the same indentation level.
+
+{self._chunk_prompt(chunk, filename, language)}
+
+Provide only the refactored code for these lines, with comments explaining improvements."""}
+                    ],
+                    temperature=0.6,
+                    max_tokens=4000
+                )
+                result = response.choices[0].message.content
+                fenced = CODE_BLOCK_RE.search(result)
+                return (fenced.group(1) if fenced else result).rstrip()
+            except Exception as e:
+                print(f"⚠️ Ошибка рефакторинга строк {chunk['start']}-{chunk['end']}: {e}")
+                return None
+        
+        async def run():
+            chunks = split_code(code, language, self.chunk_chars)
+            if len(chunks) <= 1:
+                return await self.refactor_code(code, language)
+            
+            parts = await self._map_chunks(chunks, refactor)
+            if not all(parts):
+                return None
+            return "\n\n".join(parts)
+        
+        return await self._cached_file_op('refactor', code, language, run)
+    
+    def get_stats(self) -> Dict:
+        """Метрики кеша по файлам"""
+        return {**self.cache.get_stats(), 'coalesced': self.flight.stats['coalesced']}
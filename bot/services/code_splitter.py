@@ -0,0 +1,166 @@
+"""
+Разбиение исходного кода на фрагменты по границам функций и классов:
+для Python - по AST, для остальных языков - по блокам верхнего уровня
+"""
+from typing import Dict, List, Optional
+import ast
+import os
+import re
+
+
+# Расширение файла -> язык (если язык не указан в команде)
+EXTENSION_LANGUAGES = {
+    '.py': 'python', '.pyw': 'python',
+    '.js': 'javascript', '.mjs': 'javascript', '.jsx': 'javascript',
+    '.ts': 'typescript', '.tsx': 'typescript',
+    '.java': 'java', '.kt': 'kotlin', '.go': 'go', '.rs': 'rust',
+    '.c': 'c', '.h': 'c', '.cpp': 'cpp', '.hpp': 'cpp', '.cc': 'cpp',
+    '.cs': 'csharp', '.php': 'php', '.rb': 'ruby', '.swift': 'swift',
+    '.sql': 'sql', '.sh': 'bash', '.html': 'html', '.css': 'css',
+}
+
+# Начало блока верхнего уровня в C-подобных языках: не отступ, не закрывающая скобка, не комментарий
+TOP_LEVEL_RE = re.compile(r'^(?![\s})\]]|//|/\*|\*|#)\S')
+
+
+def detect_language(filename: Optional[str], default: str = 'python') -> str:
+    """Язык по расширению файла"""
+    if not filename:
+        return default
+    return EXTENSION_LANGUAGES.get(os.path.splitext(filename)[1].lower(), default)
+
+
+def _chunk(lines: List[str], start: int, end: int, context: Optional[str] = None) -> Dict:
+    """Фрагмент строк start..end (нумерация с 1, включительно)"""
+    return {
+        'start': start,
+        'end': end,
+        'code': '\n'.join(lines[start - 1:end]),
+        'context': context,
+    }
+
+
+def _pack(units: List[tuple], lines: List[str], max_chars: int, context: Optional[str] = None) -> List[Dict]:
+    """
+    Склеить соседние единицы (start, end) во фрагменты не длиннее max_chars
+
+    Единица длиннее лимита становится отдельным фрагментом (ее режут выше по стеку).
+    """
+    chunks: List[Dict] = []
+    current_start, current_end, size = None, None, 0
+    for start, end in units:
+        unit_size = sum(len(line) + 1 for line in lines[start - 1:end])
+        if current_start is not None and size + unit_size > max_chars:
+            chunks.append(_chunk(lines, current_start, current_end, context))
+            current_start, size = None, 0
+        if current_start is None:
+            current_start = start
+        current_end = end
+        size += unit_size
+    if current_start is not None:
+        chunks.append(_chunk(lines, current_start, current_end, context))
+    return chunks
+
+
+def _split_lines(lines: List[str], start: int, end: int, max_chars: int, context: Optional[str] = None) -> List[Dict]:
+    """Крайний случай: резать по строкам"""
+    return _pack([(n, n) for n in range(start, end + 1)], lines, max_chars, context)
+
+
+def _node_start(node: ast.AST) -> int:
+    """Первая строка узла вместе с декораторами"""
+    decorators = getattr(node, 'decorator_list', None) or []
+    return min([node.lineno] + [d.lineno for d in decorators])
+
+
+def _split_python_body(
+    body: List[ast.stmt],
+    lines: List[str],
+    first_line: int,
+    last_line: int,
+    max_chars: int,
+    context: Optional[str] = None
+) -> List[Dict]:
+    """
+    Фрагменты из последовательности инструкций одного уровня
+
+    Комментарии и пустые строки перед функцией относятся к ней.
+    Слишком большой класс режется по методам (с заголовком класса в контексте).
+    """
+    units = []
+    cursor = first_line
+    for i, node in enumerate(body):
+        # Хвост (комментарии после последней инструкции) - к последней единице
+        end = max(node.end_lineno, last_line) if i == len(body) - 1 else node.end_lineno
+        units.append((cursor, end, node))
+        cursor = end + 1
+
+    chunks: List[Dict] = []
+    pending: List[tuple] = []
+    for start, end, node in units:
+        size = sum(len(line) + 1 for line in lines[start - 1:end])
+        if size <= max_chars:
+            pending.append((start, end))
+            continue
+
+        chunks += _pack(pending, lines, max_chars, context)
+        pending = []
+        if isinstance(node, ast.ClassDef) and node.body:
+            header = '\n'.join(lines[_node_start(node) - 1:node.lineno]).strip()
+            # Строка class ... попадает в первый фрагмент вместе с первым методом
+            chunks += _split_python_body(node.body, lines, start, end, max_chars, header)
+        else:
+            chunks += _split_lines(lines, start, end, max_chars, context)
+
+    chunks += _pack(pending, lines, max_chars, context)
+    return chunks
+
+
+def split_code(code: str, language: str = 'python', max_chars: int = 8000) -> List[Dict]:
+    """
+    Разбить код на фрагменты по границам функций/классов
+
+    Args:
+        code: Исходный код
+        language: Язык (для Python - разбор AST)
+        max_chars: Ориентировочный максимум символов во фрагменте
+
+    Returns:
+        [{'start', 'end', 'code', 'context'}] - строки с 1 включительно;
+        context - заголовок класса для фрагментов из его середины
+    """
+    lines = code.splitlines()
+    if not lines:
+        return []
+    if len(code) <= max_chars:
+        return [_chunk(lines, 1, len(lines))]
+
+    if language == 'python':
+        try:
+            tree = ast.parse(code)
+        except SyntaxError:
+            tree = None
+        if tree is not None and tree.body:
+            return _split_python_body(tree.body, lines, 1, len(lines), max_chars)
+
+    # Остальные языки: граница - строка без отступа после пустой строки или закрывающей скобки
+    units = []
+    start = 1
+    for n in range(2, len(lines) + 1):
+        previous = lines[n - 2].strip()
+        if TOP_LEVEL_RE.match(lines[n - 1]) and (not previous or previous[-1:] in ('}', ';')):
+            units.append((start, n - 1))
+            start = n
+    units.append((start, len(lines)))
+
+    chunks: List[Dict] = []
+    pending: List[tuple] = []
+    for unit_start, unit_end in units:
+        if sum(len(line) + 1 for line in lines[unit_start - 1:unit_end]) > max_chars:
+            chunks += _pack(pending, lines, max_chars)
+            pending = []
+            chunks += _split_lines(lines, unit_start, unit_end, max_chars)
+        else:
+            pending.append((unit_start, unit_end))
+    chunks += _pack(pending, lines, max_chars)
+    return chunks
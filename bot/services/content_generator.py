@@ -4,6 +4,8 @@
 from typing import Optional, Dict
 from openai import OpenAI
 
+from .async_cache import create_completion
+
 
 class ContentGenerator:
     """Генератор контента через OpenAI"""
@@ -47,7 +49,8 @@ class ContentGenerator:
                 'en': f"Write a detailed blog post about: {topic}\n\nThe post should be informative, engaging and well-structured."
             }
             
-            response = self.client.chat.completions.create(
+            response = await create_completion(
+                self.client,
                 model='gpt-4o-mini',
                 messages=[
                     {"role": "system", "content": "You are a professional content writer."},
@@ -108,7 +111,8 @@ class ContentGenerator:
             
             prompt = f"{instruction} на тему: {topic}\n\nВключи релевантные хештеги."
             
-            response = self.client.chat.completions.create(
+            response = await create_completion(
+                self.client,
                 model='gpt-4o-mini',
                 messages=[
                     {"role": "system", "content": "You are a social media content creator."},
@@ -164,7 +168,8 @@ class ContentGenerator:
                 'en': f"Create a {duration}-second video script about: {topic}\n\nInclude timecodes and visual elements."
             }
             
-            response = self.client.chat.completions.create(
+            response = await create_completion(
+                self.client,
                 model='gpt-4o-mini',
                 messages=[
                     {"role": "system", "content": "You are a professional video scriptwriter."},
@@ -204,7 +209,8 @@ class ContentGenerator:
                 'en': f"Create compelling ad copy\n\nProduct: {product}\nTarget audience: {target_audience}\n\nThe copy should be persuasive and motivating."
             }
             
-            response = self.client.chat.completions.create(
+            response = await create_completion(
+                self.client,
                 model='gpt-4o-mini',
                 messages=[
                     {"role": "system", "content": "You are an expert copywriter."},
@@ -0,0 +1,347 @@
+"""
+Сервис эмбеддингов: микро-батчинг запросов и кеш векторов на диске
+"""
+from typing import Optional, List, Dict
+import os
+import re
+import zlib
+import asyncio
+import hashlib
+import sqlite3
+import threading
+
+import numpy as np
+
+
+class EmbeddingBackend:
+    """Базовый интерфейс бэкенда эмбеддингов"""
+
+    # Уникальное имя модели (часть ключа кеша и путь хранилища)
+    name: str = "base"
+    # Локальные бэкенды считают быстро и без сети - батчинг и кеш им не нужны
+    is_local: bool = False
+
+    @property
+    def slug(self) -> str:
+        """Имя, безопасное для использования в путях"""
+        return re.sub(r'[^\w.-]', '_', self.name)
+
+    def embed(self, texts: List[str]) -> List[np.ndarray]:
+        """Синхронно получить эмбеддинги текстов"""
+        raise NotImplementedError
+
+
+class OpenAIEmbeddingBackend(EmbeddingBackend):
+    """Эмбеддинги через OpenAI API"""
+
+    def __init__(self, openai_client, model: str = "text-embedding-3-small"):
+        """
+        Args:
+            openai_client: OpenAI клиент
+            model: Модель эмбеддингов
+        """
+        self.client = openai_client
+        self.name = model
+
+    def embed(self, texts: List[str]) -> List[np.ndarray]:
+        response = self.client.embeddings.create(model=self.name, input=texts)
+        data = sorted(response.data, key=lambda item: item.index)
+        return [np.asarray(item.embedding, dtype=np.float32) for item in data]
+
+
+class HashingEmbeddingBackend(EmbeddingBackend):
+    """
+    Локальные эмбеддинги без сети: hashing-векторизатор по словам
+    и символьным n-граммам (устойчив к опечаткам и словоформам)
+    """
+
+    is_local = True
+
+    TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+    def __init__(self, dim: int = 512, ngram_sizes: tuple = (3, 4)):
+        """
+        Args:
+            dim: Размерность векторов
+            ngram_sizes: Длины символьных n-грамм
+        """
+        self.dim = dim
+        self.ngram_sizes = ngram_sizes
+        self.name = f"local-hash-{dim}"
+
+    def _features(self, text: str) -> List[tuple]:
+        """Признаки текста с весами"""
+        features = []
+        for word in self.TOKEN_RE.findall(text.lower()):
+            features.append((f"w:{word}", 1.0))
+            padded = f" {word} "
+            for n in self.ngram_sizes:
+                for i in range(len(padded) - n + 1):
+                    features.append((f"c:{padded[i:i + n]}", 0.5))
+        return features
+
+    def _vector(self, text: str) -> np.ndarray:
+        features = self._features(text)
+        if not features:
+            return np.zeros(self.dim, dtype=np.float32)
+
+        hashes = np.fromiter(
+            (zlib.crc32(f.encode('utf-8')) for f, _ in features), dtype=np.uint64, count=len(features)
+        )
+        weights = np.fromiter((w for _, w in features), dtype=np.float32, count=len(features))
+        # Старший бит хеша задает знак - коллизии взаимно гасятся
+        signs = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+
+        vector = np.bincount(
+            (hashes % self.dim).astype(np.int64), weights=weights * signs, minlength=self.dim
+        ).astype(np.float32)
+        # Сублинейное масштабирование частот
+        vector = np.sign(vector) * np.log1p(np.abs(vector))
+
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def embed(self, texts: List[str]) -> List[np.ndarray]:
+        return [self._vector(text) for text in texts]
+
+
+def create_embedding_backend(
+    backend: str,
+    openai_client=None,
+    model: str = "text-embedding-3-small",
+    dim: int = 512
+) -> EmbeddingBackend:
+    """
+    Создать бэкенд эмбеддингов по имени из конфигурации
+
+    Args:
+        backend: 'openai' или 'local'
+        openai_client: OpenAI клиент (для 'openai')
+        model: Модель OpenAI
+        dim: Размерность локальных векторов
+
+    Returns:
+        Бэкенд эмбеддингов
+    """
+    if backend == 'openai' and openai_client is not None:
+        return OpenAIEmbeddingBackend(openai_client, model)
+    if backend not in ('openai', 'local'):
+        print(f"⚠️ Неизвестный EMBEDDING_BACKEND={backend}, используем локальный")
+    return HashingEmbeddingBackend(dim)
+
+
+class EmbeddingCache:
+    """Персистентный кеш эмбеддингов, адресуемый хешем (модель + текст)"""
+
+    def __init__(self, path: str):
+        """
+        Инициализация кеша
+
+        Args:
+            path: Путь к файлу SQLite
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(model: str, text: str) -> str:
+        """Ключ кеша"""
+        return hashlib.sha256(f"{model}\0{text}".encode('utf-8')).hexdigest()
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        """Найти векторы по ключам"""
+        if not keys:
+            return {}
+        found = {}
+        with self._lock:
+            # SQLite ограничивает число параметров запроса
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                placeholders = ','.join('?' * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def put_many(self, items: Dict[str, np.ndarray]):
+        """Сохранить векторы"""
+        if not items:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                [(key, np.asarray(vec, dtype=np.float32).tobytes()) for key, vec in items.items()]
+            )
+            self._conn.commit()
+
+    def count(self) -> int:
+        """Количество векторов в кеше"""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+
+class EmbeddingService:
+    """Объединяет конкурентные запросы в батчи и кеширует результаты"""
+
+    # Верхние границы корзин гистограммы размеров батчей
+    BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 2048)
+
+    def __init__(
+        self,
+        backend: EmbeddingBackend,
+        cache_path: Optional[str] = None,
+        batch_window: float = 0.01,
+        max_batch_size: int = 64
+    ):
+        """
+        Инициализация сервиса
+
+        Args:
+            backend: Бэкенд эмбеддингов
+            cache_path: Путь к файлу кеша (None - без персистентного кеша)
+            batch_window: Окно сбора батча в секундах
+            max_batch_size: Максимальный размер батча
+        """
+        self.backend = backend
+        self.model = backend.name
+        # Локальные векторы дешевле посчитать заново, чем прочитать из кеша
+        self.cache = EmbeddingCache(cache_path) if cache_path and not backend.is_local else None
+        self.batch_window = batch_window
+        self.max_batch_size = max_batch_size
+
+        self._pending: List[tuple] = []
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._flush_handle = None
+
+        self.stats = {
+            'requests': 0,
+            'texts': 0,
+            'cache_hits': 0,
+            'cache_misses': 0,
+            'coalesced': 0,
+            'batches': 0,
+            'errors': 0,
+        }
+        self.batch_histogram = {bucket: 0 for bucket in self.BATCH_BUCKETS}
+
+    async def embed(self, texts: List[str]) -> List[np.ndarray]:
+        """
+        Получить эмбеддинги текстов
+
+        Args:
+            texts: Список текстов
+
+        Returns:
+            Векторы в том же порядке
+        """
+        self.stats['requests'] += 1
+        self.stats['texts'] += len(texts)
+
+        if self.backend.is_local:
+            # Доли миллисекунды на текст - считаем сразу, без окна батчинга
+            return self.backend.embed(texts)
+
+        keys = [EmbeddingCache.make_key(self.model, text) for text in texts]
+        cached = self.cache.get_many(list(set(keys))) if self.cache else {}
+
+        loop = asyncio.get_running_loop()
+        futures: Dict[str, asyncio.Future] = {}
+
+        for key, text in zip(keys, texts):
+            if key in cached:
+                self.stats['cache_hits'] += 1
+                continue
+            if key in futures:
+                continue
+            self.stats['cache_misses'] += 1
+
+            future = self._inflight.get(key)
+            if future is not None:
+                # Такой же текст уже ждет эмбеддинга - не запрашиваем повторно
+                self.stats['coalesced'] += 1
+            else:
+                future = loop.create_future()
+                self._inflight[key] = future
+                self._pending.append((key, text, future))
+            futures[key] = future
+
+        if self._pending:
+            if len(self._pending) >= self.max_batch_size:
+                self._schedule_flush()
+            elif self._flush_handle is None:
+                self._flush_handle = loop.call_later(self.batch_window, self._schedule_flush)
+
+        resolved = dict(cached)
+        for key, future in futures.items():
+            resolved[key] = await future
+
+        return [resolved[key] for key in keys]
+
+    def _schedule_flush(self):
+        """Запускает отправку накопленного батча"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        while self._pending:
+            batch = self._pending[:self.max_batch_size]
+            self._pending = self._pending[self.max_batch_size:]
+            asyncio.ensure_future(self._flush(batch))
+
+    async def _flush(self, batch: List[tuple]):
+        """Один вызов API на весь батч"""
+        self.stats['batches'] += 1
+        size = len(batch)
+        bucket = next((b for b in self.BATCH_BUCKETS if size <= b), self.BATCH_BUCKETS[-1])
+        self.batch_histogram[bucket] += 1
+
+        texts = [text for _, text, _ in batch]
+        try:
+            vectors = await asyncio.to_thread(self.backend.embed, texts)
+            if self.cache:
+                await asyncio.to_thread(
+                    self.cache.put_many,
+                    {key: vec for (key, _, _), vec in zip(batch, vectors)}
+                )
+            for (key, _, future), vec in zip(batch, vectors):
+                if not future.done():
+                    future.set_result(vec)
+        except Exception as e:
+            self.stats['errors'] += 1
+            print(f"⚠️ Ошибка получения эмбеддингов ({size} шт.): {e}")
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            for key, _, _ in batch:
+                self._inflight.pop(key, None)
+
+    def get_stats(self) -> Dict:
+        """
+        Метрики сервиса
+
+        Returns:
+            Счетчики попаданий/промахов и гистограмма размеров батчей
+        """
+        lookups = self.stats['cache_hits'] + self.stats['cache_misses']
+        return {
+            **self.stats,
+            'model': self.model,
+            'hit_rate': round(self.stats['cache_hits'] / lookups * 100, 1) if lookups else 0,
+            'avg_batch_size': round(
+                (self.stats['cache_misses'] - self.stats['coalesced']) / self.stats['batches'], 1
+            ) if self.stats['batches'] else 0,
+            'batch_histogram': {f"≤{b}": n for b, n in self.batch_histogram.items() if n},
+            'cached_vectors': self.cache.count() if self.cache else 0,
+        }
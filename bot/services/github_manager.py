@@ -1,29 +1,69 @@
 """
 GitHub интеграция с реальным API
+
+Чтение идет через httpx с условными запросами (ETag / If-None-Match):
+ответ 304 не расходует лимит 5000 запросов в час. Запись (репозитории,
+файлы, коммиты) - через PyGithub в отдельном потоке.
 """
-from typing import Optional, Dict, List
-from github import Github, GithubException
+from typing import Optional, Dict, List, Tuple, Any, AsyncIterator
+from urllib.parse import quote
+import time
+import base64
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+from github import Github, GithubException, InputGitTreeElement
+
+from .async_cache import TTLCache
+
+
+class GitHubAPIError(Exception):
+    """Ошибка, которую вернул GitHub REST API"""
+
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
 
 
 class GitHubManager:
     """Менеджер GitHub с реальной интеграцией"""
     
-    def __init__(self, token: Optional[str] = None):
+    def __init__(
+        self,
+        token: Optional[str] = None,
+        base_url: str = "https://api.github.com",
+        etag_cache_size: int = 512,
+        timeout: float = 15.0
+    ):
         """
-        Инициализация менеджера
+        Инициализация менеджера (без сетевых запросов - пользователь
+        загружается при первом обращении)
         
         Args:
             token: GitHub personal access token
+            base_url: Адрес REST API (GitHub Enterprise - свой)
+            etag_cache_size: Сколько ответов хранить для условных запросов
+            timeout: Таймаут запроса (секунды)
         """
         self.token = token
+        self.base_url = base_url.rstrip('/')
         self.github = None
         self.user = None
+        self.timeout = httpx.Timeout(timeout, connect=5.0)
+        self._client: Optional[httpx.AsyncClient] = None
+        # url -> (etag, данные, следующая страница); ETag действителен, пока ресурс не изменился
+        self._etags = TTLCache(maxsize=etag_cache_size, ttl=24 * 3600)
+        self._login: Optional[str] = None
+        self.rate_limit: Dict[str, Any] = {}
+        self.stats = {'requests': 0, 'not_modified': 0}
         
         if token:
             try:
-                self.github = Github(token)
+                self.github = Github(token, base_url=self.base_url)
+                # Ленивый объект: запрос к /user будет только при обращении к полям
                 self.user = self.github.get_user()
-                print(f"✅ GitHub подключен: @{self.user.login}")
+                print("✅ GitHub подключен")
             except Exception as e:
                 print(f"⚠️ Ошибка подключения к GitHub: {e}")
                 self.github = None
@@ -33,6 +73,100 @@ class GitHubManager:
     def is_configured(self) -> bool:
         """Проверить настроен ли GitHub"""
         return self.github is not None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Общий HTTP клиент (создается при первом запросе, внутри event loop)"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers={
+                    'Authorization': f'Bearer {self.token}',
+                    'Accept': 'application/vnd.github+json',
+                    'X-GitHub-Api-Version': '2022-11-28',
+                },
+                timeout=self.timeout
+            )
+        return self._client
+
+    async def close(self):
+        """Закрыть соединения"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _update_rate_limit(self, headers: httpx.Headers):
+        """Остаток лимита из заголовков X-RateLimit-* (есть в каждом ответе)"""
+        if 'x-ratelimit-remaining' not in headers:
+            return
+        self.rate_limit = {
+            'limit': int(headers.get('x-ratelimit-limit', 0)),
+            'remaining': int(headers['x-ratelimit-remaining']),
+            'used': int(headers.get('x-ratelimit-used', 0)),
+            'reset': int(headers.get('x-ratelimit-reset', 0)),
+            'resource': headers.get('x-ratelimit-resource', 'core'),
+        }
+
+    async def _get(self, url: str, params: Optional[Dict] = None) -> Tuple[Any, Optional[str]]:
+        """
+        GET с условным запросом: если ресурс не изменился (304),
+        данные берутся из кеша, а лимит запросов не расходуется
+
+        Args:
+            url: Путь API (/user) или полный адрес следующей страницы
+            params: Параметры запроса
+
+        Returns:
+            (данные JSON, адрес следующей страницы или None)
+        """
+        request = self.client.build_request('GET', url, params=params)
+        key = str(request.url)
+        cached = self._etags.get(key)
+        if cached is not None:
+            request.headers['If-None-Match'] = cached[0]
+
+        response = await self.client.send(request)
+        self.stats['requests'] += 1
+        self._update_rate_limit(response.headers)
+
+        if response.status_code == 304 and cached is not None:
+            self.stats['not_modified'] += 1
+            return cached[1], cached[2]
+
+        if response.status_code >= 400:
+            try:
+                message = response.json().get('message', response.text)
+            except ValueError:
+                message = response.text or f'HTTP {response.status_code}'
+            if response.status_code in (403, 429) and self.rate_limit.get('remaining') == 0:
+                reset = time.strftime('%H:%M', time.localtime(self.rate_limit['reset']))
+                message = f'Исчерпан лимит запросов GitHub, сброс в {reset}'
+            raise GitHubAPIError(message, response.status_code)
+
+        data = response.json()
+        next_url = response.links.get('next', {}).get('url')
+        etag = response.headers.get('etag')
+        if etag:
+            self._etags.set(key, (etag, data, next_url))
+        return data, next_url
+
+    async def get_login(self) -> str:
+        """Логин владельца токена (запрашивается один раз)"""
+        if self._login is None:
+            data, _ = await self._get('/user')
+            self._login = data['login']
+        return self._login
+
+    async def _full_name(self, repo_name: str) -> str:
+        """repo -> username/repo"""
+        return repo_name if '/' in repo_name else f"{await self.get_login()}/{repo_name}"
+
+    @staticmethod
+    def _error(e: Exception) -> str:
+        """Текст ошибки GitHub API / PyGithub / сети"""
+        if isinstance(e, GithubException):
+            return e.data.get('message', str(e)) if isinstance(e.data, dict) else str(e)
+        return str(e) or type(e).__name__
     
     async def get_user_info(self) -> Dict:
         """
@@ -48,19 +182,71 @@ class GitHubManager:
             }
         
         try:
+            user, _ = await self._get('/user')
+            self._login = user['login']
             return {
                 'success': True,
-                'username': self.user.login,
-                'name': self.user.name or self.user.login,
-                'public_repos': self.user.public_repos,
-                'followers': self.user.followers,
-                'following': self.user.following
+                'username': user['login'],
+                'name': user.get('name') or user['login'],
+                'public_repos': user.get('public_repos', 0),
+                'followers': user.get('followers', 0),
+                'following': user.get('following', 0)
             }
-        except GithubException as e:
+        except (GitHubAPIError, httpx.HTTPError) as e:
             return {
                 'success': False,
-                'error': f'Ошибка GitHub API: {e.data.get("message", str(e))}'
+                'error': f'Ошибка GitHub API: {self._error(e)}'
             }
+
+    async def get_rate_limit(self) -> Dict:
+        """
+        Остаток лимита запросов (сам запрос /rate_limit лимит не расходует)
+        
+        Returns:
+            {'success', 'limit', 'remaining', 'used', 'reset', 'cache': {...}}
+        """
+        if not self.is_configured():
+            return {
+                'success': False,
+                'error': 'GitHub не настроен'
+            }
+        
+        try:
+            response = await self.client.get('/rate_limit')
+            response.raise_for_status()
+            core = response.json()['resources']['core']
+            self.rate_limit = {**core, 'resource': 'core'}
+        except (httpx.HTTPError, KeyError, ValueError) as e:
+            if not self.rate_limit:
+                return {
+                    'success': False,
+                    'error': f'Ошибка: {self._error(e)}'
+                }
+            # Последнее известное значение из заголовков ответов
+        
+        return {
+            'success': True,
+            **self.rate_limit,
+            'cache': {
+                **self.stats,
+                'entries': len(self._etags),
+            }
+        }
+
+    async def iter_repositories(self, per_page: int = 30) -> AsyncIterator[Dict]:
+        """
+        Репозитории пользователя постранично: следующая страница
+        запрашивается, только когда до нее дошли
+        
+        Args:
+            per_page: Размер страницы (до 100)
+        """
+        url, params = '/user/repos', {'per_page': min(per_page, 100), 'sort': 'updated'}
+        while url:
+            page, url = await self._get(url, params)
+            params = None  # В ссылке на следующую страницу параметры уже есть
+            for repo in page:
+                yield repo
     
     async def list_repositories(self, limit: int = 10) -> Dict:
         """
@@ -80,26 +266,28 @@ class GitHubManager:
         
         try:
             repos = []
-            for repo in self.user.get_repos()[:limit]:
+            async for repo in self.iter_repositories(per_page=limit):
                 repos.append({
-                    'name': repo.name,
-                    'full_name': repo.full_name,
-                    'description': repo.description or 'Нет описания',
-                    'private': repo.private,
-                    'stars': repo.stargazers_count,
-                    'forks': repo.forks_count,
-                    'url': repo.html_url
+                    'name': repo['name'],
+                    'full_name': repo['full_name'],
+                    'description': repo.get('description') or 'Нет описания',
+                    'private': repo['private'],
+                    'stars': repo.get('stargazers_count', 0),
+                    'forks': repo.get('forks_count', 0),
+                    'url': repo['html_url']
                 })
+                if len(repos) >= limit:
+                    break
             
             return {
                 'success': True,
                 'repositories': repos,
                 'count': len(repos)
             }
-        except GithubException as e:
+        except (GitHubAPIError, httpx.HTTPError) as e:
             return {
                 'success': False,
-                'error': f'Ошибка: {e.data.get("message", str(e))}'
+                'error': f'Ошибка: {self._error(e)}'
             }
     
     async def create_repository(
@@ -126,7 +314,9 @@ class GitHubManager:
             }
         
         try:
-            repo = self.user.create_repo(
+            # PyGithub блокирующий - не держим event loop
+            repo = await asyncio.to_thread(
+                self.user.create_repo,
                 name=name,
                 description=description,
                 private=private,
@@ -139,10 +329,10 @@ class GitHubManager:
                 'url': repo.html_url,
                 'message': f'Репозиторий {repo.full_name} создан!'
             }
-        except GithubException as e:
+        except (GithubException, GitHubAPIError, httpx.HTTPError) as e:
             return {
                 'success': False,
-                'error': f'Ошибка: {e.data.get("message", str(e))}'
+                'error': f'Ошибка: {self._error(e)}'
             }
     
     async def create_file(
@@ -171,12 +361,13 @@ class GitHubManager:
             }
         
         try:
-            repo = self.github.get_repo(repo_name)
-            result = repo.create_file(
-                path=file_path,
-                message=commit_message,
-                content=content
-            )
+            full_name = await self._full_name(repo_name)
+            
+            def create():
+                repo = self.github.get_repo(full_name, lazy=True)
+                return repo.create_file(path=file_path, message=commit_message, content=content)
+            
+            result = await asyncio.to_thread(create)
             
             return {
                 'success': True,
@@ -185,12 +376,195 @@ class GitHubManager:
                 'url': result['content'].html_url,
                 'message': f'Файл {file_path} создан!'
             }
-        except GithubException as e:
+        except (GithubException, GitHubAPIError, httpx.HTTPError) as e:
             return {
                 'success': False,
-                'error': f'Ошибка: {e.data.get("message", str(e))}'
+                'error': f'Ошибка: {self._error(e)}'
             }
     
+    async def _read_file(self, full_name: str, path: str) -> Optional[str]:
+        try:
+            data, _ = await self._get(f"/repos/{full_name}/contents/{quote(path)}")
+        except GitHubAPIError as e:
+            if e.status == 404:
+                return None
+            raise
+        return base64.b64decode(data.get('content', '')).decode('utf-8')
+
+    async def read_files(self, repo_name: str, paths: List[str]) -> Dict:
+        """
+        Содержимое нескольких файлов репозитория (параллельно, с условными запросами)
+
+        Args:
+            repo_name: Название репозитория (repo или username/repo)
+            paths: Пути к файлам
+
+        Returns:
+            {'success': True, 'files': {путь: текст или None, если файла нет}}
+        """
+        if not self.is_configured():
+            return {
+                'success': False,
+                'error': 'GitHub не настроен'
+            }
+        if not paths:
+            return {'success': True, 'files': {}}
+
+        try:
+            full_name = await self._full_name(repo_name)
+            contents = await asyncio.gather(*[self._read_file(full_name, path) for path in paths])
+            return {'success': True, 'files': dict(zip(paths, contents))}
+        except (GitHubAPIError, httpx.HTTPError) as e:
+            return {
+                'success': False,
+                'error': f'Ошибка: {self._error(e)}'
+            }
+
+    def _push_files_sync(
+        self,
+        full_name: str,
+        files: Dict[str, str],
+        commit_message: str,
+        description: str,
+        private: bool
+    ) -> Dict:
+        """Blob-ы -> дерево -> коммит -> перенос ветки (блокирующие вызовы PyGithub)"""
+        try:
+            repo = self.github.get_repo(full_name)
+        except GithubException as e:
+            if e.status != 404:
+                raise
+            # auto_init: у пустого репозитория нет ветки, к которой можно привязать коммит
+            repo = self.user.create_repo(
+                name=full_name.split('/', 1)[1],
+                description=description,
+                private=private,
+                auto_init=True
+            )
+
+        branch = repo.default_branch
+        ref = repo.get_git_ref(f"heads/{branch}")
+        base_commit = repo.get_git_commit(ref.object.sha)
+
+        # Blob-ы независимы - создаем параллельно, коммит все равно один
+        paths = list(files)
+        with ThreadPoolExecutor(max_workers=min(8, len(paths))) as pool:
+            blobs = list(pool.map(lambda path: repo.create_git_blob(files[path], 'utf-8'), paths))
+        elements = [
+            InputGitTreeElement(path=path, mode='100644', type='blob', sha=blob.sha)
+            for path, blob in zip(paths, blobs)
+        ]
+
+        tree = repo.create_git_tree(elements, base_tree=base_commit.tree)
+        commit = repo.create_git_commit(commit_message, tree, [base_commit])
+        ref.edit(commit.sha)
+
+        return {
+            'success': True,
+            'name': repo.name,
+            'full_name': repo.full_name,
+            'url': repo.html_url,
+            'branch': branch,
+            'commit': commit.sha[:7],
+            'files': paths,
+            'message': f'{len(files)} файлов отправлено одним коммитом в {repo.full_name}'
+        }
+
+    async def push_files(
+        self,
+        repo_name: str,
+        files: Dict[str, str],
+        commit_message: str,
+        description: str = "",
+        private: bool = False
+    ) -> Dict:
+        """
+        Отправка нескольких файлов одним коммитом через Git Data API
+        (репозиторий создается, если его еще нет)
+
+        Args:
+            repo_name: Название репозитория (repo или username/repo)
+            files: Путь -> содержимое файла
+            commit_message: Сообщение коммита
+            description: Описание нового репозитория
+            private: Приватный ли новый репозиторий
+
+        Returns:
+            Результат операции
+        """
+        if not self.is_configured():
+            return {
+                'success': False,
+                'error': 'GitHub не настроен'
+            }
+        if not files:
+            return {
+                'success': False,
+                'error': 'Нет файлов для отправки'
+            }
+
+        try:
+            full_name = await self._full_name(repo_name)
+            return await asyncio.to_thread(
+                self._push_files_sync, full_name, files, commit_message, description, private
+            )
+        except (GithubException, GitHubAPIError, httpx.HTTPError) as e:
+            return {
+                'success': False,
+                'error': f'Ошибка: {self._error(e)}'
+            }
+
+    async def download_tarball(
+        self,
+        repo_name: str,
+        ref: Optional[str] = None,
+        max_bytes: int = 50 * 1024 * 1024
+    ) -> Dict:
+        """
+        Архив репозитория одним запросом (вместо обхода дерева по файлам)
+        
+        Args:
+            repo_name: Название репозитория (repo или username/repo)
+            ref: Ветка, тег или коммит (по умолчанию - основная ветка)
+            max_bytes: Максимальный размер архива
+            
+        Returns:
+            {'success': True, 'data': bytes (tar.gz), 'full_name': ...}
+        """
+        if not self.is_configured():
+            return {
+                'success': False,
+                'error': 'GitHub не настроен'
+            }
+        
+        try:
+            full_name = await self._full_name(repo_name)
+            url = f"/repos/{full_name}/tarball" + (f"/{quote(ref)}" if ref else '')
+            # Ответ - редирект на codeload.github.com
+            async with self.client.stream('GET', url, follow_redirects=True) as response:
+                self.stats['requests'] += 1
+                self._update_rate_limit(response.history[0].headers if response.history else response.headers)
+                if response.status_code >= 400:
+                    await response.aread()
+                    try:
+                        message = response.json().get('message', response.text)
+                    except ValueError:
+                        message = f'HTTP {response.status_code}'
+                    raise GitHubAPIError(message, response.status_code)
+                
+                data = bytearray()
+                async for block in response.aiter_bytes():
+                    data += block
+                    if len(data) > max_bytes:
+                        raise GitHubAPIError(f'Архив больше {max_bytes // (1024 * 1024)} MB')
+            
+            return {'success': True, 'data': bytes(data), 'full_name': full_name}
+        except (GitHubAPIError, httpx.HTTPError) as e:
+            return {
+                'success': False,
+                'error': f'Ошибка: {self._error(e)}'
+            }
+
     async def get_repository_info(self, repo_name: str) -> Dict:
         """
         Информация о репозитории
@@ -208,24 +582,24 @@ class GitHubManager:
             }
         
         try:
-            repo = self.github.get_repo(repo_name)
+            repo, _ = await self._get(f"/repos/{await self._full_name(repo_name)}")
             
             return {
                 'success': True,
-                'name': repo.name,
-                'full_name': repo.full_name,
-                'description': repo.description or 'Нет описания',
-                'private': repo.private,
-                'stars': repo.stargazers_count,
-                'forks': repo.forks_count,
-                'watchers': repo.watchers_count,
-                'language': repo.language,
-                'url': repo.html_url,
-                'created_at': repo.created_at.strftime('%Y-%m-%d'),
-                'updated_at': repo.updated_at.strftime('%Y-%m-%d')
+                'name': repo['name'],
+                'full_name': repo['full_name'],
+                'description': repo.get('description') or 'Нет описания',
+                'private': repo['private'],
+                'stars': repo.get('stargazers_count', 0),
+                'forks': repo.get('forks_count', 0),
+                'watchers': repo.get('subscribers_count', repo.get('watchers_count', 0)),
+                'language': repo.get('language'),
+                'url': repo['html_url'],
+                'created_at': repo['created_at'][:10],
+                'updated_at': repo['updated_at'][:10]
             }
-        except GithubException as e:
+        except (GitHubAPIError, httpx.HTTPError) as e:
             return {
                 'success': False,
-                'error': f'Ошибка: {e.data.get("message", str(e))}'
+                'error': f'Ошибка: {self._error(e)}'
             }
@@ -0,0 +1,270 @@
+"""
+Фоновая инкрементальная синхронизация постов и метрик нашего Instagram
+в локальную БД (временной ряд лайков/комментариев)
+"""
+from typing import Optional, Dict, List
+from datetime import datetime, timedelta, timezone
+from collections import OrderedDict
+import asyncio
+
+
+class InstagramSyncService:
+    """Синхронизация медиа аккаунта и чтение данных для анализа"""
+
+    def __init__(
+        self,
+        db,
+        social,
+        interval: float = 3600,
+        refresh_days: int = 7,
+        backfill_limit: int = 300,
+        page_size: int = 33
+    ):
+        """
+        Инициализация
+
+        Args:
+            db: DatabaseRepository
+            social: SocialMediaManager (клиент instagrapi и пул потоков)
+            interval: Период синхронизации (секунды)
+            refresh_days: За сколько дней обновлять метрики уже известных постов
+            backfill_limit: Сколько постов загрузить при первой синхронизации
+            page_size: Размер страницы запроса медиа
+        """
+        self.db = db
+        self.social = social
+        self.interval = interval
+        self.refresh_days = refresh_days
+        self.backfill_limit = backfill_limit
+        self.page_size = page_size
+
+        self.last_result: Optional[Dict] = None
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def owner_pk(self) -> Optional[str]:
+        """pk нашего аккаунта - берется из сессии, без запроса к API"""
+        client = self.social.instagram_client
+        try:
+            return str(client.user_id) if client and client.user_id else None
+        except Exception:
+            return None
+
+    @staticmethod
+    def _media_to_dict(media) -> Dict:
+        taken_at = media.taken_at
+        if taken_at and taken_at.tzinfo is None:
+            taken_at = taken_at.replace(tzinfo=timezone.utc)
+        return {
+            'media_pk': str(media.pk),
+            'code': media.code,
+            'media_type': media.media_type,
+            'product_type': media.product_type or None,
+            'caption': media.caption_text or '',
+            'taken_at': taken_at,
+            'like_count': media.like_count or 0,
+            'comment_count': media.comment_count or 0,
+            'view_count': int(media.view_count or media.play_count or 0),
+        }
+
+    def _fetch(self, owner_pk: str, since: Optional[datetime]) -> List[Dict]:
+        """
+        Синхронно листает ленту аккаунта от новых к старым (выполняется в пуле)
+
+        Args:
+            owner_pk: pk аккаунта
+            since: Граница: всё новее нее - новые посты или посты с обновляемыми
+                метриками; None - первая синхронизация (загрузка истории)
+
+        Returns:
+            Посты в виде словарей
+        """
+        client = self.social.instagram_client
+        collected = []
+        cursor = ''
+
+        while True:
+            medias, cursor = client.user_medias_paginated_v1(
+                owner_pk, amount=self.page_size, end_cursor=cursor
+            )
+            reached_known = False
+            for media in medias:
+                data = self._media_to_dict(media)
+                if since and data['taken_at'] and data['taken_at'] < since:
+                    reached_known = True
+                    break
+                collected.append(data)
+
+            if reached_known or not cursor or not medias:
+                break
+            if since is None and len(collected) >= self.backfill_limit:
+                break
+
+        return collected
+
+    async def sync(self) -> Dict:
+        """
+        Одна инкрементальная синхронизация
+
+        Returns:
+            {'success': bool, 'fetched': ..., 'new': ..., 'snapshots': ...}
+        """
+        if not self.social.instagram_available:
+            return {'success': False, 'error': 'Instagram не подключен'}
+
+        owner_pk = self.owner_pk
+        if not owner_pk:
+            return {'success': False, 'error': 'Нет pk аккаунта в сессии'}
+
+        async with self._lock:
+            try:
+                now = datetime.now(timezone.utc)
+                latest = await asyncio.to_thread(self.db.get_instagram_latest_taken_at, owner_pk)
+                if latest is not None:
+                    if latest.tzinfo is None:
+                        latest = latest.replace(tzinfo=timezone.utc)
+                    # Новые посты + свежие посты, у которых еще растут метрики
+                    since = min(latest, now - timedelta(days=self.refresh_days))
+                else:
+                    since = None
+
+                medias = await self.social.instagram_executor.run(
+                    self.social.instagram_lane, self._fetch, owner_pk, since
+                )
+                saved = await asyncio.to_thread(self.db.save_instagram_media, owner_pk, medias, now)
+
+                self.last_result = {
+                    'success': True,
+                    'fetched': len(medias),
+                    'at': now,
+                    **saved
+                }
+                print(
+                    f"📸 Instagram синхронизирован: загружено {len(medias)}, "
+                    f"новых {saved['new']}, срезов метрик {saved['snapshots']}"
+                )
+            except Exception as e:
+                self.last_result = {'success': False, 'error': str(e), 'at': datetime.now(timezone.utc)}
+                print(f"⚠️ Ошибка синхронизации Instagram: {e}")
+
+        return self.last_result
+
+    async def start(self, wait_for: Optional[asyncio.Task] = None):
+        """
+        Запуск фоновой синхронизации
+
+        Args:
+            wait_for: Задача подключения к Instagram, которую нужно дождаться
+        """
+        if self._task:
+            return
+        self._task = asyncio.create_task(self._run(wait_for))
+        print(f"✅ Синхронизация Instagram запущена (раз в {int(self.interval // 60)} мин)")
+
+    async def stop(self):
+        """Остановка фоновой синхронизации"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self, wait_for: Optional[asyncio.Task]):
+        if wait_for is not None:
+            try:
+                await wait_for
+            except Exception:
+                pass
+
+        while True:
+            if self.social.instagram_available:
+                await self.sync()
+            await asyncio.sleep(self.interval)
+
+    async def get_posts(self, limit: int = 100, live_limit: int = 5) -> Dict:
+        """
+        Посты для анализа: из локального хранилища, а если оно пустое - живой запрос
+
+        Args:
+            limit: Максимум постов из хранилища
+            live_limit: Сколько постов запросить вживую
+
+        Returns:
+            Результат в формате get_my_posts плюс поле source ('local' | 'live')
+        """
+        owner_pk = self.owner_pk
+        if owner_pk:
+            medias = await asyncio.to_thread(self.db.get_instagram_media, owner_pk, limit)
+            if medias:
+                return {
+                    'success': True,
+                    'source': 'local',
+                    'username': self.social.my_username,
+                    'posts': [
+                        {
+                            'id': m['media_pk'],
+                            'caption': m['caption'],
+                            'likes': m['like_count'],
+                            'comments': m['comment_count'],
+                            'type': m['media_type'],
+                            'taken_at': m['taken_at'],
+                            'url': f"https://instagram.com/p/{m['code']}",
+                        }
+                        for m in medias
+                    ]
+                }
+
+        result = await self.social.get_my_posts(limit=live_limit)
+        result['source'] = 'live'
+        return result
+
+    @staticmethod
+    def format_for_analysis(result: Dict, detailed: int = 15) -> str:
+        """
+        Текстовая выжимка для GPT: последние посты подробно и помесячный тренд
+
+        Args:
+            result: Результат get_posts
+            detailed: Сколько последних постов описать подробно
+
+        Returns:
+            Текст с данными
+        """
+        posts = result['posts']
+        lines = [
+            f"Post {i+1} [{p['type']}]: ❤️ {p['likes']} likes, 💬 {p['comments']} comments.\n"
+            f"Текст: {p['caption'][:200]}..."
+            for i, p in enumerate(posts[:detailed])
+        ]
+        text = "\n---\n".join(lines)
+
+        months = OrderedDict()
+        for p in posts:
+            if not p.get('taken_at'):
+                continue
+            month = p['taken_at'].strftime('%Y-%m')
+            bucket = months.setdefault(month, [0, 0, 0])
+            bucket[0] += 1
+            bucket[1] += p['likes']
+            bucket[2] += p['comments']
+
+        if len(months) > 1:
+            trend = "\n".join(
+                f"{month}: постов {n}, в среднем ❤️ {likes / n:.0f}, 💬 {comments / n:.1f}"
+                for month, (n, likes, comments) in reversed(months.items())
+            )
+            text += f"\n\nДинамика по месяцам ({len(posts)} постов):\n{trend}"
+
+        return text
+
+    def get_status(self) -> Dict:
+        """Состояние синхронизации и объем хранилища"""
+        owner_pk = self.owner_pk
+        return {
+            'running': self._task is not None,
+            'last_result': self.last_result,
+            'store': self.db.get_instagram_store_stats(owner_pk) if owner_pk else None,
+        }
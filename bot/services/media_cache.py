@@ -0,0 +1,287 @@
+"""
+Кеш медиа из Telegram: файлы по file_unique_id на диске с LRU-вытеснением
+и подготовка изображений под Instagram в пуле процессов
+"""
+from typing import Optional, Dict, Callable, Awaitable
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+import os
+import re
+import asyncio
+
+
+# Instagram принимает соотношения сторон от 4:5 (портрет) до 1.91:1 (пейзаж)
+INSTAGRAM_MIN_RATIO = 4 / 5
+INSTAGRAM_MAX_RATIO = 1.91
+
+
+def prepare_instagram_image(src_path: str, dst_path: str, max_width: int = 1080, quality: int = 88) -> Dict:
+    """
+    Подогнать изображение под Instagram: поворот по EXIF, обрезка по центру
+    до допустимого соотношения сторон, уменьшение и JPEG
+
+    Выполняется в отдельном процессе (функция уровня модуля - сериализуема).
+
+    Args:
+        src_path: Исходный файл
+        dst_path: Куда сохранить результат
+        max_width: Максимальная ширина
+        quality: Качество JPEG
+
+    Returns:
+        Размеры результата
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(src_path) as img:
+        img = ImageOps.exif_transpose(img).convert('RGB')
+        width, height = img.size
+        ratio = width / height
+
+        if ratio < INSTAGRAM_MIN_RATIO:
+            new_height = int(width / INSTAGRAM_MIN_RATIO)
+            top = (height - new_height) // 2
+            img = img.crop((0, top, width, top + new_height))
+        elif ratio > INSTAGRAM_MAX_RATIO:
+            new_width = int(height * INSTAGRAM_MAX_RATIO)
+            left = (width - new_width) // 2
+            img = img.crop((left, 0, left + new_width, height))
+
+        if img.width > max_width:
+            img = img.resize((max_width, round(img.height * max_width / img.width)), Image.LANCZOS)
+
+        tmp_path = dst_path + '.tmp'
+        img.save(tmp_path, 'JPEG', quality=quality, optimize=True, progressive=True)
+        os.replace(tmp_path, dst_path)
+        return {'width': img.width, 'height': img.height, 'size': os.path.getsize(dst_path)}
+
+
+class MediaCache:
+    """Дисковый кеш файлов Telegram с ограничением по размеру"""
+
+    def __init__(
+        self,
+        root_dir: str,
+        max_bytes: int = 500 * 1024 * 1024,
+        process_workers: int = 2,
+        instagram_width: int = 1080
+    ):
+        """
+        Инициализация кеша
+
+        Args:
+            root_dir: Каталог кеша
+            max_bytes: Максимальный суммарный размер файлов
+            process_workers: Процессов для обработки изображений
+            instagram_width: Ширина изображений для Instagram
+        """
+        self.root_dir = root_dir
+        self.max_bytes = max_bytes
+        self.process_workers = process_workers
+        self.instagram_width = instagram_width
+
+        self._entries: "OrderedDict[str, int]" = OrderedDict()  # путь -> размер, от старых к новым
+        self._total = 0
+        self._pins: Dict[str, int] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+        self.stats = {'hits': 0, 'misses': 0, 'downloads': 0, 'processed': 0, 'evictions': 0}
+
+        for sub in ('original', 'instagram'):
+            os.makedirs(os.path.join(root_dir, sub), exist_ok=True)
+        self._load()
+
+    def _load(self):
+        """Восстанавливает индекс с диска (порядок LRU - по времени доступа)"""
+        files = []
+        for sub in ('original', 'instagram'):
+            directory = os.path.join(self.root_dir, sub)
+            for name in os.listdir(directory):
+                path = os.path.join(directory, name)
+                if name.endswith('.tmp'):
+                    os.remove(path)
+                    continue
+                stat = os.stat(path)
+                files.append((stat.st_mtime, path, stat.st_size))
+        for _, path, size in sorted(files):
+            self._entries[path] = size
+            self._total += size
+
+    @staticmethod
+    def _safe_key(key: str) -> str:
+        return re.sub(r'[^\w-]', '_', key)
+
+    def _path(self, kind: str, key: str) -> str:
+        return os.path.join(self.root_dir, kind, f"{self._safe_key(key)}.jpg")
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.process_workers)
+        return self._pool
+
+    def _touch(self, path: str):
+        self._entries.move_to_end(path)
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def _add(self, path: str):
+        size = os.path.getsize(path)
+        self._total += size - self._entries.get(path, 0)
+        self._entries[path] = size
+        self._entries.move_to_end(path)
+        # Только что созданный файл сейчас получит вызывающий - его не трогаем
+        self._evict(keep=path)
+
+    def _evict(self, keep: Optional[str] = None):
+        """Удаляет давно не использованные файлы, пока кеш больше лимита"""
+        for path in list(self._entries):
+            if self._total <= self.max_bytes:
+                break
+            if self._pins.get(path) or path == keep:
+                continue
+            size = self._entries.pop(path)
+            self._total -= size
+            self.stats['evictions'] += 1
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    async def _single_flight(self, path: str, produce: Callable[[], Awaitable[None]]) -> str:
+        """Создает файл один раз, даже если его одновременно запросили несколько задач"""
+        if path in self._entries and os.path.exists(path):
+            self.stats['hits'] += 1
+            self._touch(path)
+            return path
+
+        future = self._inflight.get(path)
+        if future is not None:
+            self.stats['hits'] += 1
+            await asyncio.shield(future)
+            return path
+
+        self.stats['misses'] += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[path] = future
+        try:
+            await produce()
+            self._add(path)
+            future.set_result(path)
+            return path
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Ошибку уже получил вызывающий - не даем ей всплыть как "не прочитанную"
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(path, None)
+
+    async def get_original(self, bot, file_id: str, file_unique_id: Optional[str] = None) -> str:
+        """
+        Путь к исходному файлу (скачивается из Telegram только при промахе)
+
+        Args:
+            bot: Telegram Bot
+            file_id: file_id для скачивания
+            file_unique_id: Постоянный ключ файла (по умолчанию - file_id)
+
+        Returns:
+            Путь к файлу в кеше
+        """
+        path = self._path('original', file_unique_id or file_id)
+
+        async def download():
+            file = await bot.get_file(file_id)
+            tmp_path = path + '.tmp'
+            await file.download_to_drive(tmp_path)
+            os.replace(tmp_path, path)
+            self.stats['downloads'] += 1
+
+        return await self._single_flight(path, download)
+
+    async def get_instagram_image(self, bot, file_id: str, file_unique_id: Optional[str] = None) -> str:
+        """
+        Путь к изображению, подготовленному для Instagram
+
+        Args:
+            bot: Telegram Bot
+            file_id: file_id для скачивания
+            file_unique_id: Постоянный ключ файла
+
+        Returns:
+            Путь к JPEG в кеше
+        """
+        key = file_unique_id or file_id
+        path = self._path('instagram', key)
+
+        async def process():
+            original = await self.get_original(bot, file_id, file_unique_id)
+            self._pins[original] = self._pins.get(original, 0) + 1
+            try:
+                loop = asyncio.get_running_loop()
+                info = await loop.run_in_executor(
+                    self.pool, prepare_instagram_image, original, path, self.instagram_width
+                )
+            finally:
+                self._unpin(original)
+            self.stats['processed'] += 1
+            print(
+                f"🖼 Подготовлено для Instagram: {info['width']}x{info['height']}, "
+                f"{os.path.getsize(original) // 1024} KB → {info['size'] // 1024} KB"
+            )
+
+        return await self._single_flight(path, process)
+
+    def _unpin(self, path: str):
+        self._pins[path] -= 1
+        if not self._pins[path]:
+            del self._pins[path]
+
+    @asynccontextmanager
+    async def use(self, path_coro: Awaitable[str]):
+        """
+        Использовать файл кеша: пока блок выполняется, файл не будет вытеснен
+
+        Пример:
+            async with media_cache.use(media_cache.get_original(bot, file_id, uid)) as path:
+                ...
+        """
+        path = await path_coro
+        self._pins[path] = self._pins.get(path, 0) + 1
+        try:
+            yield path
+        finally:
+            self._unpin(path)
+            self._evict()
+
+    def prefetch(self, bot, file_id: str, file_unique_id: Optional[str] = None) -> asyncio.Task:
+        """Заранее скачать и подготовить изображение для Instagram (в фоне)"""
+        async def run():
+            try:
+                await self.get_instagram_image(bot, file_id, file_unique_id)
+            except Exception as e:
+                print(f"⚠️ Не удалось подготовить медиа {file_unique_id or file_id}: {e}")
+        return asyncio.create_task(run())
+
+    def get_stats(self) -> Dict:
+        """Метрики кеша"""
+        return {
+            **self.stats,
+            'files': len(self._entries),
+            'size_mb': round(self._total / 1024 / 1024, 1),
+            'max_mb': round(self.max_bytes / 1024 / 1024, 1),
+        }
+
+    def shutdown(self):
+        """Остановить пул процессов"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
@@ -4,60 +4,72 @@
 from typing import Optional, List, Dict
 import os
 import json
+import hashlib
 
 
 class MemoryService:
     """Сервис долгосрочной памяти"""
     
-    def __init__(self, openai_api_key: Optional[str] = None):
+    def __init__(
+        self,
+        openai_api_key: Optional[str] = None,
+        storage_dir: str = "data/memory",
+        embeddings=None
+    ):
         """
         Инициализация сервиса памяти
         
         Args:
             openai_api_key: OpenAI API ключ для embeddings
+            storage_dir: Каталог персистентного векторного хранилища
+            embeddings: EmbeddingService (если не передан - создается свой на OpenAI)
         """
         self.openai_api_key = openai_api_key
-        self.is_available = openai_api_key is not None
-        self.collection = None
+        self.is_available = openai_api_key is not None or embeddings is not None
+        self.store = None
+        self.embeddings = embeddings
         
         if self.is_available:
             try:
-                import chromadb
-                from chromadb.config import Settings
-                from chromadb.utils import embedding_functions
-                
-                # Используем OpenAI для эмбеддингов (чтобы не качать модели локально)
-                openai_ef = embedding_functions.OpenAIEmbeddingFunction(
-                    api_key=self.openai_api_key,
-                    model_name="text-embedding-3-small"
-                )
+                from bot.services.vector_store import VectorStore
                 
-                # Инициализация ChromaDB
-                self.client = chromadb.Client(Settings(
-                    anonymized_telemetry=False,
-                    allow_reset=True
-                ))
+                if self.embeddings is None:
+                    from openai import OpenAI
+                    from bot.services.embeddings import EmbeddingService, OpenAIEmbeddingBackend
+                    
+                    # Используем OpenAI для эмбеддингов (чтобы не качать модели локально)
+                    self.embeddings = EmbeddingService(
+                        OpenAIEmbeddingBackend(OpenAI(api_key=self.openai_api_key)),
+                        cache_path=os.path.join(storage_dir, 'embeddings.sqlite3')
+                    )
                 
-                # Создаем коллекцию с явной функцией эмбеддинга
-                self.collection = self.client.get_or_create_collection(
-                    name="user_memories",
-                    embedding_function=openai_ef,
-                    metadata={"description": "Long-term user memories"}
-                )
+                # Хранилище на диске: переживает рестарты, партиция на пользователя.
+                # У каждой модели эмбеддингов свое пространство векторов
+                backend = self.embeddings.backend
+                self.store = VectorStore(os.path.join(storage_dir, backend.slug))
                 
-                print("✅ Долгосрочная память инициализирована (ChromaDB + OpenAI)")
+                print(f"✅ Долгосрочная память инициализирована ({storage_dir} + {backend.name})")
             except ImportError as e:
-                # ChromaDB не установлен - это нормально, память просто не будет работать
-                print("ℹ️ ChromaDB не установлен - долгосрочная память отключена (опциональная функция)")
-                print("   Для включения: pip install chromadb>=0.4.22")
+                # NumPy не установлен - это нормально, память просто не будет работать
+                print("ℹ️ NumPy не установлен - долгосрочная память отключена (опциональная функция)")
+                print("   Для включения: pip install numpy")
                 self.is_available = False
-                self.collection = None
+                self.store = None
             except Exception as e:
                 print(f"⚠️ Ошибка инициализации памяти: {e}")
                 self.is_available = False
-                self.collection = None
+                self.store = None
         else:
-            print("ℹ️ Память недоступна - нужен OPENAI_API_KEY")
+            print("ℹ️ Память недоступна - нужен OPENAI_API_KEY или EMBEDDING_BACKEND=local")
+    
+    async def _embed(self, texts: List[str]) -> List:
+        """Получить эмбеддинги для списка текстов (батчинг + кеш)"""
+        return await self.embeddings.embed(texts)
+    
+    @staticmethod
+    def _memory_id(category: str, fact: str) -> str:
+        """ID по хешу содержимого: одинаковый факт не дублируется"""
+        return hashlib.sha256(f"{category}\n{fact}".encode('utf-8')).hexdigest()[:32]
     
     async def remember(
         self,
@@ -83,28 +95,30 @@ class MemoryService:
             }
         
         try:
-            if not self.collection:
+            if not self.store:
                 return {
                     'success': False,
-                    'error': 'Память недоступна (ChromaDB не установлен)'
+                    'error': 'Память недоступна (хранилище не инициализировано)'
                 }
             
-            # Создаем уникальный ID
-            memory_id = f"{user_id}_{category}_{len(fact)}"
+            # ID по хешу содержимого (upsert вместо дубликатов)
+            memory_id = self._memory_id(category, fact)
             
-            # Сохраняем в ChromaDB
-            self.collection.add(
+            # Сохраняем в партицию пользователя
+            added = self.store.upsert(
+                partition=str(user_id),
+                ids=[memory_id],
                 documents=[fact],
                 metadatas=[{
                     "user_id": str(user_id),
                     "category": category
                 }],
-                ids=[memory_id]
+                embeddings=await self._embed([fact])
             )
             
             return {
                 'success': True,
-                'message': f'Запомнил: {fact[:50]}...'
+                'message': f'Запомнил: {fact[:50]}...' if added else f'Уже помню: {fact[:50]}...'
             }
             
         except Exception as e:
@@ -139,46 +153,42 @@ class MemoryService:
             }
         
         try:
-            if not self.collection:
+            if not self.store:
                 return {
                     'success': False,
-                    'error': 'Память недоступна (ChromaDB не установлен)',
+                    'error': 'Память недоступна (хранилище не инициализировано)',
                     'memories': []
                 }
             
-            # Фильтр по пользователю
-            where_filter = {"user_id": str(user_id)}
+            # Фильтр внутри партиции пользователя
+            where_filter = {}
             
             if category:
                 where_filter["category"] = category
             
             if query:
                 # Семантический поиск
-                results = self.collection.query(
-                    query_texts=[query],
+                results = self.store.query(
+                    partition=str(user_id),
+                    embedding=(await self._embed([query]))[0],
                     where=where_filter,
-                    n_results=limit
+                    limit=limit
                 )
             else:
-                # Получить все факты
-                results = self.collection.get(
+                # Последние факты (новые первыми)
+                results = self.store.get(
+                    partition=str(user_id),
                     where=where_filter,
                     limit=limit
                 )
             
-            memories = []
-            if query:
-                for doc, meta in zip(results['documents'][0], results['metadatas'][0]):
-                    memories.append({
-                        'fact': doc,
-                        'category': meta.get('category', 'general')
-                    })
-            else:
-                for doc, meta in zip(results['documents'], results['metadatas']):
-                    memories.append({
-                        'fact': doc,
-                        'category': meta.get('category', 'general')
-                    })
+            memories = [
+                {
+                    'fact': record['document'],
+                    'category': record['metadata'].get('category', 'general')
+                }
+                for record in results
+            ]
             
             return {
                 'success': True,
@@ -211,26 +221,23 @@ class MemoryService:
             }
         
         try:
-            if not self.collection:
+            if not self.store:
                 return {
                     'success': False,
-                    'error': 'Память недоступна (ChromaDB не установлен)'
+                    'error': 'Память недоступна (хранилище не инициализировано)'
                 }
             
-            where_filter = {"user_id": str(user_id)}
+            where_filter = {}
             
             if category:
                 where_filter["category"] = category
             
-            # Получаем ID для удаления
-            results = self.collection.get(where=where_filter)
+            deleted = self.store.delete(partition=str(user_id), where=where_filter)
             
-            if results['ids']:
-                self.collection.delete(ids=results['ids'])
-                
+            if deleted:
                 return {
                     'success': True,
-                    'message': f'Забыл {len(results["ids"])} фактов'
+                    'message': f'Забыл {deleted} фактов'
                 }
             else:
                 return {
@@ -0,0 +1,120 @@
+"""
+Возобновляемая загрузка больших файлов по частям: чтение с диска кусками
+фиксированного размера, повтор упавшего куска, прогресс
+"""
+from typing import Optional, Callable, Awaitable, Any
+import os
+import asyncio
+import inspect
+
+import httpx
+
+
+class UploadError(Exception):
+    """Загрузка не удалась (после всех повторов или из-за ответа сервера)"""
+
+
+class RetryableUploadError(UploadError):
+    """Временная ошибка сервера (5xx, 429) - кусок можно отправить повторно"""
+
+
+class ChunkedUploader:
+    """
+    Отправляет файл кусками. В памяти всегда не больше одного куска;
+    после обрыва загрузка продолжается с подтвержденного сервером места, а не с нуля.
+    """
+
+    def __init__(
+        self,
+        chunk_size: int = 8 * 1024 * 1024,
+        max_retries: int = 5,
+        backoff: float = 1.0,
+        progress: Optional[Callable[[int, int], Any]] = None
+    ):
+        """
+        Инициализация
+
+        Args:
+            chunk_size: Размер куска в байтах
+            max_retries: Сколько раз подряд можно повторить неудачный кусок
+            backoff: Базовая пауза перед повтором (растет экспоненциально)
+            progress: Колбэк progress(отправлено_байт, всего_байт), может быть корутиной
+        """
+        self.chunk_size = chunk_size
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.progress = progress
+
+    @staticmethod
+    def check_response(response: httpx.Response):
+        """Ошибки 5xx/429 - временные, остальные 4xx - фатальные"""
+        if response.status_code >= 500 or response.status_code == 429:
+            raise RetryableUploadError(f"HTTP {response.status_code}: {response.text[:200]}")
+        if response.status_code >= 400:
+            raise UploadError(f"HTTP {response.status_code}: {response.text[:200]}")
+
+    @staticmethod
+    def _read(f, offset: int, size: int) -> bytes:
+        f.seek(offset)
+        return f.read(size)
+
+    async def _report(self, sent: int, total: int):
+        if self.progress is None:
+            return
+        result = self.progress(sent, total)
+        if inspect.isawaitable(result):
+            await result
+
+    async def upload(
+        self,
+        path: str,
+        send_chunk: Callable[[bytes, int, int, int], Awaitable[int]],
+        query_offset: Optional[Callable[[int], Awaitable[int]]] = None,
+        chunk_end: Optional[Callable[[int, int], int]] = None
+    ) -> int:
+        """
+        Загрузить файл
+
+        Args:
+            path: Путь к файлу
+            send_chunk: send_chunk(данные, начало, конец, всего) -> смещение, с которого продолжать
+            query_offset: query_offset(всего) -> сколько байт сервер уже принял (для возобновления)
+            chunk_end: chunk_end(начало, всего) -> конец куска (по умолчанию - chunk_size)
+
+        Returns:
+            Размер файла
+        """
+        total = os.path.getsize(path)
+        if total == 0:
+            raise UploadError("Пустой файл")
+        offset = 0
+        failures = 0
+
+        with open(path, 'rb') as f:
+            while offset < total:
+                end = chunk_end(offset, total) if chunk_end else min(offset + self.chunk_size, total)
+                data = await asyncio.to_thread(self._read, f, offset, end - offset)
+
+                try:
+                    offset = await send_chunk(data, offset, end, total)
+                except (httpx.TransportError, RetryableUploadError) as e:
+                    failures += 1
+                    if failures > self.max_retries:
+                        raise UploadError(f"Загрузка прервана на {offset}/{total} байт: {e}") from e
+
+                    delay = self.backoff * 2 ** (failures - 1)
+                    print(f"⚠️ Сбой загрузки на {offset}/{total} байт ({e}), повтор через {delay:.0f} с")
+                    await asyncio.sleep(delay)
+
+                    if query_offset:
+                        try:
+                            # Сервер мог принять часть куска - продолжаем с его позиции
+                            offset = await query_offset(total)
+                        except (httpx.TransportError, RetryableUploadError):
+                            pass
+                    continue
+
+                failures = 0
+                await self._report(offset, total)
+
+        return total
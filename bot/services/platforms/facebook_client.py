@@ -1,36 +1,199 @@
 """
-Facebook клиент (заглушка для будущей реализации)
-Требует: facebook-sdk (добавить в requirements когда будет API)
+Facebook клиент: асинхронный Graph API поверх общего httpx.AsyncClient
+(keep-alive, явные таймауты, batch-запросы)
 """
+from typing import Optional, Dict, List
+from urllib.parse import urlencode
+import os
+import json
+
+import httpx
+
+
+class FacebookAPIError(Exception):
+    """Ошибка, которую вернул Graph API"""
+
+    def __init__(self, message: str, code: Optional[int] = None):
+        super().__init__(message)
+        self.code = code
 
 
 class FacebookClient:
-    """Клиент для Facebook"""
-    
-    def __init__(self, access_token: str):
+    """Клиент для Facebook Graph API"""
+
+    # Graph API принимает не больше 50 запросов в одном batch
+    MAX_BATCH = 50
+
+    def __init__(
+        self,
+        access_token: str,
+        base_url: str = "https://graph.facebook.com",
+        api_version: str = "v18.0",
+        page_id: str = "me",
+        timeout: float = 30.0,
+        max_connections: int = 10
+    ):
         """
         Инициализация клиента
-        
+
         Args:
             access_token: Facebook access token
+            base_url: Адрес Graph API (для тестов - локальный сервер)
+            api_version: Версия Graph API
+            page_id: Страница для публикаций ('me' - владелец токена)
+            timeout: Таймаут чтения/записи (секунды)
+            max_connections: Размер пула соединений
         """
         self.access_token = access_token
-        # TODO: Инициализация Facebook API когда будет токен
-        print(f"⚠️ Facebook клиент создан (заглушка)")
-    
-    async def post(self, message: str, image_path: str = None):
+        self.base_url = f"{base_url.rstrip('/')}/{api_version}/"
+        self.page_id = page_id
+        self.timeout = httpx.Timeout(timeout, connect=5.0, pool=5.0)
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections
+        )
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Общий HTTP клиент (создается при первом запросе, внутри event loop)"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                limits=self.limits
+            )
+        return self._client
+
+    async def close(self):
+        """Закрыть соединения"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @staticmethod
+    def _parse(status_code: int, body) -> Dict:
+        """Разбор ответа Graph API (ошибка приходит в поле error)"""
+        if isinstance(body, str):
+            try:
+                body = json.loads(body)
+            except ValueError:
+                body = {}
+        body = body or {}
+        if status_code >= 400 or 'error' in body:
+            error = body.get('error') or {}
+            raise FacebookAPIError(
+                error.get('message', f'HTTP {status_code}'),
+                code=error.get('code')
+            )
+        return body
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        data: Optional[Dict] = None,
+        files: Optional[Dict] = None
+    ) -> Dict:
+        """
+        Запрос к Graph API
+
+        Args:
+            method: HTTP метод
+            path: Путь относительно версии API (например, 'me/feed')
+            data: Параметры запроса
+            files: Файлы для multipart загрузки
+
+        Returns:
+            Ответ Graph API
+        """
+        params = {'access_token': self.access_token}
+        if method.upper() == 'GET':
+            response = await self.client.get(path, params={**params, **(data or {})})
+        else:
+            response = await self.client.request(
+                method, path, params=params, data=data, files=files
+            )
+        try:
+            body = response.json()
+        except ValueError:
+            body = {}
+        return self._parse(response.status_code, body)
+
+    async def post(self, message: str, image_path: str = None, link: Optional[str] = None) -> Dict:
         """
         Публикация поста
-        
+
         Args:
             message: Текст поста
             image_path: Путь к изображению
-            
+            link: Ссылка
+
         Returns:
-            Результат публикации
+            Ответ Graph API (id поста)
         """
-        # TODO: Реализовать когда будет API
-        raise NotImplementedError(
-            "Facebook API не реализован. "
-            "Установите facebook-sdk и добавьте реализацию."
-        )
+        if image_path:
+            with open(image_path, 'rb') as f:
+                return await self.request(
+                    'POST', f"{self.page_id}/photos",
+                    data={'caption': message},
+                    files={'source': (os.path.basename(image_path), f.read())}
+                )
+
+        data = {'message': message}
+        if link:
+            data['link'] = link
+        return await self.request('POST', f"{self.page_id}/feed", data=data)
+
+    async def batch(self, requests: List[Dict]) -> List[Dict]:
+        """
+        Несколько запросов за один HTTP round-trip
+
+        Args:
+            requests: Запросы вида {'method': 'POST', 'relative_url': 'me/feed', 'body': {...}}
+
+        Returns:
+            Для каждого запроса: {'success': True, 'data': ...} или {'success': False, 'error': ...}
+        """
+        results = []
+        for i in range(0, len(requests), self.MAX_BATCH):
+            chunk = requests[i:i + self.MAX_BATCH]
+            payload = [
+                {
+                    'method': item.get('method', 'GET'),
+                    'relative_url': item['relative_url'],
+                    **({'body': urlencode(item['body'])} if item.get('body') else {})
+                }
+                for item in chunk
+            ]
+            responses = await self.request('POST', '', data={'batch': json.dumps(payload)})
+
+            for item in responses:
+                if item is None:
+                    # Graph API не успел выполнить запрос в рамках batch
+                    results.append({'success': False, 'error': 'Таймаут запроса в batch'})
+                    continue
+                try:
+                    results.append({'success': True, 'data': self._parse(item.get('code', 200), item.get('body'))})
+                except FacebookAPIError as e:
+                    results.append({'success': False, 'error': str(e)})
+        return results
+
+    async def post_many(self, posts: List[Dict]) -> List[Dict]:
+        """
+        Публикация нескольких текстовых постов одним batch-запросом
+
+        Args:
+            posts: Посты вида {'message': ..., 'link': ...}
+
+        Returns:
+            Результаты в том же порядке (batch-формат, см. batch)
+        """
+        return await self.batch([
+            {
+                'method': 'POST',
+                'relative_url': f"{self.page_id}/feed",
+                'body': {k: v for k, v in post.items() if k in ('message', 'link') and v}
+            }
+            for post in posts
+        ])
@@ -1,42 +1,145 @@
 """
-TikTok клиент (заглушка для будущей реализации)
-Требует: TikTokApi (добавить в requirements когда будет API)
+TikTok клиент: публикация видео через Content Posting API
+(FILE_UPLOAD - файл уходит кусками с диска, упавший кусок отправляется повторно)
 """
+from typing import Optional, Dict, Callable, Any
+import os
+
+import httpx
+
+from .chunked_upload import ChunkedUploader, UploadError
 
 
 class TikTokClient:
     """Клиент для TikTok"""
-    
-    def __init__(self, session_id: str):
+
+    # Ограничения API на размер куска
+    MIN_CHUNK = 5 * 1024 * 1024
+    MAX_CHUNK = 64 * 1024 * 1024
+
+    def __init__(
+        self,
+        access_token: str,
+        base_url: str = "https://open.tiktokapis.com",
+        chunk_size: int = 8 * 1024 * 1024,
+        max_retries: int = 5,
+        privacy_level: str = "SELF_ONLY",
+        timeout: float = 60.0
+    ):
         """
         Инициализация клиента
-        
+
         Args:
-            session_id: TikTok session ID
+            access_token: OAuth токен пользователя со scope video.publish
+            base_url: Адрес API (для тестов - локальный сервер)
+            chunk_size: Размер куска загрузки (5-64 МБ)
+            max_retries: Повторов подряд для одного куска
+            privacy_level: Видимость публикации
+            timeout: Таймаут одного запроса (секунды)
+        """
+        self.access_token = access_token
+        self.base_url = base_url.rstrip('/')
+        self.chunk_size = min(max(chunk_size, self.MIN_CHUNK), self.MAX_CHUNK)
+        self.max_retries = max_retries
+        self.privacy_level = privacy_level
+        self.timeout = httpx.Timeout(timeout, connect=10.0)
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        return {
+            'Authorization': f"Bearer {self.access_token}",
+            'Content-Type': 'application/json; charset=UTF-8',
+        }
+
+    def _chunk_layout(self, size: int) -> Dict:
+        """
+        Разбиение файла по правилам API: маленький файл - одним куском,
+        последний кусок забирает остаток (может быть больше chunk_size)
         """
-        self.session_id = session_id
-        # TODO: Инициализация TikTok API когда будет session
-        print(f"⚠️ TikTok клиент создан (заглушка)")
-    
+        if size <= self.chunk_size:
+            return {'chunk_size': size, 'total_chunk_count': 1}
+        return {'chunk_size': self.chunk_size, 'total_chunk_count': size // self.chunk_size}
+
+    async def _api(self, client: httpx.AsyncClient, path: str, payload: Dict) -> Dict:
+        """POST к API; ошибка приходит в поле error.code"""
+        response = await client.post(f"{self.base_url}{path}", headers=self.headers, json=payload)
+        try:
+            body = response.json()
+        except ValueError:
+            body = {}
+        error = body.get('error') or {}
+        if response.status_code >= 400 or error.get('code', 'ok') != 'ok':
+            raise UploadError(
+                f"TikTok API: {error.get('message') or error.get('code') or f'HTTP {response.status_code}'}"
+            )
+        return body.get('data') or {}
+
     async def post(
         self,
         caption: str,
         video_path: str,
-        hashtags: list = None
-    ):
+        hashtags: list = None,
+        progress: Optional[Callable[[int, int], Any]] = None
+    ) -> Dict:
         """
         Публикация видео
-        
+
         Args:
             caption: Описание видео
             video_path: Путь к видео
             hashtags: Хештеги
-            
+            progress: Колбэк progress(отправлено_байт, всего_байт)
+
         Returns:
-            Результат публикации
+            {'publish_id': ..., 'status': ...}
         """
-        # TODO: Реализовать когда будет API
-        raise NotImplementedError(
-            "TikTok API не реализован. "
-            "Установите TikTokApi и добавьте реализацию."
-        )
+        size = os.path.getsize(video_path)
+        layout = self._chunk_layout(size)
+        if hashtags:
+            caption = f"{caption} " + ' '.join(f"#{tag.lstrip('#')}" for tag in hashtags)
+
+        async with httpx.AsyncClient(timeout=self.timeout) as client:
+            data = await self._api(client, '/v2/post/publish/video/init/', {
+                'post_info': {'title': caption[:2200], 'privacy_level': self.privacy_level},
+                'source_info': {'source': 'FILE_UPLOAD', 'video_size': size, **layout},
+            })
+            upload_url = data.get('upload_url')
+            publish_id = data.get('publish_id')
+            if not upload_url:
+                raise UploadError("TikTok не вернул адрес загрузки")
+
+            count = layout['total_chunk_count']
+            step = layout['chunk_size']
+
+            def chunk_end(start: int, total: int) -> int:
+                index = start // step
+                return total if index >= count - 1 else start + step
+
+            async def send_chunk(chunk: bytes, start: int, end: int, total: int) -> int:
+                response = await client.put(
+                    upload_url,
+                    headers={
+                        'Content-Type': 'video/mp4',
+                        'Content-Range': f"bytes {start}-{end - 1}/{total}",
+                    },
+                    content=chunk
+                )
+                ChunkedUploader.check_response(response)
+                return end
+
+            # Статус частичной загрузки API не отдает - упавший кусок уходит заново целиком
+            uploader = ChunkedUploader(
+                chunk_size=step,
+                max_retries=self.max_retries,
+                progress=progress
+            )
+            await uploader.upload(video_path, send_chunk, chunk_end=chunk_end)
+
+            try:
+                status = await self._api(client, '/v2/post/publish/status/fetch/', {'publish_id': publish_id})
+            except (UploadError, httpx.HTTPError) as e:
+                # Файл уже загружен - дальше TikTok обрабатывает его сам
+                print(f"⚠️ Не удалось получить статус публикации TikTok: {e}")
+                status = {}
+
+        return {'publish_id': publish_id, 'status': status.get('status', 'PROCESSING_UPLOAD')}
@@ -1,44 +1,153 @@
 """
-YouTube клиент (заглушка для будущей реализации)
-Требует: google-api-python-client (добавить в requirements когда будет API)
+YouTube клиент: загрузка видео по протоколу resumable upload YouTube Data API v3
+(файл уходит кусками с диска, после обрыва загрузка продолжается с места остановки)
 """
+from typing import Optional, Dict, Callable, Any
+import os
+import re
+import mimetypes
+
+import httpx
+
+from .chunked_upload import ChunkedUploader, UploadError
 
 
 class YouTubeClient:
     """Клиент для YouTube"""
-    
-    def __init__(self, api_key: str):
+
+    # Размер куска должен быть кратен 256 КБ
+    CHUNK_ALIGN = 256 * 1024
+
+    def __init__(
+        self,
+        access_token: str,
+        base_url: str = "https://www.googleapis.com",
+        chunk_size: int = 8 * 1024 * 1024,
+        max_retries: int = 5,
+        timeout: float = 60.0
+    ):
         """
         Инициализация клиента
-        
+
         Args:
-            api_key: YouTube API ключ
+            access_token: OAuth 2.0 токен со scope youtube.upload
+            base_url: Адрес API (для тестов - локальный сервер)
+            chunk_size: Размер куска загрузки
+            max_retries: Повторов подряд для одного куска
+            timeout: Таймаут одного запроса (секунды)
         """
-        self.api_key = api_key
-        # TODO: Инициализация YouTube API когда будет ключ
-        print(f"⚠️ YouTube клиент создан (заглушка)")
-    
+        self.access_token = access_token
+        self.base_url = base_url.rstrip('/')
+        self.chunk_size = max(chunk_size // self.CHUNK_ALIGN, 1) * self.CHUNK_ALIGN
+        self.max_retries = max_retries
+        self.timeout = httpx.Timeout(timeout, connect=10.0)
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        return {'Authorization': f"Bearer {self.access_token}"}
+
+    @staticmethod
+    def _next_offset(response: httpx.Response) -> int:
+        """Сколько байт принял сервер (заголовок Range: bytes=0-N в ответе 308)"""
+        match = re.match(r'bytes=0-(\d+)', response.headers.get('Range', ''))
+        return int(match.group(1)) + 1 if match else 0
+
+    async def _start_session(
+        self,
+        client: httpx.AsyncClient,
+        metadata: Dict,
+        size: int,
+        content_type: str
+    ) -> str:
+        """Создать сессию загрузки и получить ее адрес"""
+        response = await client.post(
+            f"{self.base_url}/upload/youtube/v3/videos",
+            params={'uploadType': 'resumable', 'part': ','.join(metadata.keys())},
+            headers={
+                **self.headers,
+                'X-Upload-Content-Length': str(size),
+                'X-Upload-Content-Type': content_type,
+            },
+            json=metadata
+        )
+        ChunkedUploader.check_response(response)
+        session_url = response.headers.get('Location')
+        if not session_url:
+            raise UploadError("YouTube не вернул адрес сессии загрузки")
+        return session_url
+
     async def upload(
         self,
         title: str,
         description: str,
         video_path: str,
-        tags: list = None
-    ):
+        tags: list = None,
+        privacy_status: str = "private",
+        progress: Optional[Callable[[int, int], Any]] = None
+    ) -> Dict:
         """
         Загрузка видео
-        
+
         Args:
             title: Название видео
             description: Описание
             video_path: Путь к видео
             tags: Теги
-            
+            privacy_status: private | unlisted | public
+            progress: Колбэк progress(отправлено_байт, всего_байт)
+
         Returns:
-            Результат загрузки
+            Ресурс видео (id, snippet, status)
         """
-        # TODO: Реализовать когда будет API
-        raise NotImplementedError(
-            "YouTube API не реализован. "
-            "Установите google-api-python-client и добавьте реализацию."
-        )
+        size = os.path.getsize(video_path)
+        content_type = mimetypes.guess_type(video_path)[0] or 'video/*'
+        metadata = {
+            'snippet': {'title': title, 'description': description, 'tags': tags or []},
+            'status': {'privacyStatus': privacy_status},
+        }
+        uploaded: Dict = {}
+
+        async with httpx.AsyncClient(timeout=self.timeout) as client:
+            session_url = await self._start_session(client, metadata, size, content_type)
+
+            def handle(response: httpx.Response, total: int) -> int:
+                if response.status_code in (200, 201):
+                    uploaded.update(response.json())
+                    return total
+                if response.status_code == 308:
+                    return self._next_offset(response)
+                ChunkedUploader.check_response(response)
+                raise UploadError(f"Неожиданный ответ YouTube: HTTP {response.status_code}")
+
+            async def send_chunk(data: bytes, start: int, end: int, total: int) -> int:
+                response = await client.put(
+                    session_url,
+                    headers={
+                        **self.headers,
+                        'Content-Type': content_type,
+                        'Content-Range': f"bytes {start}-{end - 1}/{total}",
+                    },
+                    content=data
+                )
+                return handle(response, total)
+
+            async def query_offset(total: int) -> int:
+                # Пустой PUT с "bytes */total" - статус сессии без отправки данных
+                response = await client.put(
+                    session_url,
+                    headers={**self.headers, 'Content-Range': f"bytes */{total}"}
+                )
+                if response.status_code == 404:
+                    raise UploadError("Сессия загрузки YouTube истекла")
+                return handle(response, total)
+
+            uploader = ChunkedUploader(
+                chunk_size=self.chunk_size,
+                max_retries=self.max_retries,
+                progress=progress
+            )
+            await uploader.upload(video_path, send_chunk, query_offset=query_offset)
+
+        if not uploaded:
+            raise UploadError("YouTube не подтвердил завершение загрузки")
+        return uploaded
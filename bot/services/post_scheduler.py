@@ -0,0 +1,223 @@
+"""
+Планировщик отложенных публикаций: min-heap времен публикации,
+пробуждение точно к сроку и параллельная выгрузка очереди
+"""
+from typing import Optional, Dict, List, Callable, Awaitable
+from datetime import datetime
+import os
+import uuid
+import socket
+import asyncio
+import heapq
+import time
+
+
+def parse_platform_limits(value: str) -> Dict[str, int]:
+    """
+    Разбор лимитов параллельности вида "Instagram=1,Facebook=5"
+
+    Args:
+        value: Строка из конфигурации
+
+    Returns:
+        Словарь платформа -> лимит
+    """
+    limits = {}
+    for item in (value or '').split(','):
+        if '=' not in item:
+            continue
+        platform, limit = item.split('=', 1)
+        try:
+            limits[platform.strip()] = max(int(limit), 1)
+        except ValueError:
+            continue
+    return limits
+
+
+class PostScheduler:
+    """Событийный планировщик задач ScheduledPost"""
+
+    def __init__(
+        self,
+        db,
+        publish: Callable[[object], Awaitable[None]],
+        platform_limits: Optional[Dict[str, int]] = None,
+        default_limit: int = 1,
+        is_enabled: Optional[Callable[[], bool]] = None,
+        resync_interval: float = 600,
+        batch_size: int = 50,
+        lease_seconds: int = 600,
+        batch_publishers: Optional[Dict[str, Callable[[List], Awaitable[None]]]] = None
+    ):
+        """
+        Инициализация
+
+        Args:
+            db: DatabaseRepository
+            publish: Корутина публикации одной задачи (сама сохраняет результат в БД)
+            platform_limits: Максимум одновременных публикаций на платформу
+            default_limit: Лимит для платформ, не указанных в platform_limits
+            is_enabled: Проверка, разрешены ли публикации (автономный режим)
+            resync_interval: Как часто сверять кучу с БД (секунды)
+            batch_size: Сколько задач забирать из БД за один запрос
+            lease_seconds: Срок аренды забранной задачи (потом ее заберет другой воркер)
+            batch_publishers: Платформа -> корутина публикации пачки задач одним запросом
+        """
+        self.db = db
+        self.publish = publish
+        self.platform_limits = platform_limits or {}
+        self.default_limit = default_limit
+        self.is_enabled = is_enabled or (lambda: True)
+        self.resync_interval = resync_interval
+        self.batch_size = batch_size
+        self.lease_seconds = lease_seconds
+        self.batch_publishers = batch_publishers or {}
+        # Уникален для каждого процесса: несколько реплик делят одну очередь
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+        self._heap: List[tuple] = []
+        self._cancelled = set()
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._last_resync = 0.0
+
+    @staticmethod
+    def _timestamp(value: datetime) -> float:
+        # naive datetime трактуется как локальное время - как и при планировании
+        return value.timestamp()
+
+    def _semaphore(self, platform: str) -> asyncio.Semaphore:
+        if platform not in self._semaphores:
+            limit = self.platform_limits.get(platform, self.default_limit)
+            self._semaphores[platform] = asyncio.Semaphore(limit)
+        return self._semaphores[platform]
+
+    def _resync(self):
+        """Пересобирает кучу из pending-задач в БД"""
+        self._heap = [
+            (self._timestamp(scheduled_at), task_id)
+            for task_id, scheduled_at in self.db.get_pending_schedule()
+        ]
+        heapq.heapify(self._heap)
+        self._cancelled.clear()
+        self._last_resync = time.time()
+
+    def _next_due(self) -> Optional[float]:
+        """Ближайшее время публикации (отмененные задачи выбрасываются)"""
+        while self._heap and self._heap[0][1] in self._cancelled:
+            _, task_id = heapq.heappop(self._heap)
+            self._cancelled.discard(task_id)
+        return self._heap[0][0] if self._heap else None
+
+    def wake(self):
+        """Разбудить цикл (новая задача, отмена, включение автономии)"""
+        if self._wakeup:
+            self._wakeup.set()
+
+    def schedule(self, task_id: int, scheduled_at: datetime):
+        """Добавить задачу в кучу"""
+        self._cancelled.discard(task_id)
+        heapq.heappush(self._heap, (self._timestamp(scheduled_at), task_id))
+        self.wake()
+
+    def cancel(self, task_id: int):
+        """Отметить задачу как отмененную (удаляется из кучи лениво)"""
+        self._cancelled.add(task_id)
+        self.wake()
+
+    async def start(self):
+        """Запуск фонового цикла"""
+        if self._task:
+            return
+        self._wakeup = asyncio.Event()
+        self._resync()
+        self._task = asyncio.create_task(self._run())
+        print(f"✅ Планировщик публикаций запущен (в очереди: {len(self._heap)})")
+
+    async def stop(self):
+        """Остановка фонового цикла"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                now = time.time()
+                if now - self._last_resync >= self.resync_interval:
+                    self._resync()
+
+                next_due = self._next_due()
+                enabled = self.is_enabled()
+
+                if enabled and next_due is not None and next_due <= now:
+                    await self._drain()
+                    continue
+
+                # Спим до ближайшего срока, но не дольше интервала сверки с БД
+                timeout = self._last_resync + self.resync_interval - now
+                if enabled and next_due is not None:
+                    timeout = min(timeout, next_due - now)
+
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=max(timeout, 0))
+                except asyncio.TimeoutError:
+                    pass
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ Ошибка планировщика публикаций: {e}")
+                await asyncio.sleep(5)
+
+    async def _drain(self):
+        """Публикует все задачи, срок которых наступил"""
+        now = time.time()
+        while self._heap and self._heap[0][0] <= now:
+            _, task_id = heapq.heappop(self._heap)
+            self._cancelled.discard(task_id)
+
+        while True:
+            # Каждая задача достается ровно одному воркеру (FOR UPDATE SKIP LOCKED)
+            tasks = self.db.claim_due_scheduled_posts(
+                owner=self.worker_id,
+                now_dt=datetime.now().astimezone(),
+                limit=self.batch_size,
+                lease_seconds=self.lease_seconds
+            )
+            if not tasks:
+                break
+
+            batches: Dict[str, List] = {}
+            single = []
+            for task in tasks:
+                if task.platform in self.batch_publishers:
+                    batches.setdefault(task.platform, []).append(task)
+                else:
+                    single.append(task)
+
+            await asyncio.gather(
+                *[self._publish_limited(t) for t in single],
+                *[self._publish_batch(platform, batch) for platform, batch in batches.items()]
+            )
+
+    async def _publish_limited(self, task):
+        async with self._semaphore(task.platform):
+            try:
+                await self.publish(task)
+            except Exception as e:
+                print(f"⚠️ Ошибка публикации задачи #{task.id}: {e}")
+
+    async def _publish_batch(self, platform: str, tasks: List):
+        async with self._semaphore(platform):
+            try:
+                await self.batch_publishers[platform](tasks)
+            except Exception as e:
+                ids = ', '.join(f"#{t.id}" for t in tasks)
+                print(f"⚠️ Ошибка пакетной публикации {platform} ({ids}): {e}")
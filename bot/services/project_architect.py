@@ -1,18 +1,52 @@
 """
 Project Architect - Модуль для создания полных веб-проектов
 """
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Callable, Any
+import re
 import json
+import time
 import asyncio
+import hashlib
+import inspect
+
+from openai import RateLimitError
+
 from bot.services.github_manager import GitHubManager
+from .async_cache import create_completion
+
+# Манифест сайта хранится в самом репозитории и обновляется тем же коммитом
+MANIFEST_PATH = '.botsi/manifest.json'
+CODE_FENCE_RE = re.compile(r'^\s*```[\w+-]*[ \t]*\n(.*?)\n?```\s*$', re.DOTALL)
+
+
+def content_hash(content: str) -> str:
+    """sha256 содержимого файла (для манифеста)"""
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
 
 
 class ProjectArchitectService:
     """Сервис для генерации и деплоя полных проектов"""
     
-    def __init__(self, openai_client, github_manager: GitHubManager):
+    def __init__(
+        self,
+        openai_client,
+        github_manager: GitHubManager,
+        concurrency: int = 4,
+        max_retries: int = 3
+    ):
+        """
+        Инициализация
+
+        Args:
+            openai_client: OpenAI или AsyncOpenAI клиент
+            github_manager: Менеджер GitHub
+            concurrency: Сколько файлов генерируется одновременно
+            max_retries: Повторов при 429 (rate limit) от OpenAI
+        """
         self.openai = openai_client
         self.github = github_manager
+        self.max_retries = max_retries
+        self._semaphore = asyncio.Semaphore(concurrency)
         print("✅ Project Architect (Создатель сайтов) инициализирован")
 
     async def create_website_structure(self, topic: str, user_wishes: str, language: str = 'ru') -> Dict:
@@ -56,7 +90,8 @@ class ProjectArchitectService:
     ]
 }}
 """
-        response = self.openai.chat.completions.create(
+        response = await create_completion(
+            self.openai,
             model="gpt-4o",
             messages=[
                 {"role": "system", "content": "Ты JSON генератор. Отвечай только чистым JSON."},
@@ -68,11 +103,31 @@ class ProjectArchitectService:
         
         return json.loads(response.choices[0].message.content)
 
-    async def generate_file_content(self, file_path: str, description: str, topic: str, language: str) -> str:
+    async def _complete_limited(self, **params):
         """
-        2. Генерирует контент конкретного файла
+        Запрос к OpenAI под семафором: не больше concurrency одновременно,
+        при 429 - пауза (по retry-after, иначе экспоненциальная) и повтор
         """
-        prompt = f"""Напиши ПОЛНЫЙ, рабочий, профессиональный код для файла: {file_path}
+        for attempt in range(self.max_retries + 1):
+            async with self._semaphore:
+                try:
+                    return await create_completion(self.openai, **params)
+                except RateLimitError as e:
+                    if attempt == self.max_retries:
+                        raise
+                    retry_after = e.response.headers.get('retry-after') if e.response is not None else None
+                    try:
+                        delay = float(retry_after)
+                    except (TypeError, ValueError):
+                        delay = 2 ** attempt
+            # Ждем вне семафора - слот достается другим файлам
+            print(f"⚠️ OpenAI rate limit, повтор через {delay:.0f} с")
+            await asyncio.sleep(delay)
+
+    @staticmethod
+    def file_prompt(file_path: str, description: str, topic: str, language: str) -> str:
+        """Промпт генерации файла (сохраняется в манифесте)"""
+        return f"""Напиши ПОЛНЫЙ, рабочий, профессиональный код для файла: {file_path}
 
 Проект: {topic}
 Задача файла: {description}
@@ -85,7 +140,10 @@ class ProjectArchitectService:
 - Добавь классные анимации и hover-эффекты.
 - Не пиши комментариев типа "здесь ваш код", пиши ПОЛНЫЙ код.
 """
-        response = self.openai.chat.completions.create(
+
+    async def _write_code(self, prompt: str) -> str:
+        """Запрос кода файла и очистка ответа от маркдауна"""
+        response = await self._complete_limited(
             model="gpt-4o",
             messages=[
                 {"role": "system", "content": "Ты лучший веб-разработчик в мире. Ты пишешь идеальный код."},
@@ -93,54 +151,77 @@ class ProjectArchitectService:
             ],
             temperature=0.7
         )
-        
+
         code = response.choices[0].message.content
-        # Очистка от маркдауна если есть
-        code = code.replace("```html", "").replace("```css", "").replace("```javascript", "").replace("```", "")
-        return code.strip()
+        # Очистка от маркдауна если весь ответ обернут в ``` (блоки внутри README не трогаем)
+        fenced = CODE_FENCE_RE.match(code)
+        return (fenced.group(1) if fenced else code).strip()
+
+    async def generate_file_content(self, file_path: str, description: str, topic: str, language: str) -> str:
+        """
+        2. Генерирует контент конкретного файла
+        """
+        return await self._write_code(self.file_prompt(file_path, description, topic, language))
 
     async def build_and_deploy_site(self, topic: str, user_wishes: str, language: str = 'ru') -> Dict:
         """
         ГЛАВНЫЙ МЕТОД: Планирует -> Кодит -> Деплоит
         """
+        if not self.github.is_configured():
+            return {"success": False, "error": "GitHub не настроен. Добавьте GITHUB_TOKEN."}
+
         try:
             # 1. Планирование
             print(f"🏗️ Планирую архитектуру для: {topic}")
             plan = await self.create_website_structure(topic, user_wishes, language)
             
             repo_name = plan['repo_name']
-            
-            # 2. Создание репозитория
-            print(f"📦 Создаю репозиторий: {repo_name}")
-            repo_url = self.github.create_repo(repo_name, plan.get('description', topic))
-            if not repo_url:
-                return {"success": False, "error": "Не удалось создать репозиторий"}
-
-            # 3. Генерация файлов (Параллельно!)
-            print("⚡ Генерирую файлы...")
-            files_to_create = {}
-            
-            tasks = []
-            for file_info in plan['files']:
-                tasks.append(
-                    self.generate_file_content(file_info['path'], file_info['description'], topic, language)
-                )
-            
-            # Ждем генерации всех файлов
-            contents = await asyncio.gather(*tasks)
-            
-            for i, file_info in enumerate(plan['files']):
-                files_to_create[file_info['path']] = contents[i]
-            
-            # 4. Заливка на GitHub
-            print("🚀 Отправляю код на GitHub...")
-            # Создаем файлы по одному (GitHub API ограничение, но быстро)
-            uploaded_files = []
-            for path, content in files_to_create.items():
-                file_url = self.github.create_file(repo_name, path, content, f"feat: Add {path}")
-                if file_url:
-                    uploaded_files.append(path)
-            
+            files_plan = plan.get('files', [])
+            if not files_plan:
+                return {"success": False, "error": "Архитектор не предложил ни одного файла"}
+
+            # 2. Генерация файлов - параллельно, ограничено семафором
+            print(f"⚡ Генерирую {len(files_plan)} файлов...")
+            started = time.perf_counter()
+            prompts = {
+                file_info['path']: self.file_prompt(file_info['path'], file_info['description'], topic, language)
+                for file_info in files_plan
+            }
+            contents = await asyncio.gather(*[self._write_code(prompt) for prompt in prompts.values()])
+            files_to_create = dict(zip(prompts, contents))
+            print(f"✅ Файлы сгенерированы за {time.perf_counter() - started:.1f} с")
+
+            manifest = {
+                'repo_name': repo_name,
+                'topic': topic,
+                'language': language,
+                'description': plan.get('description', topic),
+                'updated_at': int(time.time()),
+                'files': {
+                    file_info['path']: {
+                        'sha256': content_hash(files_to_create[file_info['path']]),
+                        'description': file_info['description'],
+                        'prompt': prompts[file_info['path']],
+                        'edits': []
+                    }
+                    for file_info in files_plan
+                }
+            }
+
+            # 3. Репозиторий, все файлы и манифест - одним коммитом
+            print(f"🚀 Отправляю код на GitHub: {repo_name}")
+            push = await self.github.push_files(
+                repo_name,
+                {**files_to_create, MANIFEST_PATH: self._dump_manifest(manifest)},
+                "feat: Initial site",
+                description=plan.get('description', topic)
+            )
+            if not push['success']:
+                return {"success": False, "error": push['error']}
+
+            repo_url = push['url']
+            uploaded_files = list(files_to_create)
+
             return {
                 "success": True,
                 "repo_name": repo_name,
@@ -151,3 +232,173 @@ class ProjectArchitectService:
 
         except Exception as e:
             return {"success": False, "error": str(e)}
+
+    @staticmethod
+    def _dump_manifest(manifest: Dict) -> str:
+        return json.dumps(manifest, ensure_ascii=False, indent=2) + '\n'
+
+    async def _select_files(self, manifest: Dict, change_request: str) -> List[Dict]:
+        """
+        Какие файлы затрагивает правка
+
+        Если пути файлов названы в запросе явно - без обращения к LLM,
+        иначе дешевая модель выбирает файлы по манифесту.
+
+        Returns:
+            [{'path': ..., 'instruction': ...}]
+        """
+        files = manifest.get('files', {})
+        mentioned = [path for path in files if path in change_request]
+        if mentioned:
+            return [{'path': path, 'instruction': change_request} for path in mentioned]
+
+        listing = "\n".join(f"- {path}: {entry.get('description', '')}" for path, entry in files.items())
+        prompt = f"""Сайт: {manifest.get('topic', '')}
+Файлы проекта:
+{listing}
+
+Правка от пользователя: {change_request}
+
+Выбери МИНИМАЛЬНЫЙ набор файлов, которые нужно изменить для этой правки
+(новый файл - только если без него никак). Для каждого файла сформулируй, что именно поменять.
+
+Ответь JSON: {{"files": [{{"path": "...", "instruction": "..."}}]}}
+"""
+        response = await self._complete_limited(
+            model="gpt-4o-mini",
+            messages=[
+                {"role": "system", "content": "Ты JSON генератор. Отвечай только чистым JSON."},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0,
+            response_format={"type": "json_object"}
+        )
+        selected = json.loads(response.choices[0].message.content).get('files', [])
+        return [
+            {'path': item['path'].lstrip('/'), 'instruction': item.get('instruction') or change_request}
+            for item in selected
+            if item.get('path') and item['path'].lstrip('/') != MANIFEST_PATH
+        ]
+
+    @staticmethod
+    def edit_prompt(path: str, current: Optional[str], instruction: str, manifest: Dict) -> str:
+        """Промпт правки файла: текущий код + что поменять"""
+        entry = manifest.get('files', {}).get(path, {})
+        if current is None:
+            return f"""Создай новый файл {path} для проекта: {manifest.get('topic', '')}
+Язык: {manifest.get('language', 'ru')}
+Другие файлы проекта: {', '.join(manifest.get('files', {}))}
+
+Задача: {instruction}
+
+Пиши ПОЛНЫЙ готовый код файла без пояснений.
+"""
+        return f"""Внеси правку в файл {path} проекта: {manifest.get('topic', '')}
+Назначение файла: {entry.get('description', '')}
+
+Правка: {instruction}
+
+Текущий код:
+{current}
+
+Верни ПОЛНЫЙ обновленный код файла без пояснений. Меняй только то, что нужно для правки.
+"""
+
+    async def edit_site(
+        self,
+        repo_name: str,
+        change_request: str,
+        progress: Optional[Callable[[str], Any]] = None
+    ) -> Dict:
+        """
+        Точечная правка сайта, созданного через build_and_deploy_site:
+        перегенерируются только затронутые файлы, в коммит уходят только изменившиеся
+
+        Args:
+            repo_name: Репозиторий сайта
+            change_request: Что поменять
+            progress: Колбэк progress(текст этапа), может быть корутиной
+
+        Returns:
+            {'success', 'repo_url', 'changed', 'unchanged', 'commit'} или {'success': False, 'error'}
+        """
+        if not self.github.is_configured():
+            return {"success": False, "error": "GitHub не настроен. Добавьте GITHUB_TOKEN."}
+
+        async def report(stage: str):
+            if progress is not None:
+                result = progress(stage)
+                if inspect.isawaitable(result):
+                    await result
+
+        try:
+            loaded = await self.github.read_files(repo_name, [MANIFEST_PATH])
+            if not loaded['success']:
+                return {"success": False, "error": loaded['error']}
+            raw_manifest = loaded['files'].get(MANIFEST_PATH)
+            if raw_manifest is None:
+                return {"success": False, "error": f"В репозитории нет {MANIFEST_PATH} - сайт создан не через /create_site"}
+            manifest = json.loads(raw_manifest)
+
+            await report("🔎 Определяю, какие файлы затрагивает правка...")
+            targets = await self._select_files(manifest, change_request)
+            if not targets:
+                return {"success": False, "error": "Не удалось определить, какие файлы менять"}
+
+            current = await self.github.read_files(repo_name, [t['path'] for t in targets])
+            if not current['success']:
+                return {"success": False, "error": current['error']}
+
+            await report(f"🧱 Переписываю: {', '.join(t['path'] for t in targets)}")
+            contents = await asyncio.gather(*[
+                self._write_code(self.edit_prompt(t['path'], current['files'].get(t['path']), t['instruction'], manifest))
+                for t in targets
+            ])
+
+            changed, unchanged = {}, []
+            files_meta = manifest.setdefault('files', {})
+            for target, content in zip(targets, contents):
+                path = target['path']
+                old = current['files'].get(path)
+                # Сравниваем с тем, что реально лежит в репозитории (файл могли править руками)
+                if old is not None and content_hash(old) == content_hash(content):
+                    unchanged.append(path)
+                    continue
+                changed[path] = content
+                entry = files_meta.setdefault(path, {
+                    'description': target['instruction'],
+                    'prompt': self.edit_prompt(path, None, target['instruction'], manifest),
+                    'edits': []
+                })
+                entry['sha256'] = content_hash(content)
+                entry.setdefault('edits', []).append(target['instruction'])
+
+            if not changed:
+                return {
+                    "success": True,
+                    "repo_url": None,
+                    "changed": [],
+                    "unchanged": unchanged,
+                    "commit": None
+                }
+
+            manifest['updated_at'] = int(time.time())
+            await report(f"🚀 Коммит: {len(changed)} файл(ов)")
+            push = await self.github.push_files(
+                repo_name,
+                {**changed, MANIFEST_PATH: self._dump_manifest(manifest)},
+                f"fix: {change_request[:60]}"
+            )
+            if not push['success']:
+                return {"success": False, "error": push['error']}
+
+            return {
+                "success": True,
+                "repo_url": push['url'],
+                "changed": list(changed),
+                "unchanged": unchanged,
+                "commit": push['commit']
+            }
+
+        except Exception as e:
+            return {"success": False, "error": str(e)}
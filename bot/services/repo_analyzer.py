@@ -0,0 +1,329 @@
+"""
+Анализ репозитория целиком: исходники берутся одним tar-архивом
+(или из локальной копии), анализируются параллельно, результаты
+кешируются по git blob SHA - повторный запуск анализирует только
+изменившиеся файлы
+"""
+from typing import Optional, Dict, List, Callable, Any, Tuple
+import io
+import os
+import json
+import time
+import asyncio
+import hashlib
+import inspect
+import tarfile
+
+from .code_splitter import EXTENSION_LANGUAGES
+from .code_generator import CodeGenerator
+from .github_manager import GitHubManager
+
+
+# Разметка и стили не анализируем как код
+SOURCE_EXTENSIONS = {
+    ext: language for ext, language in EXTENSION_LANGUAGES.items() if language not in ('html', 'css')
+}
+SKIP_DIRS = {
+    '.git', 'node_modules', 'vendor', 'dist', 'build', '.venv', 'venv', 'env',
+    '__pycache__', '.next', 'target', '.idea', '.vscode', 'site-packages',
+}
+SKIP_SUFFIXES = ('.min.js', '.min.css', '.bundle.js', '.map', '.lock')
+
+
+def git_blob_sha(data: bytes) -> str:
+    """SHA blob-объекта git (совпадает с sha в дереве GitHub)"""
+    return hashlib.sha1(b'blob %d\0' % len(data) + data).hexdigest()
+
+
+def source_language(path: str) -> Optional[str]:
+    """Язык исходника или None, если файл не нужно анализировать"""
+    parts = path.split('/')
+    if any(part in SKIP_DIRS for part in parts[:-1]):
+        return None
+    if path.lower().endswith(SKIP_SUFFIXES):
+        return None
+    return SOURCE_EXTENSIONS.get(os.path.splitext(path)[1].lower())
+
+
+def read_tarball(data: bytes, max_file_bytes: int) -> Tuple[Optional[str], List[Tuple[str, bytes]]]:
+    """
+    Исходники из tar.gz архива GitHub
+
+    Returns:
+        (имя корневого каталога - owner-repo-sha, [(путь, содержимое)])
+    """
+    root = None
+    files = []
+    with tarfile.open(fileobj=io.BytesIO(data), mode='r:gz') as archive:
+        for member in archive:
+            name = member.name.split('/', 1)
+            if root is None:
+                root = name[0]
+            if not member.isfile() or len(name) < 2:
+                continue
+            path = name[1]
+            if member.size > max_file_bytes or source_language(path) is None:
+                continue
+            files.append((path, archive.extractfile(member).read()))
+    return root, files
+
+
+def read_directory(directory: str, max_file_bytes: int) -> List[Tuple[str, bytes]]:
+    """Исходники из локальной копии репозитория"""
+    files = []
+    for current, dirs, names in os.walk(directory):
+        dirs[:] = sorted(d for d in dirs if d not in SKIP_DIRS)
+        for name in sorted(names):
+            full_path = os.path.join(current, name)
+            path = os.path.relpath(full_path, directory).replace(os.sep, '/')
+            if source_language(path) is None or os.path.getsize(full_path) > max_file_bytes:
+                continue
+            with open(full_path, 'rb') as f:
+                files.append((path, f.read()))
+    return files
+
+
+class BlobCache:
+    """JSON-кеш результатов анализа на диске: ключ - blob SHA и язык"""
+
+    def __init__(self, path: str, max_entries: int = 5000):
+        """
+        Инициализация кеша
+
+        Args:
+            path: Путь к JSON файлу
+            max_entries: Максимум записей (старые по времени использования удаляются)
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self._entries: Dict[str, Dict] = {}
+        self._dirty = False
+        self._lock = asyncio.Lock()
+
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Кеш анализа репозиториев поврежден, начинаем с пустого: {e}")
+
+    def get(self, key: str) -> Optional[Dict]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            entry['used_at'] = time.time()
+            self._dirty = True
+        return entry
+
+    def set(self, key: str, analysis: Dict):
+        self._entries[key] = {'analysis': analysis, 'used_at': time.time()}
+        self._dirty = True
+
+    def _write(self, entries: Dict):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entries, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    async def save(self):
+        """Сохранить на диск (в потоке), если были изменения"""
+        async with self._lock:
+            if not self._dirty:
+                return
+            if len(self._entries) > self.max_entries:
+                newest = sorted(self._entries.items(), key=lambda kv: kv[1].get('used_at', 0))
+                self._entries = dict(newest[-self.max_entries:])
+            self._dirty = False
+            await asyncio.to_thread(self._write, dict(self._entries))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RepoAnalyzerService:
+    """Глубокий анализ всех исходников репозитория"""
+
+    def __init__(
+        self,
+        code_generator: CodeGenerator,
+        github_manager: GitHubManager,
+        cache: Optional[BlobCache] = None,
+        concurrency: int = 4,
+        max_files: int = 150,
+        max_file_kb: int = 200
+    ):
+        """
+        Инициализация
+
+        Args:
+            code_generator: Анализатор кода (analyze_file)
+            github_manager: Менеджер GitHub (скачивание архива)
+            cache: Кеш результатов по blob SHA (None - без кеша)
+            concurrency: Файлов в анализе одновременно
+            max_files: Максимум файлов за один запуск
+            max_file_kb: Файлы больше пропускаются (сгенерированный код, данные)
+        """
+        self.code_generator = code_generator
+        self.github = github_manager
+        self.cache = cache
+        self.concurrency = concurrency
+        self.max_files = max_files
+        self.max_file_bytes = max_file_kb * 1024
+        print("✅ Repo Analyzer (анализ репозиториев) инициализирован")
+
+    @staticmethod
+    async def _report(progress: Optional[Callable], *args):
+        if progress is None:
+            return
+        result = progress(*args)
+        if inspect.isawaitable(result):
+            await result
+
+    async def _load(self, source: str, ref: Optional[str]) -> Dict:
+        """Исходники из локального каталога или tar-архива GitHub"""
+        if os.path.isdir(source):
+            files = await asyncio.to_thread(read_directory, source, self.max_file_bytes)
+            return {'success': True, 'name': os.path.basename(os.path.abspath(source)), 'version': None, 'files': files}
+
+        archive = await self.github.download_tarball(source, ref)
+        if not archive['success']:
+            return archive
+        root, files = await asyncio.to_thread(read_tarball, archive['data'], self.max_file_bytes)
+        # Корень архива: owner-repo-<sha коммита>
+        version = root.rsplit('-', 1)[-1] if root else None
+        return {'success': True, 'name': archive['full_name'], 'version': version, 'files': files}
+
+    async def _analyze_one(self, path: str, data: bytes, stats: Dict) -> Optional[Dict]:
+        """Анализ файла или результат из кеша по blob SHA"""
+        language = source_language(path)
+        blob = git_blob_sha(data)
+        key = f"{blob}:{language}"
+
+        cached = self.cache.get(key) if self.cache is not None else None
+        if cached is not None:
+            stats['cached'] += 1
+            return {'path': path, 'blob': blob, 'cached': True, **cached['analysis']}
+
+        try:
+            code = data.decode('utf-8')
+        except UnicodeDecodeError:
+            stats['skipped'] += 1
+            return None
+
+        analysis = await self.code_generator.analyze_file(code, language, path)
+        if not analysis:
+            stats['failed'] += 1
+            return None
+        stats['analysed'] += 1
+        if self.cache is not None:
+            self.cache.set(key, analysis)
+        return {'path': path, 'blob': blob, 'cached': False, **analysis}
+
+    async def analyze_repository(
+        self,
+        source: str,
+        ref: Optional[str] = None,
+        progress: Optional[Callable[[int, int], Any]] = None
+    ) -> Dict:
+        """
+        Анализ всех исходников репозитория
+
+        Args:
+            source: username/repo на GitHub или путь к локальной копии
+            ref: Ветка, тег или коммит (только для GitHub)
+            progress: Колбэк progress(готово_файлов, всего), может быть корутиной
+
+        Returns:
+            {'success', 'name', 'version', 'files': [...], 'stats': {...}, 'report'}
+        """
+        started = time.perf_counter()
+        try:
+            loaded = await self._load(source, ref)
+            if not loaded['success']:
+                return loaded
+
+            files = sorted(loaded['files'])
+            stats = {
+                'found': len(files), 'analysed': 0, 'cached': 0, 'failed': 0, 'skipped': 0,
+                'over_limit': max(0, len(files) - self.max_files),
+            }
+            files = files[:self.max_files]
+            if not files:
+                return {'success': False, 'error': 'В репозитории не найдено исходников для анализа'}
+
+            semaphore = asyncio.Semaphore(self.concurrency)
+            done = 0
+
+            async def run(path: str, data: bytes):
+                nonlocal done
+                async with semaphore:
+                    result = await self._analyze_one(path, data, stats)
+                done += 1
+                await self._report(progress, done, len(files))
+                return result
+
+            try:
+                results = await asyncio.gather(*[run(path, data) for path, data in files])
+            finally:
+                if self.cache is not None:
+                    await self.cache.save()
+
+            analysed = [r for r in results if r]
+            stats['elapsed'] = round(time.perf_counter() - started, 1)
+            result = {
+                'success': True,
+                'name': loaded['name'],
+                'version': loaded['version'],
+                'files': analysed,
+                'stats': stats,
+            }
+            result['report'] = self.format_report(result)
+            return result
+
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    @staticmethod
+    def format_report(result: Dict, top: int = 10) -> str:
+        """Текстовый отчет (без Markdown: в находках бывают символы разметки)"""
+        files = result['files']
+        stats = result['stats']
+
+        scored = []
+        for item in files:
+            try:
+                scored.append((float(item.get('quality_score')), item))
+            except (TypeError, ValueError):
+                pass
+        weight = sum(item.get('lines', 1) for _, item in scored)
+        average = round(sum(score * item.get('lines', 1) for score, item in scored) / weight, 1) if weight else 'N/A'
+
+        version = f" @ {result['version']}" if result.get('version') else ''
+        lines = [
+            f"📦 {result['name']}{version}",
+            "",
+            f"📄 Файлов с исходниками: {stats['found']}",
+            f"🔎 Проанализировано заново: {stats['analysed']}",
+            f"💾 Без изменений (из кеша по blob SHA): {stats['cached']}",
+        ]
+        if stats['over_limit']:
+            lines.append(f"⏭ Не вошло в лимит: {stats['over_limit']}")
+        if stats['failed'] or stats['skipped']:
+            lines.append(f"⚠️ Ошибок анализа: {stats['failed']}, не UTF-8: {stats['skipped']}")
+        lines += [f"⏱ {stats['elapsed']} с", "", f"⭐ Средняя оценка качества: {average}/10"]
+
+        for key, title in (('security', '🔒 Безопасность'), ('bugs', '🐛 Потенциальные баги')):
+            findings = [f"• {item['path']}: {finding}" for item in files for finding in item.get(key) or []]
+            if findings:
+                lines += ["", f"{title} ({len(findings)}):"] + findings[:top]
+                if len(findings) > top:
+                    lines.append(f"... и еще {len(findings) - top}")
+
+        worst = sorted(scored, key=lambda pair: pair[0])[:5]
+        if worst:
+            lines += ["", "📉 Файлы с самой низкой оценкой:"]
+            lines += [f"• {item['path']}: {score:g}/10" for score, item in worst]
+
+        return "\n".join(lines)
@@ -2,79 +2,467 @@
 Site Auditor - Модуль визуального контроля и QA
 """
 from typing import Dict, List, Optional
-import requests
-from bs4 import BeautifulSoup
+from collections import Counter
+from urllib.parse import urlparse, urljoin, urldefrag
+import asyncio
+import re
+import time
+
+import httpx
+
+from .async_cache import create_completion
+
+
+HEADERS = {'User-Agent': 'Mozilla/5.0 (Botsi AI Tester)'}
+
+# Рыбный текст и заглушки, которые забыли заменить
+PLACEHOLDER_RE = re.compile(
+    r'lorem ipsum|dolor sit amet|consectetur adipiscing|placeholder text|'
+    r'текст[- ]заглушка|рыба текст|todo:|coming soon',
+    re.IGNORECASE
+)
+
+SEVERITY_ICONS = {'error': '🔴', 'warning': '🟡', 'info': 'ℹ️'}
+
+# Названия правил для сводки по нескольким страницам
+RULE_TITLES = {
+    'title': 'Проблемы с <title>',
+    'meta-description': 'Проблемы с meta description',
+    'viewport': 'Нет meta viewport',
+    'lang': 'Не указан lang',
+    'canonical': 'Нет canonical',
+    'open-graph': 'Нет Open Graph тегов',
+    'h1': 'Нет <h1> или их несколько',
+    'heading-order': 'Пропущены уровни заголовков',
+    'empty-heading': 'Пустые заголовки',
+    'img-alt': 'Изображения без alt',
+    'img-size': 'Изображения без width/height',
+    'dead-link': 'Ссылки-заглушки',
+    'link-text': 'Ссылки и кнопки без текста',
+    'mixed-content': 'Смешанный контент (http на https)',
+    'form-label': 'Поля формы без label',
+    'duplicate-id': 'Повторяющиеся id',
+    'placeholder': 'Рыбный текст / заглушки',
+    'thin-content': 'Мало текста',
+}
+
+
+def _finding(rule: str, severity: str, message: str, examples: Optional[List[str]] = None, count: int = 1) -> Dict:
+    return {
+        'rule': rule,
+        'severity': severity,
+        'message': message,
+        'count': count,
+        'examples': (examples or [])[:3],
+    }
+
+
+def _short(text: str, limit: int = 80) -> str:
+    text = ' '.join(text.split())
+    return text if len(text) <= limit else text[:limit] + '…'
+
+
+def analyze_html(html: str, url: str) -> Dict:
+    """
+    Детерминированные проверки страницы (без модели, выполняется в потоке)
+
+    Args:
+        html: HTML страницы
+        url: Адрес страницы
+
+    Returns:
+        {'findings': [...], 'stats': {...}, 'outline': [...], 'text_sample': ..., 'links': [...]}
+    """
+    from lxml import html as lxml_html
+
+    doc = lxml_html.document_fromstring(html)
+    findings = []
+
+    # --- Мета-теги ---
+    title = (doc.findtext('.//title') or '').strip()
+    if not title:
+        findings.append(_finding('title', 'error', 'Нет <title>'))
+    elif not 10 <= len(title) <= 70:
+        findings.append(_finding('title', 'warning', f'Длина <title> {len(title)} символов (рекомендуется 10-70)', [title]))
+
+    description = doc.xpath('string(//meta[translate(@name,"DESCRIPTION","description")="description"]/@content)').strip()
+    if not description:
+        findings.append(_finding('meta-description', 'warning', 'Нет meta description'))
+    elif not 50 <= len(description) <= 160:
+        findings.append(_finding('meta-description', 'info', f'Длина meta description {len(description)} символов (рекомендуется 50-160)'))
+
+    if not doc.xpath('//meta[@name="viewport"]'):
+        findings.append(_finding('viewport', 'error', 'Нет meta viewport - страница не адаптирована под мобильные'))
+    if not doc.get('lang'):
+        findings.append(_finding('lang', 'warning', 'У <html> не указан атрибут lang'))
+    if not doc.xpath('//link[@rel="canonical"]'):
+        findings.append(_finding('canonical', 'info', 'Нет link rel="canonical"'))
+    if not doc.xpath('//meta[starts-with(@property,"og:")]'):
+        findings.append(_finding('open-graph', 'info', 'Нет Open Graph тегов (превью в соцсетях)'))
+
+    # --- Заголовки ---
+    headings = doc.xpath('//h1|//h2|//h3|//h4|//h5|//h6')
+    outline = [f"{h.tag}: {_short(h.text_content(), 60)}" for h in headings]
+    h1_count = sum(1 for h in headings if h.tag == 'h1')
+    if h1_count == 0:
+        findings.append(_finding('h1', 'error', 'На странице нет <h1>'))
+    elif h1_count > 1:
+        findings.append(_finding('h1', 'warning', f'Несколько <h1> ({h1_count})', count=h1_count))
+
+    skips = []
+    previous = 0
+    for h in headings:
+        level = int(h.tag[1])
+        if previous and level > previous + 1:
+            skips.append(f"h{previous} → {h.tag}: {_short(h.text_content(), 40)}")
+        previous = level
+    if skips:
+        findings.append(_finding('heading-order', 'warning', 'Пропущены уровни заголовков', skips, len(skips)))
+
+    empty_headings = [h.tag for h in headings if not h.text_content().strip() and not h.xpath('.//img[@alt]')]
+    if empty_headings:
+        findings.append(_finding('empty-heading', 'warning', 'Пустые заголовки', empty_headings, len(empty_headings)))
+
+    # --- Изображения ---
+    images = doc.xpath('//img')
+    no_alt = [img.get('src', '?') for img in images if img.get('alt') is None]
+    if no_alt:
+        findings.append(_finding('img-alt', 'error', 'Изображения без alt', no_alt, len(no_alt)))
+    no_size = [img.get('src', '?') for img in images if not (img.get('width') and img.get('height'))]
+    if no_size:
+        findings.append(_finding('img-size', 'info', 'Изображения без width/height (сдвиг макета при загрузке)', no_size, len(no_size)))
+
+    # --- Ссылки и кнопки ---
+    links = doc.xpath('//a')
+    base = doc.xpath('string(//base/@href)') or url
+    absolute_links = {}  # dict вместо set - сохраняет порядок на странице
+    for href in doc.xpath('//a/@href'):
+        target = urldefrag(urljoin(base, href.strip()))[0]
+        if target.startswith(('http://', 'https://')):
+            absolute_links[target] = None
+    dead_links = [
+        a.get('href') or '(нет href)' for a in links
+        if (a.get('href') or '').strip() in ('', '#') or (a.get('href') or '').lower().startswith('javascript:')
+    ]
+    if dead_links:
+        findings.append(_finding('dead-link', 'warning', 'Ссылки-заглушки (пустой href, # или javascript:)', dead_links, len(dead_links)))
+
+    def has_label(el) -> bool:
+        return bool(el.text_content().strip() or el.get('aria-label') or el.get('title') or el.xpath('.//img[@alt!=""]'))
+
+    unlabeled = [a.get('href', '?') for a in links if not has_label(a)]
+    unlabeled += ['<button>' for b in doc.xpath('//button') if not has_label(b)]
+    if unlabeled:
+        findings.append(_finding('link-text', 'warning', 'Ссылки и кнопки без текста', unlabeled, len(unlabeled)))
+
+    if urlparse(url).scheme == 'https':
+        insecure = [
+            src for src in doc.xpath('//img/@src|//script/@src|//link[@rel="stylesheet"]/@href|//iframe/@src')
+            if src.startswith('http://')
+        ]
+        if insecure:
+            findings.append(_finding('mixed-content', 'error', 'Ресурсы по http:// на https-странице', insecure, len(insecure)))
+
+    # --- Формы ---
+    labelled_ids = set(doc.xpath('//label/@for'))
+    fields = doc.xpath('//input[not(@type="hidden" or @type="submit" or @type="button" or @type="image")]|//textarea|//select')
+    no_label = [
+        f.get('name') or f.tag for f in fields
+        if f.get('id') not in labelled_ids and not f.get('aria-label') and not f.xpath('ancestor::label')
+    ]
+    if no_label:
+        findings.append(_finding('form-label', 'warning', 'Поля формы без label', no_label, len(no_label)))
+
+    # --- Разметка ---
+    duplicate_ids = [i for i, n in Counter(doc.xpath('//@id')).items() if n > 1]
+    if duplicate_ids:
+        findings.append(_finding('duplicate-id', 'warning', 'Повторяющиеся id', duplicate_ids, len(duplicate_ids)))
+
+    # --- Контент ---
+    for junk in doc.xpath('//script|//style|//noscript|//svg'):
+        junk.drop_tree()
+    text = ' '.join(doc.text_content().split())
+    placeholders = [_short(m.group(0), 40) for m in PLACEHOLDER_RE.finditer(text)]
+    if placeholders:
+        findings.append(_finding('placeholder', 'error', 'Рыбный текст / заглушки в контенте', placeholders, len(placeholders)))
+    if len(text) < 200:
+        findings.append(_finding('thin-content', 'warning', f'Мало текста на странице ({len(text)} символов)'))
+
+    order = {'error': 0, 'warning': 1, 'info': 2}
+    findings.sort(key=lambda f: order[f['severity']])
+
+    return {
+        'findings': findings,
+        'stats': {
+            'html_kb': round(len(html.encode('utf-8')) / 1024, 1),
+            'text_chars': len(text),
+            'images': len(images),
+            'links': len(links),
+            'headings': len(headings),
+        },
+        'title': title,
+        'outline': outline[:30],
+        'text_sample': text[:1500],
+        'links': list(absolute_links),
+    }
 
 
 class SiteAuditorService:
     """Сервис для аудита сайтов и поиска ошибок"""
-    
-    def __init__(self, openai_client):
+
+    def __init__(self, openai_client, model: str = "gpt-4o", timeout: float = 10.0, crawler=None):
+        """
+        Инициализация сервиса
+
+        Args:
+            openai_client: OpenAI клиент
+            model: Модель для итогового отчета
+            timeout: Таймаут загрузки страницы (секунды)
+            crawler: SiteCrawler для аудита нескольких страниц
+        """
         self.openai = openai_client
+        self.model = model
+        self.timeout = timeout
+        self.crawler = crawler
         print("✅ Site Auditor (QA Тестировщик) инициализирован")
 
+    async def fetch(self, url: str) -> httpx.Response:
+        """Загрузить страницу (не блокируя event loop)"""
+        async with httpx.AsyncClient(headers=HEADERS, timeout=self.timeout, follow_redirects=True) as client:
+            return await client.get(url)
+
+    @staticmethod
+    def format_findings(findings: List[Dict], with_examples: bool = False) -> str:
+        """Список находок одной строкой на правило"""
+        lines = []
+        for f in findings:
+            count = f" ×{f['count']}" if f['count'] > 1 else ''
+            line = f"{SEVERITY_ICONS[f['severity']]} {f['message']}{count}"
+            if with_examples and f['examples']:
+                line += f" (например: {'; '.join(_short(e, 60) for e in f['examples'])})"
+            lines.append(line)
+        return "\n".join(lines)
+
+    def build_prompt(self, url: str, analysis: Dict) -> str:
+        """Компактная выжимка для модели: находки, структура, фрагмент текста"""
+        stats = analysis['stats']
+        return f"""Проведи QA аудит веб-страницы по результатам автоматических проверок.
+
+URL: {url}
+Title: {analysis['title'] or '—'}
+Размер HTML: {stats['html_kb']} KB, текст: {stats['text_chars']} символов, изображений: {stats['images']}, ссылок: {stats['links']}
+
+Автоматические проверки:
+{self.format_findings(analysis['findings'], with_examples=True) or 'Проблем не найдено'}
+
+Структура заголовков:
+{chr(10).join(analysis['outline']) or '—'}
+
+Начало текста страницы:
+{analysis['text_sample']}
+
+Не повторяй список находок. Оцени UX и контент (логика структуры, понятность оффера,
+ошибки в тексте), укажи, какие из найденных проблем исправить в первую очередь,
+и дай краткие рекомендации."""
+
+    async def _review(self, prompt: str) -> Optional[str]:
+        """Итоговый отчет модели (None - если модель недоступна)"""
+        try:
+            gpt_response = await create_completion(
+                self.openai,
+                model=self.model,
+                messages=[
+                    {"role": "system", "content": "Ты Senior QA Automation Engineer. Ты ищешь баги на сайтах."},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=0.5
+            )
+            return gpt_response.choices[0].message.content
+        except Exception as e:
+            print(f"⚠️ GPT-отчет не получен, возвращаем только проверки: {e}")
+            return None
+
     async def audit_page(self, url: str) -> Dict:
         """
         Полный аудит страницы
+
+        Args:
+            url: Адрес страницы
+
+        Returns:
+            {'success': True, 'url', 'report', 'findings', 'stats'} или ошибка
         """
         try:
             # 1. Скачиваем страницу
             print(f"🕵️‍♂️ Сканирую сайт: {url}")
-            headers = {'User-Agent': 'Mozilla/5.0 (Botsi AI Tester)'}
-            response = requests.get(url, headers=headers, timeout=10)
-            
+            response = await self.fetch(url)
+
             if response.status_code != 200:
                 return {
                     "success": False,
                     "error": f"Сайт недоступен (Status: {response.status_code})"
                 }
-            
-            html_content = response.text
-            soup = BeautifulSoup(html_content, 'html.parser')
-            
-            # Удаляем мусор (скрипты, стили), чтобы не перегружать AI
-            for script in soup(["script", "style", "svg"]):
-                script.decompose()
-                
-            text_content = soup.get_text()[:10000] # Ограничим контекст
-            structure = str(soup.prettify())[:15000] # Структура
-            
-            # 2. Анализ через GPT-4o
-            prompt = f"""Проведи QA аудит веб-страницы.
 
-URL: {url}
+            # 2. Локальные проверки в отдельном потоке
+            started = time.perf_counter()
+            analysis = await asyncio.to_thread(analyze_html, response.text, str(response.url))
+            print(
+                f"🔎 Проверки выполнены за {(time.perf_counter() - started) * 1000:.0f} мс: "
+                f"{len(analysis['findings'])} находок"
+            )
+            findings_text = self.format_findings(analysis['findings']) or "✅ Автоматические проверки пройдены"
 
-Структура HTML:
-{structure}
+            # 3. Модель получает только выжимку
+            review = await self._review(self.build_prompt(url, analysis))
 
-Текстовый контент:
-{text_content}
+            report = f"🔎 Автоматические проверки:\n{findings_text}"
+            if review:
+                report += f"\n\n🤖 Рекомендации:\n{review}"
 
-Найди потенциальные проблемы:
-1. UX/UI ошибки (нелогичная структура, пустые блоки).
-2. Проблемы с контентом (рыбный текст 'lorem ipsum', ошибки).
-3. Технические ошибки (битые ссылки, отсутствие alt, плохая семантика).
-4. SEO проблемы (заголовки, мета).
+            return {
+                "success": True,
+                "url": url,
+                "report": report,
+                "findings": analysis['findings'],
+                "stats": analysis['stats']
+            }
 
-Дай краткий отчет и список рекомендаций по исправлению."""
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e)
+            }
 
-            gpt_response = self.openai.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": "Ты Senior QA Automation Engineer. Ты ищешь баги на сайтах."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.5
+    @staticmethod
+    def summarize_site(crawl: Dict) -> List[Dict]:
+        """
+        Сводка находок по всем страницам: правило -> на скольких страницах
+
+        Returns:
+            Список {'rule', 'severity', 'title', 'pages', 'count', 'examples'}
+        """
+        summary: Dict[str, Dict] = {}
+        for page in crawl['pages']:
+            for f in (page.get('analysis') or {}).get('findings', []):
+                item = summary.setdefault(f['rule'], {
+                    'rule': f['rule'],
+                    'severity': f['severity'],
+                    'title': RULE_TITLES.get(f['rule'], f['message']),
+                    'pages': 0,
+                    'count': 0,
+                    'examples': [],
+                })
+                item['pages'] += 1
+                item['count'] += f['count']
+                if len(item['examples']) < 3:
+                    item['examples'].append(page['url'])
+
+        order = {'error': 0, 'warning': 1, 'info': 2}
+        return sorted(summary.values(), key=lambda i: (order[i['severity']], -i['pages']))
+
+    def build_site_prompt(self, crawl: Dict, summary: List[Dict]) -> str:
+        """Выжимка по сайту для модели: сводка правил, битые ссылки, структура главной"""
+        total = len(crawl['pages'])
+        rules = "\n".join(
+            f"{SEVERITY_ICONS[i['severity']]} {i['title']}: {i['pages']}/{total} стр. "
+            f"(например: {', '.join(i['examples'])})"
+            for i in summary
+        ) or 'Проблем не найдено'
+        broken = "\n".join(
+            f"- {b['url']} ({b['status'] or b.get('error')}) на {b['found_on']}"
+            for b in crawl['broken_links'][:20]
+        ) or 'Нет'
+        home = next((p for p in crawl['pages'] if p.get('analysis')), None)
+        home_info = ''
+        if home:
+            home_info = (
+                f"\nГлавная страница ({home['url']}):\n"
+                f"Title: {home['analysis']['title'] or '—'}\n"
+                f"Заголовки:\n{chr(10).join(home['analysis']['outline'][:15]) or '—'}\n"
+                f"Начало текста:\n{home['analysis']['text_sample'][:800]}\n"
+            )
+        pages = "\n".join(p['url'] for p in crawl['pages'][:30])
+
+        return f"""Проведи QA аудит сайта по результатам автоматического обхода.
+
+Сайт: {crawl['start_url']}
+Просмотрено страниц: {total}
+{pages}
+
+Автоматические проверки (правило: страниц с проблемой):
+{rules}
+
+Битые ссылки:
+{broken}
+{home_info}
+Не повторяй списки. Оцени общее качество сайта, укажи системные проблемы
+(шаблонные ошибки на многих страницах), что исправить в первую очередь,
+и дай краткие рекомендации."""
+
+    async def audit_site(self, url: str, progress=None) -> Dict:
+        """
+        Аудит сайта: обход страниц, проверка ссылок и сводный отчет
+
+        Args:
+            url: Стартовая страница
+            progress: Колбэк progress(обработано_страниц, найдено_страниц)
+
+        Returns:
+            {'success': True, 'url', 'report', 'summary', 'broken_links', 'stats'} или ошибка
+        """
+        if self.crawler is None:
+            return await self.audit_page(url)
+
+        try:
+            print(f"🕵️‍♂️ Обхожу сайт: {url}")
+            crawl = await self.crawler.crawl(url, progress=progress)
+            start = crawl['pages'][0] if crawl['pages'] else None
+            if not start or not start.get('analysis'):
+                error = start.get('error') if start else 'нет ответа'
+                return {"success": False, "error": f"Сайт недоступен ({error})"}
+
+            stats = crawl['stats']
+            print(
+                f"🔎 Обход завершен за {stats['elapsed']} с: страниц {stats['pages']}, "
+                f"без изменений {stats['not_modified']}, проанализировано {stats['analysed']}, "
+                f"ссылок проверено {stats['links_checked']}"
+            )
+
+            summary = self.summarize_site(crawl)
+            review = await self._review(self.build_site_prompt(crawl, summary))
+
+            total = len(crawl['pages'])
+            lines = [
+                f"{SEVERITY_ICONS[i['severity']]} {i['title']} - {i['pages']}/{total} стр."
+                for i in summary
+            ]
+            report = (
+                f"🌐 Страниц: {total} (изменились с прошлого аудита: "
+                f"{sum(1 for p in crawl['pages'] if p.get('changed'))}), "
+                f"ссылок проверено: {stats['links_checked']}\n\n"
+                f"🔎 Автоматические проверки:\n"
+                + ("\n".join(lines) or "✅ Автоматические проверки пройдены")
             )
-            
-            report = gpt_response.choices[0].message.content
-            
+            if crawl['broken_links']:
+                broken = "\n".join(
+                    f"❌ {b['url']} ({b['status'] or 'нет ответа'})" for b in crawl['broken_links'][:15]
+                )
+                more = len(crawl['broken_links']) - 15
+                report += f"\n\n🔗 Битые ссылки ({len(crawl['broken_links'])}):\n{broken}"
+                if more > 0:
+                    report += f"\n... и еще {more}"
+            if review:
+                report += f"\n\n🤖 Рекомендации:\n{review}"
+
             return {
                 "success": True,
                 "url": url,
-                "report": report
+                "report": report,
+                "summary": summary,
+                "broken_links": crawl['broken_links'],
+                "stats": stats
             }
-            
+
         except Exception as e:
             return {
                 "success": False,
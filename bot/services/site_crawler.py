@@ -0,0 +1,284 @@
+"""
+Обход сайта для аудита: параллельная загрузка страниц одного origin
+с ограничением глубины и числа страниц, проверка ссылок HEAD-запросами
+и кеш ответов с условными запросами (ETag / Last-Modified)
+"""
+from typing import Optional, Dict, List, Callable, Any
+from urllib.parse import urlparse, urldefrag
+import os
+import json
+import time
+import asyncio
+import hashlib
+import inspect
+
+import httpx
+
+from .site_auditor import HEADERS, analyze_html
+
+
+class HttpCache:
+    """
+    JSON-кеш страниц на диске: валидаторы (ETag, Last-Modified), хеш тела
+    и результат анализа - неизменившаяся страница не анализируется повторно
+    """
+
+    def __init__(self, path: str, max_entries: int = 2000):
+        """
+        Инициализация кеша
+
+        Args:
+            path: Путь к JSON файлу
+            max_entries: Максимум страниц (старые по времени проверки удаляются)
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self._entries: Dict[str, Dict] = {}
+        self._dirty = False
+        self._lock = asyncio.Lock()
+
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Кеш аудита поврежден, начинаем с пустого: {e}")
+
+    def get(self, url: str) -> Optional[Dict]:
+        return self._entries.get(url)
+
+    def set(self, url: str, entry: Dict):
+        self._entries[url] = {**entry, 'checked_at': time.time()}
+        self._dirty = True
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """Заголовки условного GET для страницы из кеша"""
+        entry = self._entries.get(url)
+        if not entry:
+            return {}
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def _write(self, entries: Dict):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entries, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    async def save(self):
+        """Сохранить на диск (в потоке), если были изменения"""
+        async with self._lock:
+            if not self._dirty:
+                return
+            if len(self._entries) > self.max_entries:
+                newest = sorted(self._entries.items(), key=lambda kv: kv[1].get('checked_at', 0))
+                self._entries = dict(newest[-self.max_entries:])
+            self._dirty = False
+            await asyncio.to_thread(self._write, dict(self._entries))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SiteCrawler:
+    """Параллельный обход страниц одного сайта"""
+
+    def __init__(
+        self,
+        cache: Optional[HttpCache] = None,
+        max_pages: int = 20,
+        max_depth: int = 2,
+        concurrency: int = 5,
+        link_concurrency: int = 10,
+        timeout: float = 10.0
+    ):
+        """
+        Инициализация
+
+        Args:
+            cache: Кеш страниц (None - без условных запросов)
+            max_pages: Максимум страниц за обход
+            max_depth: Глубина переходов от стартовой страницы
+            concurrency: Одновременных загрузок страниц
+            link_concurrency: Одновременных проверок ссылок
+            timeout: Таймаут запроса (секунды)
+        """
+        self.cache = cache
+        self.max_pages = max_pages
+        self.max_depth = max_depth
+        self.concurrency = concurrency
+        self.link_concurrency = link_concurrency
+        self.timeout = httpx.Timeout(timeout, connect=5.0)
+        self.limits = httpx.Limits(max_connections=concurrency + link_concurrency)
+
+    @staticmethod
+    def _origin(url: str) -> tuple:
+        parsed = urlparse(url)
+        return parsed.scheme, parsed.netloc.lower()
+
+    @staticmethod
+    async def _report(progress: Optional[Callable], *args):
+        if progress is None:
+            return
+        result = progress(*args)
+        if inspect.isawaitable(result):
+            await result
+
+    async def _fetch_page(self, client: httpx.AsyncClient, url: str, stats: Dict) -> Dict:
+        """
+        Загрузить и проанализировать страницу (или взять анализ из кеша)
+
+        Returns:
+            {'url', 'status', 'changed', 'analysis'} или {'url', 'status', 'error'}
+        """
+        cached = self.cache.get(url) if self.cache is not None else None
+        headers = self.cache.conditional_headers(url) if self.cache is not None else {}
+
+        try:
+            response = await client.get(url, headers=headers)
+        except httpx.HTTPError as e:
+            return {'url': url, 'status': None, 'error': str(e) or type(e).__name__}
+
+        if response.status_code == 304 and cached:
+            stats['not_modified'] += 1
+            return {'url': url, 'status': 200, 'changed': False, 'analysis': cached['analysis']}
+
+        stats['fetched'] += 1
+        if response.status_code != 200:
+            return {'url': url, 'status': response.status_code, 'error': f'HTTP {response.status_code}'}
+        if 'html' not in response.headers.get('content-type', 'text/html'):
+            return {'url': url, 'status': response.status_code, 'error': 'Не HTML'}
+
+        body_hash = hashlib.sha256(response.content).hexdigest()
+        if cached and cached.get('hash') == body_hash:
+            # Сервер не поддерживает условные запросы, но страница та же
+            analysis = cached['analysis']
+            changed = False
+        else:
+            try:
+                analysis = await asyncio.to_thread(analyze_html, response.text, str(response.url))
+            except Exception as e:
+                return {'url': url, 'status': response.status_code, 'error': f'Не удалось разобрать HTML: {e}'}
+            stats['analysed'] += 1
+            changed = True
+
+        if self.cache is not None:
+            self.cache.set(url, {
+                'etag': response.headers.get('etag'),
+                'last_modified': response.headers.get('last-modified'),
+                'hash': body_hash,
+                'analysis': analysis,
+            })
+        return {'url': url, 'status': 200, 'changed': changed, 'analysis': analysis}
+
+    async def _check_link(self, client: httpx.AsyncClient, url: str) -> Dict:
+        """HEAD-проверка ссылки (GET, если сервер не принимает HEAD)"""
+        try:
+            response = await client.head(url)
+            if response.status_code in (403, 405, 501):
+                async with client.stream('GET', url) as response:
+                    pass
+            return {'url': url, 'status': response.status_code, 'ok': response.status_code < 400}
+        except httpx.HTTPError as e:
+            return {'url': url, 'status': None, 'ok': False, 'error': str(e) or type(e).__name__}
+
+    async def crawl(
+        self,
+        start_url: str,
+        check_links: bool = True,
+        progress: Optional[Callable[[int, int], Any]] = None
+    ) -> Dict:
+        """
+        Обход сайта
+
+        Args:
+            start_url: Стартовая страница
+            check_links: Проверять ли найденные ссылки (включая внешние)
+            progress: Колбэк progress(обработано_страниц, в_очереди), может быть корутиной
+
+        Returns:
+            {'pages': [...], 'broken_links': [...], 'stats': {...}}
+        """
+        started = time.perf_counter()
+        start_url = urldefrag(start_url)[0]
+        origin = self._origin(start_url)
+        stats = {'fetched': 0, 'not_modified': 0, 'analysed': 0, 'links_checked': 0}
+
+        seen = {start_url}
+        found_on: Dict[str, str] = {}  # ссылка -> первая страница, где она встретилась
+        pages: List[Dict] = []
+        queue: asyncio.Queue = asyncio.Queue()
+        queue.put_nowait((start_url, 0))
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async with httpx.AsyncClient(
+            headers=HEADERS, timeout=self.timeout, limits=self.limits, follow_redirects=True
+        ) as client:
+
+            async def visit(url: str, depth: int):
+                async with semaphore:
+                    page = await self._fetch_page(client, url, stats)
+                page['depth'] = depth
+                pages.append(page)
+
+                for link in (page.get('analysis') or {}).get('links', []):
+                    found_on.setdefault(link, url)
+                    if (
+                        depth < self.max_depth
+                        and link not in seen
+                        and len(seen) < self.max_pages
+                        and self._origin(link) == origin
+                    ):
+                        seen.add(link)
+                        queue.put_nowait((link, depth + 1))
+                await self._report(progress, len(pages), len(seen))
+
+            # Страницы следующего уровня ставятся в очередь по мере разбора - без барьеров по глубине
+            tasks = set()
+            while True:
+                while not queue.empty():
+                    url, depth = queue.get_nowait()
+                    tasks.add(asyncio.create_task(visit(url, depth)))
+                if not tasks:
+                    break
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    task.result()
+
+            broken = []
+            if check_links:
+                crawled = {p['url'] for p in pages}
+                to_check = [link for link in found_on if link not in crawled]
+                link_semaphore = asyncio.Semaphore(self.link_concurrency)
+
+                async def check(link: str):
+                    async with link_semaphore:
+                        return await self._check_link(client, link)
+
+                results = await asyncio.gather(*[check(link) for link in to_check])
+                stats['links_checked'] = len(results)
+                broken = [
+                    {**r, 'found_on': found_on[r['url']]} for r in results if not r['ok']
+                ]
+                # Страницы сайта, которые не открылись при обходе, - тоже битые ссылки
+                broken += [
+                    {'url': p['url'], 'status': p['status'], 'ok': False,
+                     'error': p['error'], 'found_on': found_on.get(p['url'], start_url)}
+                    for p in pages
+                    if p['url'] != start_url and (p['status'] is None or p['status'] >= 400)
+                ]
+
+        if self.cache is not None:
+            await self.cache.save()
+
+        pages.sort(key=lambda p: (p['depth'], p['url']))
+        stats['pages'] = len(pages)
+        stats['elapsed'] = round(time.perf_counter() - started, 2)
+        return {'start_url': start_url, 'pages': pages, 'broken_links': broken, 'stats': stats}
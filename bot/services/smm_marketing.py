@@ -6,6 +6,8 @@ from typing import Optional, Dict, List
 from datetime import datetime, timedelta
 import json
 
+from .async_cache import create_completion
+
 
 class SMMMarketingService:
     """Сервис для SMM и маркетинга"""
@@ -55,7 +57,8 @@ class SMMMarketingService:
 
 Формат: JSON с ключами: day, theme, type, description, time, hashtags, cta"""
 
-            response = self.openai.chat.completions.create(
+            response = await create_completion(
+                self.openai,
                 model="gpt-4o",
                 messages=[
                     {"role": "system", "content": "Ты профессиональный SMM-менеджер и контент-стратег."},
@@ -109,7 +112,8 @@ class SMMMarketingService:
 
 Будь максимально конкретным и практичным."""
 
-            response = self.openai.chat.completions.create(
+            response = await create_completion(
+                self.openai,
                 model="gpt-4o",
                 messages=[
                     {"role": "system", "content": "Ты эксперт по маркетингу и анализу целевой аудитории."},
@@ -175,7 +179,8 @@ class SMMMarketingService:
 
 Для каждого этапа дай конкретные действия и примеры."""
 
-            response = self.openai.chat.completions.create(
+            response = await create_completion(
+                self.openai,
                 model="gpt-4o",
                 messages=[
                     {"role": "system", "content": "Ты эксперт по маркетинговым воронкам и продажам."},
@@ -240,7 +245,8 @@ class SMMMarketingService:
 
 Язык: {language}"""
 
-            response = self.openai.chat.completions.create(
+            response = await create_completion(
+                self.openai,
                 model="gpt-4o",
                 messages=[
                     {"role": "system", "content": "Ты топовый копирайтер и маркетолог. Пишешь тексты которые продают."},
@@ -293,7 +299,8 @@ class SMMMarketingService:
 2. Средние (средняя конкуренция)
 3. Нишевые (низкая конкуренция)"""
 
-            response = self.openai.chat.completions.create(
+            response = await create_completion(
+                self.openai,
                 model="gpt-4o-mini",
                 messages=[
                     {"role": "system", "content": "Ты эксперт по SMM и хештегам."},
@@ -348,7 +355,8 @@ class SMMMarketingService:
 
 Дай конкретные рекомендации для победы."""
 
-            response = self.openai.chat.completions.create(
+            response = await create_completion(
+                self.openai,
                 model="gpt-4o",
                 messages=[
                     {"role": "system", "content": "Ты эксперт по конкурентному анализу и маркетинговой стратегии."},
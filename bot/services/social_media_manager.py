@@ -3,6 +3,7 @@
 Работает даже если API ключи отсутствуют
 """
 from typing import Optional, Dict
+import asyncio
 import logging
 
 
@@ -41,19 +42,27 @@ class SocialMediaManager:
                 print(f"⚠️ Instagram недоступен: {e}")
         
         # YouTube
-        if self.config.YOUTUBE_API_KEY:
+        if self.config.YOUTUBE_ACCESS_TOKEN:
             try:
                 from .platforms.youtube_client import YouTubeClient
-                self.youtube = YouTubeClient(self.config.YOUTUBE_API_KEY)
+                self.youtube = YouTubeClient(
+                    self.config.YOUTUBE_ACCESS_TOKEN,
+                    base_url=self.config.YOUTUBE_UPLOAD_URL,
+                    chunk_size=self.config.UPLOAD_CHUNK_MB * 1024 * 1024
+                )
                 print("✅ YouTube клиент инициализирован")
             except Exception as e:
                 print(f"⚠️ YouTube недоступен: {e}")
         
         # TikTok
-        if self.config.TIKTOK_SESSION_ID:
+        if self.config.TIKTOK_ACCESS_TOKEN:
             try:
                 from .platforms.tiktok_client import TikTokClient
-                self.tiktok = TikTokClient(self.config.TIKTOK_SESSION_ID)
+                self.tiktok = TikTokClient(
+                    self.config.TIKTOK_ACCESS_TOKEN,
+                    base_url=self.config.TIKTOK_API_URL,
+                    chunk_size=self.config.UPLOAD_CHUNK_MB * 1024 * 1024
+                )
                 print("✅ TikTok клиент инициализирован")
             except Exception as e:
                 print(f"⚠️ TikTok недоступен: {e}")
@@ -112,7 +121,8 @@ class SocialMediaManager:
         title: str,
         description: str,
         video_path: str,
-        tags: list = None
+        tags: list = None,
+        progress=None
     ) -> Dict[str, any]:
         """
         Публикация на YouTube
@@ -122,6 +132,7 @@ class SocialMediaManager:
             description: Описание
             video_path: Путь к видео
             tags: Теги
+            progress: Колбэк progress(отправлено_байт, всего_байт)
             
         Returns:
             Результат публикации
@@ -129,11 +140,13 @@ class SocialMediaManager:
         if not self.youtube:
             return {
                 'success': False,
-                'error': 'YouTube API не настроен. Добавьте YOUTUBE_API_KEY.'
+                'error': 'YouTube API не настроен. Добавьте YOUTUBE_ACCESS_TOKEN.'
             }
         
         try:
-            result = await self.youtube.upload(title, description, video_path, tags)
+            result = await self.youtube.upload(
+                title, description, video_path, tags, progress=progress
+            )
             return {'success': True, 'data': result}
         except Exception as e:
             return {'success': False, 'error': str(e)}
@@ -142,7 +155,8 @@ class SocialMediaManager:
         self,
         caption: str,
         video_path: str,
-        hashtags: list = None
+        hashtags: list = None,
+        progress=None
     ) -> Dict[str, any]:
         """
         Публикация в TikTok
@@ -151,6 +165,7 @@ class SocialMediaManager:
             caption: Описание видео
             video_path: Путь к видео
             hashtags: Хештеги
+            progress: Колбэк progress(отправлено_байт, всего_байт)
             
         Returns:
             Результат публикации
@@ -158,11 +173,11 @@ class SocialMediaManager:
         if not self.tiktok:
             return {
                 'success': False,
-                'error': 'TikTok API не настроен. Добавьте TIKTOK_SESSION_ID.'
+                'error': 'TikTok API не настроен. Добавьте TIKTOK_ACCESS_TOKEN.'
             }
         
         try:
-            result = await self.tiktok.post(caption, video_path, hashtags)
+            result = await self.tiktok.post(caption, video_path, hashtags, progress=progress)
             return {'success': True, 'data': result}
         except Exception as e:
             return {'success': False, 'error': str(e)}
@@ -209,16 +224,16 @@ class SocialMediaManager:
         Returns:
             Результаты для каждой платформы
         """
-        results = {}
+        jobs = {}
         
         if self.instagram and 'instagram' in content:
-            results['instagram'] = await self.post_to_instagram(
+            jobs['instagram'] = self.post_to_instagram(
                 content['instagram'],
                 media_path
             )
         
         if self.facebook and 'facebook' in content:
-            results['facebook'] = await self.post_to_facebook(
+            jobs['facebook'] = self.post_to_facebook(
                 content['facebook'],
                 media_path
             )
@@ -226,16 +241,19 @@ class SocialMediaManager:
         # YouTube и TikTok требуют видео
         if media_path and media_path.endswith(('.mp4', '.mov', '.avi')):
             if self.youtube and 'youtube' in content:
-                results['youtube'] = await self.post_to_youtube(
+                jobs['youtube'] = self.post_to_youtube(
                     content.get('youtube_title', 'Video'),
                     content['youtube'],
                     media_path
                 )
             
             if self.tiktok and 'tiktok' in content:
-                results['tiktok'] = await self.post_to_tiktok(
+                jobs['tiktok'] = self.post_to_tiktok(
                     content['tiktok'],
                     media_path
                 )
         
+        # Платформы публикуются параллельно; post_to_* сами ловят ошибки
+        results = dict(zip(jobs.keys(), await asyncio.gather(*jobs.values())))
+        
         return results
@@ -1,80 +1,194 @@
 """
 Менеджер социальных сетей с реальными API
 """
-from typing import Optional, Dict
+from typing import Optional, Dict, List, Callable, Any
 import os
+import json
+import asyncio
+
+from bot.services.blocking_executor import LaneExecutor
+from bot.services.platforms.facebook_client import FacebookClient
 
 
 class SocialMediaManager:
     """Менеджер для автопостинга в соцсети"""
     
+    INSTAGRAM_SETTINGS_KEY = 'instagram_session_settings'
+    
     def __init__(
         self,
         instagram_username: Optional[str] = None,
         instagram_password: Optional[str] = None,
-        facebook_token: Optional[str] = None
+        facebook_token: Optional[str] = None,
+        instagram_workers: int = 2,
+        db=None,
+        instagram_settings_path: Optional[str] = None,
+        facebook_graph_url: str = "https://graph.facebook.com",
+        facebook_api_version: str = "v18.0"
     ):
         """
-        Инициализация менеджера
+        Инициализация менеджера (без сетевых запросов - вход в Instagram
+        выполняет connect_instagram() в фоне после старта бота)
+        
+        Args:
+            instagram_username: Логин Instagram
+            instagram_password: Пароль Instagram
+            facebook_token: Токен Facebook Graph API
+            instagram_workers: Потоков в пуле для блокирующих вызовов instagrapi
+            db: DatabaseRepository для хранения сессии (переживает редеплой)
+            instagram_settings_path: Файл сессии, если БД не передана
+            facebook_graph_url: Адрес Graph API
+            facebook_api_version: Версия Graph API
         """
         self.instagram_available = False
         self.facebook_available = False
+        self.my_username = None
+        self.instagram_client = None
+        
+        self.instagram_username = instagram_username
+        self.instagram_password = instagram_password
+        self.instagram_session_id = os.getenv('INSTAGRAM_SESSION_ID')
+        self.db = db
+        self.instagram_settings_path = instagram_settings_path
+        
+        # instagrapi синхронный: все его вызовы уходят в отдельный пул,
+        # запросы одного аккаунта выполняются строго по очереди
+        self.instagram_executor = LaneExecutor('instagrapi', max_workers=instagram_workers)
+        self.instagram_lane = instagram_username or 'default'
         
         # Instagram (через instagrapi)
         try:
             from instagrapi import Client
             self.instagram_client = Client()
             
-            session_id = os.getenv('INSTAGRAM_SESSION_ID')
-            
-            # 1. Сначала пробуем Session ID (самый надежный способ)
-            if session_id:
-                try:
-                    self.instagram_client.login_by_sessionid(session_id)
-                    self.instagram_available = True
-                    # Узнаем, кто мы
-                    try:
-                        self.my_info = self.instagram_client.account_info()
-                        self.my_username = self.my_info.username
-                        print(f"✅ Instagram подключен как: {self.my_username}")
-                    except:
-                        self.my_username = "Unknown"
-                        
-                    print("✅ Instagram подключен (через Session ID)")
-                except Exception as e:
-                    print(f"⚠️ Ошибка входа по Session ID: {e}")
-            
-            # 2. Если не вышло - пробуем Логин/Пароль
-            if not self.instagram_available and instagram_username and instagram_password:
-                try:
-                    self.instagram_client.login(instagram_username, instagram_password)
-                    self.instagram_available = True
-                    
-                    # Узнаем, кто мы
-                    try:
-                        self.my_info = self.instagram_client.account_info()
-                        self.my_username = self.my_info.username
-                    except:
-                        self.my_username = "Unknown"
-
-                    print(f"✅ Instagram подключен (Логин/Пароль) как: {self.my_username}")
-                except Exception as e:
-                    print(f"⚠️ Instagram недоступен (Логин/Пароль): {e}")
-                    
-            if not self.instagram_available:
+            # Сохраненная сессия (cookies, device, uuid) - вход без логина заново
+            saved = self._load_instagram_settings()
+            if saved:
+                self.instagram_client.set_settings(saved['settings'])
+                self.my_username = saved.get('username')
+                # Оптимистично считаем сессию рабочей, проверка - в фоне
+                self.instagram_available = True
+                print(f"✅ Instagram: сессия восстановлена ({self.my_username}), проверка в фоне")
+            elif not (self.instagram_session_id or (instagram_username and instagram_password)):
                 print("⚠️ Instagram не подключен. Укажите INSTAGRAM_SESSION_ID или Логин/Пароль")
                 
         except Exception as e:
             print(f"⚠️ Ошибка инициализации Instagram: {e}")
         
         # Facebook (через Graph API)
+        self.facebook = None
         if facebook_token:
             self.facebook_token = facebook_token
+            # Один клиент на все публикации: пул соединений с keep-alive
+            self.facebook = FacebookClient(
+                facebook_token,
+                base_url=facebook_graph_url,
+                api_version=facebook_api_version
+            )
             self.facebook_available = True
             print("✅ Facebook подключен")
         else:
             print("⚠️ Facebook: нужен FACEBOOK_ACCESS_TOKEN")
     
+    async def _instagram_call(self, func: Callable, *args, **kwargs) -> Any:
+        """Выполнить блокирующий вызов instagrapi в пуле (в полосе аккаунта)"""
+        return await self.instagram_executor.run(self.instagram_lane, func, *args, **kwargs)
+    
+    def _load_instagram_settings(self) -> Optional[Dict]:
+        """Прочитать сохраненную сессию instagrapi (БД или файл)"""
+        try:
+            if self.db:
+                raw = self.db.get_setting(self.INSTAGRAM_SETTINGS_KEY)
+            elif self.instagram_settings_path and os.path.exists(self.instagram_settings_path):
+                with open(self.instagram_settings_path, 'r', encoding='utf-8') as f:
+                    raw = f.read()
+            else:
+                raw = None
+            return json.loads(raw) if raw else None
+        except Exception as e:
+            print(f"⚠️ Не удалось прочитать сессию Instagram: {e}")
+            return None
+    
+    def _save_instagram_settings(self):
+        """Сохранить текущую сессию instagrapi (БД или файл)"""
+        try:
+            raw = json.dumps({
+                'username': self.my_username,
+                'settings': self.instagram_client.get_settings()
+            })
+            if self.db:
+                self.db.set_setting(self.INSTAGRAM_SETTINGS_KEY, raw)
+            elif self.instagram_settings_path:
+                directory = os.path.dirname(self.instagram_settings_path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                tmp_path = self.instagram_settings_path + '.tmp'
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    f.write(raw)
+                os.replace(tmp_path, self.instagram_settings_path)
+        except Exception as e:
+            print(f"⚠️ Не удалось сохранить сессию Instagram: {e}")
+    
+    def _instagram_login(self) -> str:
+        """
+        Синхронная проверка/вход (выполняется в пуле)
+        
+        Returns:
+            Способ подключения
+        """
+        client = self.instagram_client
+        
+        # 1. Сохраненная сессия: один легкий запрос вместо полного логина
+        if self.instagram_available:
+            try:
+                self.my_username = client.account_info().username
+                return 'сохраненная сессия'
+            except Exception as e:
+                print(f"⚠️ Сохраненная сессия Instagram недействительна: {e}")
+                self.instagram_available = False
+        
+        # 2. Session ID (самый надежный способ)
+        if self.instagram_session_id:
+            try:
+                client.login_by_sessionid(self.instagram_session_id)
+                # login_by_sessionid уже загрузил профиль
+                self.my_username = client.username or client.account_info().username
+                return 'Session ID'
+            except Exception as e:
+                print(f"⚠️ Ошибка входа по Session ID: {e}")
+        
+        # 3. Логин/Пароль (настройки устройства сохранены - меньше челленджей)
+        if self.instagram_username and self.instagram_password:
+            client.login(self.instagram_username, self.instagram_password)
+            self.my_username = client.username or self.instagram_username
+            return 'Логин/Пароль'
+        
+        raise RuntimeError("нет действующей сессии и учетных данных")
+    
+    async def connect_instagram(self) -> bool:
+        """
+        Фоновая проверка сессии и вход в Instagram (вызывается из post_init)
+        
+        Returns:
+            Подключен ли Instagram
+        """
+        if self.instagram_client is None:
+            return False
+        if not (self.instagram_available or self.instagram_session_id
+                or (self.instagram_username and self.instagram_password)):
+            return False
+        
+        try:
+            method = await self._instagram_call(self._instagram_login)
+            self.instagram_available = True
+            await self._instagram_call(self._save_instagram_settings)
+            print(f"✅ Instagram подключен ({method}) как: {self.my_username}")
+        except Exception as e:
+            self.instagram_available = False
+            print(f"⚠️ Instagram недоступен: {e}")
+        
+        return self.instagram_available
+    
     async def post_instagram(
         self,
         caption: str,
@@ -99,7 +213,8 @@ class SocialMediaManager:
         try:
             if image_path:
                 # Пост с фото
-                media = self.instagram_client.photo_upload(
+                media = await self._instagram_call(
+                    self.instagram_client.photo_upload,
                     image_path,
                     caption=caption
                 )
@@ -122,13 +237,19 @@ class SocialMediaManager:
                 'error': f'Ошибка Instagram: {str(e)}'
             }
     
-    async def post_facebook(self, message: str, link: Optional[str] = None) -> Dict:
+    async def post_facebook(
+        self,
+        message: str,
+        link: Optional[str] = None,
+        image_path: Optional[str] = None
+    ) -> Dict:
         """
         Опубликовать в Facebook
         
         Args:
             message: Текст поста
             link: Ссылка (опционально)
+            image_path: Путь к изображению (опционально)
             
         Returns:
             Результат публикации
@@ -140,40 +261,103 @@ class SocialMediaManager:
             }
         
         try:
-            import requests
-            
-            url = f"https://graph.facebook.com/v18.0/me/feed"
-            
-            params = {
-                'message': message,
-                'access_token': self.facebook_token
-            }
-            
-            if link:
-                params['link'] = link
-            
-            response = requests.post(url, params=params)
-            data = response.json()
-            
-            if 'id' in data:
-                return {
-                    'success': True,
-                    'platform': 'Facebook',
-                    'post_id': data['id'],
-                    'url': f"https://facebook.com/{data['id']}"
-                }
-            else:
-                return {
-                    'success': False,
-                    'error': data.get('error', {}).get('message', 'Unknown error')
-                }
-            
+            data = await self.facebook.post(message, image_path=image_path, link=link)
+            # Для фото Graph API возвращает и id фото, и post_id
+            return self._facebook_result(data.get('post_id') or data['id'])
         except Exception as e:
             return {
                 'success': False,
                 'error': f'Ошибка Facebook: {str(e)}'
             }
     
+    @staticmethod
+    def _facebook_result(post_id: str) -> Dict:
+        return {
+            'success': True,
+            'platform': 'Facebook',
+            'post_id': post_id,
+            'url': f"https://facebook.com/{post_id}"
+        }
+    
+    async def post_facebook_batch(self, messages: List[str]) -> List[Dict]:
+        """
+        Опубликовать несколько постов в Facebook одним batch-запросом
+        
+        Args:
+            messages: Тексты постов
+            
+        Returns:
+            Результаты публикации в том же порядке
+        """
+        if not self.facebook_available:
+            return [
+                {'success': False, 'error': 'Facebook недоступен. Добавьте FACEBOOK_ACCESS_TOKEN.'}
+                for _ in messages
+            ]
+        
+        try:
+            results = await self.facebook.post_many([{'message': m} for m in messages])
+        except Exception as e:
+            return [{'success': False, 'error': f'Ошибка Facebook: {str(e)}'} for _ in messages]
+        
+        return [
+            self._facebook_result(r['data'].get('id')) if r['success']
+            else {'success': False, 'error': f"Ошибка Facebook: {r['error']}"}
+            for r in results
+        ]
+    
+    async def post_to_platforms(
+        self,
+        caption: str,
+        platforms: List[str],
+        image_path: Optional[str] = None
+    ) -> Dict[str, Dict]:
+        """
+        Кросс-постинг: одна публикация во все платформы одновременно
+        
+        Args:
+            caption: Текст поста
+            platforms: Платформы ('Instagram', 'Facebook')
+            image_path: Общий файл изображения (скачивается один раз)
+            
+        Returns:
+            Результат для каждой платформы
+        """
+        publishers = {
+            'Instagram': lambda: self.post_instagram(caption, image_path),
+            'Facebook': lambda: self.post_facebook(caption, image_path=image_path),
+        }
+        
+        async def publish(platform: str) -> Dict:
+            if platform not in publishers:
+                return {'success': False, 'error': f'Неизвестная платформа: {platform}'}
+            try:
+                return await publishers[platform]()
+            except Exception as e:
+                return {'success': False, 'error': str(e)}
+        
+        # Задержка кросс-поста = самая медленная платформа, а не сумма
+        results = await asyncio.gather(*[publish(p) for p in platforms])
+        return dict(zip(platforms, results))
+    
+    def _fetch_my_medias(self, limit: int):
+        """Синхронная загрузка медиа своего аккаунта (выполняется в пуле)"""
+        # Получаем ID пользователя
+        user_id = self.instagram_client.user_id_from_username(self.my_username)
+        # Получаем медиа с обработкой ошибок API
+        try:
+            return self.instagram_client.user_medias(user_id, amount=limit)
+        except (KeyError, TypeError) as api_error:
+            # Instagram API изменился - пробуем альтернативный метод
+            try:
+                # Пробуем получить через account_info и затем медиа
+                account_info = self.instagram_client.account_info()
+                return self.instagram_client.user_medias(account_info.pk, amount=limit)
+            except Exception:
+                raise RuntimeError(
+                    f"Instagram API недоступен. Возможно, нужен обновленный Session ID. Ошибка: {str(api_error)}"
+                )
+    
     async def get_my_posts(self, limit: int = 5) -> Dict:
         """
         Получить последние посты своего аккаунта для анализа
@@ -182,23 +366,7 @@ class SocialMediaManager:
             return {"success": False, "error": "Instagram не подключен"}
             
         try:
-            # Получаем ID пользователя
-            user_id = self.instagram_client.user_id_from_username(self.my_username)
-            # Получаем медиа с обработкой ошибок API
-            try:
-                medias = self.instagram_client.user_medias(user_id, amount=limit)
-            except (KeyError, TypeError) as api_error:
-                # Instagram API изменился - пробуем альтернативный метод
-                try:
-                    # Пробуем получить через account_info и затем медиа
-                    account_info = self.instagram_client.account_info()
-                    user_id = account_info.pk
-                    medias = self.instagram_client.user_medias(user_id, amount=limit)
-                except Exception as fallback_error:
-                    return {
-                        "success": False, 
-                        "error": f"Instagram API недоступен. Возможно, нужен обновленный Session ID. Ошибка: {str(api_error)}"
-                    }
+            medias = await self._instagram_call(self._fetch_my_medias, limit)
             
             posts_data = []
             for media in medias:
@@ -232,6 +400,21 @@ class SocialMediaManager:
                 "error": f"Ошибка получения постов: {str(e)}. Возможно, нужен обновленный Session ID."
             }
 
+    def _edit_profile(self, biography: str = None, full_name: str = None, external_url: str = None):
+        """Синхронное обновление профиля (выполняется в пуле)"""
+        # Сначала получаем текущие данные, чтобы не стереть лишнее
+        current_info = self.instagram_client.account_info()
+        
+        new_biography = biography if biography is not None else current_info.biography
+        new_full_name = full_name if full_name is not None else current_info.full_name
+        new_external_url = external_url if external_url is not None else current_info.external_url
+        
+        self.instagram_client.account_edit(
+            biography=new_biography,
+            first_name=new_full_name,
+            external_url=new_external_url
+        )
+
     async def update_profile(self, biography: str = None, full_name: str = None, external_url: str = None) -> Dict:
         """
         Обновление информации профиля (Био, Имя, Сайт)
@@ -240,18 +423,7 @@ class SocialMediaManager:
             return {"success": False, "error": "Нет подключения к Instagram"}
             
         try:
-            # Сначала получаем текущие данные, чтобы не стереть лишнее
-            current_info = self.instagram_client.account_info()
-            
-            new_biography = biography if biography is not None else current_info.biography
-            new_full_name = full_name if full_name is not None else current_info.full_name
-            new_external_url = external_url if external_url is not None else current_info.external_url
-            
-            self.instagram_client.account_edit(
-                biography=new_biography,
-                first_name=new_full_name,
-                external_url=new_external_url
-            )
+            await self._instagram_call(self._edit_profile, biography, full_name, external_url)
             return {"success": True, "message": "Профиль успешно обновлен!"}
         except Exception as e:
             return {"success": False, "error": f"Ошибка обновления профиля: {str(e)}"}
@@ -266,6 +438,7 @@ class SocialMediaManager:
         return {
             'instagram': self.instagram_available,
             'facebook': self.facebook_available,
+            'instagram_executor': self.instagram_executor.get_stats(),
             'available_platforms': [
                 p for p, available in [
                     ('Instagram', self.instagram_available),
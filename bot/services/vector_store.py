@@ -0,0 +1,262 @@
+"""
+Локальное векторное хранилище на диске (разбиение по пользователям)
+"""
+from typing import Optional, List, Dict
+import os
+import json
+import time
+import threading
+
+import numpy as np
+
+
+class _Partition:
+    """Одна партиция хранилища (все записи одного пользователя)"""
+
+    def __init__(self, path: str, dim: Optional[int] = None):
+        self.path = path
+        self.dim = dim
+        self.records: Dict[str, Dict] = {}
+        self._matrix = None
+
+        os.makedirs(path, exist_ok=True)
+        self._load()
+
+    @property
+    def log_path(self) -> str:
+        return os.path.join(self.path, 'records.jsonl')
+
+    @property
+    def vectors_path(self) -> str:
+        return os.path.join(self.path, 'vectors.f32')
+
+    def _load(self):
+        """Восстанавливает индекс записей из журнала"""
+        if not os.path.exists(self.log_path):
+            return
+
+        with open(self.log_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # Недописанная строка после аварийного завершения
+                    continue
+                if entry.get('op') == 'del':
+                    for record_id in entry.get('ids', []):
+                        self.records.pop(record_id, None)
+                else:
+                    self.dim = entry.get('dim', self.dim)
+                    self.records[entry['id']] = entry
+
+    @property
+    def rows(self) -> int:
+        """Количество векторов в файле"""
+        if not self.dim or not os.path.exists(self.vectors_path):
+            return 0
+        return os.path.getsize(self.vectors_path) // (4 * self.dim)
+
+    def matrix(self) -> np.ndarray:
+        """Матрица эмбеддингов, отображенная в память (memmap)"""
+        rows = self.rows
+        if rows == 0:
+            return np.zeros((0, self.dim or 0), dtype=np.float32)
+        if self._matrix is None or self._matrix.shape[0] != rows:
+            self._matrix = np.memmap(
+                self.vectors_path, dtype=np.float32, mode='r', shape=(rows, self.dim)
+            )
+        return self._matrix
+
+    def _append_log(self, entries: List[Dict]):
+        with open(self.log_path, 'a', encoding='utf-8') as f:
+            for entry in entries:
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+    def upsert(self, ids: List[str], documents: List[str], metadatas: List[Dict], embeddings: np.ndarray) -> int:
+        """Добавляет новые записи, существующие только обновляет. Возвращает число новых"""
+        now = time.time()
+        entries = []
+        new_vectors = []
+        next_row = self.rows
+
+        for record_id, document, metadata, vector in zip(ids, documents, metadatas, embeddings):
+            existing = self.records.get(record_id)
+            if existing:
+                # Тот же контент - вектор не меняется, обновляем метаданные и время
+                row = existing['row']
+            else:
+                row = next_row
+                next_row += 1
+                new_vectors.append(vector)
+
+            entry = {
+                'op': 'put',
+                'id': record_id,
+                'row': row,
+                'dim': self.dim,
+                'document': document,
+                'metadata': metadata,
+                'created_at': now,
+            }
+            self.records[record_id] = entry
+            entries.append(entry)
+
+        if new_vectors:
+            with open(self.vectors_path, 'ab') as f:
+                f.write(np.asarray(new_vectors, dtype=np.float32).tobytes())
+            self._matrix = None
+
+        self._append_log(entries)
+        return len(new_vectors)
+
+    def delete(self, ids: List[str]):
+        """Удаляет записи и уплотняет файлы партиции"""
+        for record_id in ids:
+            self.records.pop(record_id, None)
+
+        matrix = self.matrix()
+        survivors = sorted(self.records.values(), key=lambda r: r['row'])
+        vectors = np.asarray([matrix[r['row']] for r in survivors], dtype=np.float32)
+
+        for new_row, record in enumerate(survivors):
+            record['row'] = new_row
+
+        self._matrix = None
+        tmp_vectors = self.vectors_path + '.tmp'
+        tmp_log = self.log_path + '.tmp'
+        with open(tmp_vectors, 'wb') as f:
+            f.write(vectors.tobytes())
+        with open(tmp_log, 'w', encoding='utf-8') as f:
+            for record in survivors:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        os.replace(tmp_vectors, self.vectors_path)
+        os.replace(tmp_log, self.log_path)
+
+    def filter(self, where: Optional[Dict] = None) -> List[Dict]:
+        """Записи, у которых метаданные совпадают с фильтром"""
+        where = where or {}
+        return [
+            r for r in self.records.values()
+            if all(r['metadata'].get(k) == v for k, v in where.items())
+        ]
+
+
+class VectorStore:
+    """Персистентное векторное хранилище: одна партиция на пользователя"""
+
+    def __init__(self, root_dir: str):
+        """
+        Инициализация хранилища
+
+        Args:
+            root_dir: Каталог для хранения партиций
+        """
+        self.root_dir = root_dir
+        self._partitions: Dict[str, _Partition] = {}
+        self._lock = threading.Lock()
+        os.makedirs(root_dir, exist_ok=True)
+
+    def _partition(self, name: str, dim: Optional[int] = None) -> _Partition:
+        """Партиции открываются лениво - старт не зависит от объема памяти"""
+        partition = self._partitions.get(name)
+        if partition is None:
+            partition = _Partition(os.path.join(self.root_dir, name), dim)
+            self._partitions[name] = partition
+        if partition.dim is None:
+            partition.dim = dim
+        return partition
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def upsert(
+        self,
+        partition: str,
+        ids: List[str],
+        documents: List[str],
+        metadatas: List[Dict],
+        embeddings: List[List[float]]
+    ) -> int:
+        """
+        Добавить или обновить записи
+
+        Returns:
+            Количество действительно новых записей
+        """
+        vectors = self._normalize(embeddings)
+        with self._lock:
+            part = self._partition(partition, vectors.shape[-1])
+            if part.dim != vectors.shape[-1]:
+                raise ValueError(
+                    f"Размерность эмбеддинга {vectors.shape[-1]} не совпадает с хранилищем ({part.dim})"
+                )
+            return part.upsert(ids, documents, metadatas, vectors)
+
+    def query(
+        self,
+        partition: str,
+        embedding: List[float],
+        limit: int = 5,
+        where: Optional[Dict] = None
+    ) -> List[Dict]:
+        """
+        Поиск ближайших записей (косинусная близость, полный перебор)
+
+        Returns:
+            Записи с полем score, отсортированные по убыванию близости
+        """
+        query = self._normalize(embedding)
+        with self._lock:
+            part = self._partition(partition)
+            candidates = part.filter(where)
+            if not candidates or not part.dim:
+                return []
+            if part.dim != query.shape[-1]:
+                raise ValueError(
+                    f"Размерность запроса {query.shape[-1]} не совпадает с хранилищем ({part.dim})"
+                )
+
+            rows = np.fromiter((r['row'] for r in candidates), dtype=np.int64, count=len(candidates))
+            scores = part.matrix()[rows] @ query
+
+        k = min(limit, len(candidates))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+
+        return [
+            {**candidates[i], 'score': float(scores[i])}
+            for i in top
+        ]
+
+    def get(
+        self,
+        partition: str,
+        where: Optional[Dict] = None,
+        limit: Optional[int] = None
+    ) -> List[Dict]:
+        """Записи партиции, от новых к старым"""
+        with self._lock:
+            records = self._partition(partition).filter(where)
+        records.sort(key=lambda r: r['created_at'], reverse=True)
+        return records[:limit] if limit else records
+
+    def delete(self, partition: str, where: Optional[Dict] = None) -> int:
+        """
+        Удалить записи партиции по фильтру
+
+        Returns:
+            Количество удаленных записей
+        """
+        with self._lock:
+            part = self._partition(partition)
+            ids = [r['id'] for r in part.filter(where)]
+            if ids:
+                part.delete(ids)
+            return len(ids)
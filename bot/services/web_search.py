@@ -2,22 +2,37 @@
 Поиск в интернете через Tavily API
 """
 from typing import Optional, List, Dict
-import os
+import asyncio
+
+from .async_cache import TTLCache, SingleFlight, normalize_text
 
 
 class WebSearchService:
     """Сервис поиска в интернете"""
-    
-    def __init__(self, api_key: Optional[str] = None):
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        search_depth: str = "basic",
+        cache_ttl: float = 1800,
+        cache_size: int = 256
+    ):
         """
         Инициализация сервиса
-        
+
         Args:
             api_key: Tavily API ключ
+            search_depth: Глубина поиска по умолчанию (basic | advanced)
+            cache_ttl: Сколько хранить результаты (секунды)
+            cache_size: Максимум запросов в кеше
         """
         self.api_key = api_key
         self.is_available = api_key is not None
-        
+        self.search_depth = search_depth
+        self.cache = TTLCache(maxsize=cache_size, ttl=cache_ttl)
+        self.flight = SingleFlight()
+        self.upstream_calls = 0
+
         if self.is_available:
             try:
                 from tavily import TavilyClient
@@ -28,15 +43,39 @@ class WebSearchService:
                 self.is_available = False
         else:
             print("⚠️ TAVILY_API_KEY не найден - поиск недоступен")
-    
-    async def search(self, query: str, max_results: int = 5) -> Dict:
+
+    async def _cached_search(self, key: tuple, **params) -> Dict:
+        """
+        Запрос к Tavily через кеш: повторный запрос берется из кеша,
+        одинаковые одновременные запросы уходят в API один раз
+        """
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        async def fetch():
+            self.upstream_calls += 1
+            # TavilyClient синхронный - не блокируем event loop
+            response = await asyncio.to_thread(self.client.search, **params)
+            self.cache.set(key, response)
+            return response
+
+        return await self.flight.do(key, fetch)
+
+    async def search(
+        self,
+        query: str,
+        max_results: int = 5,
+        search_depth: Optional[str] = None
+    ) -> Dict:
         """
         Поиск в интернете
-        
+
         Args:
             query: Поисковый запрос
             max_results: Максимум результатов
-            
+            search_depth: basic | advanced (по умолчанию - из настроек)
+
         Returns:
             Результаты поиска
         """
@@ -45,15 +84,18 @@ class WebSearchService:
                 'success': False,
                 'error': 'Поиск недоступен. Добавьте TAVILY_API_KEY.'
             }
-        
+
+        depth = search_depth or self.search_depth
+
         try:
             # Поиск через Tavily
-            response = self.client.search(
+            response = await self._cached_search(
+                ('search', normalize_text(query), max_results, depth),
                 query=query,
                 max_results=max_results,
-                search_depth="advanced"
+                search_depth=depth
             )
-            
+
             results = []
             for item in response.get('results', []):
                 results.append({
@@ -62,27 +104,28 @@ class WebSearchService:
                     'content': item.get('content', ''),
                     'score': item.get('score', 0)
                 })
-            
+
             return {
                 'success': True,
                 'query': query,
                 'results': results,
                 'count': len(results)
             }
-            
+
         except Exception as e:
             return {
                 'success': False,
                 'error': f'Ошибка поиска: {str(e)}'
             }
-    
-    async def get_answer(self, question: str) -> Dict:
+
+    async def get_answer(self, question: str, search_depth: Optional[str] = None) -> Dict:
         """
         Получить прямой ответ на вопрос
-        
+
         Args:
             question: Вопрос
-            
+            search_depth: basic | advanced (по умолчанию - из настроек)
+
         Returns:
             Ответ с источниками
         """
@@ -91,20 +134,35 @@ class WebSearchService:
                 'success': False,
                 'error': 'Поиск недоступен'
             }
-        
+
+        depth = search_depth or self.search_depth
+
         try:
-            # Поиск с ответом
-            response = self.client.qna_search(query=question)
-            
+            # Поиск с ответом (qna_search возвращает только текст, без источников)
+            response = await self._cached_search(
+                ('answer', normalize_text(question), depth),
+                query=question,
+                search_depth=depth,
+                include_answer=True
+            )
+
             return {
                 'success': True,
                 'question': question,
                 'answer': response.get('answer', ''),
                 'sources': response.get('results', [])
             }
-            
+
         except Exception as e:
             return {
                 'success': False,
                 'error': f'Ошибка: {str(e)}'
             }
+
+    def get_stats(self) -> Dict:
+        """Метрики кеша поиска"""
+        return {
+            **self.cache.get_stats(),
+            'coalesced': self.flight.stats['coalesced'],
+            'upstream_calls': self.upstream_calls,
+        }
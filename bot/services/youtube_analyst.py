@@ -1,17 +1,67 @@
 """
 YouTube Analyst - Сервис для анализа видео контента
 """
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 from youtube_transcript_api import YouTubeTranscriptApi
 from urllib.parse import urlparse, parse_qs
+import os
+import inspect
 import re
+import json
+import asyncio
+import hashlib
+
+import httpx
+
+from .async_cache import create_completion, SingleFlight
+
+
+def _timestamp(seconds: float) -> str:
+    """Секунды -> ч:мм:сс или м:сс"""
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    return f"{hours}:{minutes:02d}:{secs:02d}" if hours else f"{minutes}:{secs:02d}"
 
 
 class YouTubeAnalystService:
     """Сервис для анализа YouTube видео"""
-    
-    def __init__(self, openai_client):
+
+    def __init__(
+        self,
+        openai_client,
+        cache_dir: Optional[str] = None,
+        chunk_chars: int = 6000,
+        concurrency: int = 4,
+        map_model: str = "gpt-4o-mini",
+        reduce_model: str = "gpt-4o",
+        batch_concurrency: int = 3,
+        data_api_key: Optional[str] = None
+    ):
+        """
+        Инициализация сервиса
+
+        Args:
+            openai_client: OpenAI клиент
+            cache_dir: Каталог кеша субтитров и саммари (None - без кеша)
+            chunk_chars: Размер фрагмента субтитров для саммари
+            concurrency: Сколько фрагментов обрабатывать одновременно
+            map_model: Модель для саммари фрагментов
+            reduce_model: Модель для итогового отчета
+            batch_concurrency: Сколько видео пакета анализировать одновременно
+            data_api_key: Ключ YouTube Data API для плейлистов (без него - разбор страницы)
+        """
         self.openai = openai_client
+        self.cache_dir = cache_dir
+        self.chunk_chars = chunk_chars
+        self.map_model = map_model
+        self.reduce_model = reduce_model
+        self.batch_concurrency = batch_concurrency
+        self.data_api_key = data_api_key
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._flight = SingleFlight()
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
         print("✅ YouTube Analyst (Видео Аналитик) инициализирован")
 
     def _get_video_id(self, url: str) -> Optional[str]:
@@ -29,64 +79,375 @@ class YouTubeAnalystService:
                 return parsed_url.path.split('/')[2]
         return None
 
-    async def get_video_summary(self, url: str, language: str = 'ru') -> Dict:
+    @staticmethod
+    def _get_playlist_id(url: str) -> Optional[str]:
+        """ID плейлиста (для канала /channel/UC... - плейлист его загрузок)"""
+        parsed_url = urlparse(url)
+        if parsed_url.hostname not in ('www.youtube.com', 'youtube.com', 'm.youtube.com'):
+            return None
+        if parsed_url.path == '/playlist':
+            return parse_qs(parsed_url.query).get('list', [None])[0]
+        if parsed_url.path.startswith('/channel/UC'):
+            return 'UU' + parsed_url.path.split('/')[2][2:]
+        return None
+
+    async def expand_playlist(self, playlist_id: str, limit: int = 20) -> List[str]:
         """
-        Получает транскрипцию и делает саммари видео
+        ID видео плейлиста
+
+        Args:
+            playlist_id: ID плейлиста
+            limit: Максимум видео
+
+        Returns:
+            ID видео по порядку плейлиста
         """
+        video_ids: List[str] = []
+        async with httpx.AsyncClient(timeout=15.0) as client:
+            if self.data_api_key:
+                page_token = None
+                while len(video_ids) < limit:
+                    params = {
+                        'part': 'contentDetails',
+                        'playlistId': playlist_id,
+                        'maxResults': 50,
+                        'key': self.data_api_key,
+                    }
+                    if page_token:
+                        params['pageToken'] = page_token
+                    response = await client.get('https://www.googleapis.com/youtube/v3/playlistItems', params=params)
+                    response.raise_for_status()
+                    data = response.json()
+                    video_ids += [item['contentDetails']['videoId'] for item in data.get('items', [])]
+                    page_token = data.get('nextPageToken')
+                    if not page_token:
+                        break
+            else:
+                # Без ключа - первая страница плейлиста (до ~100 видео)
+                response = await client.get(
+                    'https://www.youtube.com/playlist',
+                    params={'list': playlist_id},
+                    headers={'Accept-Language': 'en'}
+                )
+                response.raise_for_status()
+                video_ids = re.findall(r'"videoId":"([\w-]{11})"', response.text)
+
+        return list(dict.fromkeys(video_ids))[:limit]
+
+    async def resolve_videos(self, urls: List[str], limit: int = 20) -> List[str]:
+        """Ссылки на видео, плейлисты и каналы -> уникальные ID видео"""
+        video_ids: List[str] = []
+        for url in urls:
+            playlist_id = self._get_playlist_id(url)
+            if playlist_id:
+                video_ids += await self.expand_playlist(playlist_id, limit)
+            else:
+                video_id = self._get_video_id(url)
+                if video_id:
+                    video_ids.append(video_id)
+        return list(dict.fromkeys(video_ids))[:limit]
+
+    # --- Кеш ---
+
+    def _cache_path(self, video_id: str) -> str:
+        safe_id = re.sub(r'[^\w-]', '_', video_id)
+        return os.path.join(self.cache_dir, f"{safe_id}.json")
+
+    def _load_cache(self, video_id: str) -> Dict:
+        if not self.cache_dir:
+            return {}
         try:
-            video_id = self._get_video_id(url)
-            if not video_id:
-                return {"success": False, "error": "Некорректная ссылка на YouTube"}
+            with open(self._cache_path(video_id), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
 
-            # Получаем субтитры (пробуем разные языки)
-            try:
-                transcript_list = YouTubeTranscriptApi.get_transcript(video_id, languages=['ru', 'en', 'hy'])
-            except Exception:
-                # Если нет субтитров, пробуем авто-субтитры
-                try:
-                    transcript_list = YouTubeTranscriptApi.list_transcripts(video_id).find_generated_transcript(['ru', 'en']).fetch()
-                except Exception as e:
-                    return {"success": False, "error": f"Не удалось получить субтитры: {str(e)}"}
+    def _save_cache(self, video_id: str, data: Dict):
+        if not self.cache_dir:
+            return
+        path = self._cache_path(video_id)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    # --- Субтитры ---
+
+    @staticmethod
+    def _fetch_transcript(video_id: str) -> List[Dict]:
+        """Синхронная загрузка субтитров (выполняется в потоке)"""
+        try:
+            return YouTubeTranscriptApi.get_transcript(video_id, languages=['ru', 'en', 'hy'])
+        except Exception:
+            # Если нет субтитров, пробуем авто-субтитры
+            return YouTubeTranscriptApi.list_transcripts(video_id).find_generated_transcript(['ru', 'en']).fetch()
+
+    def split_transcript(self, segments: List[Dict]) -> List[Dict]:
+        """
+        Разбивает субтитры на фрагменты по границам реплик
+
+        Args:
+            segments: Реплики [{'text', 'start', 'duration'}]
+
+        Returns:
+            Фрагменты [{'start', 'end', 'text'}]
+        """
+        chunks = []
+        current: List[str] = []
+        size = 0
+        start = end = 0.0
 
-            # Собираем текст
-            full_text = " ".join([t['text'] for t in transcript_list])
-            
-            # Обрезаем, если слишком длинный (GPT лимит)
-            if len(full_text) > 15000:
-                full_text = full_text[:15000] + "..."
+        for seg in segments:
+            text = seg['text'].replace('\n', ' ').strip()
+            if not text:
+                continue
+            if current and size + len(text) > self.chunk_chars:
+                chunks.append({'start': start, 'end': end, 'text': ' '.join(current)})
+                current, size = [], 0
+            if not current:
+                start = seg['start']
+            current.append(text)
+            size += len(text) + 1
+            end = seg['start'] + seg.get('duration', 0)
 
-            # Анализ через GPT
-            prompt = f"""Проанализируй этот текст из YouTube видео и сделай подробное саммари.
+        if current:
+            chunks.append({'start': start, 'end': end, 'text': ' '.join(current)})
+        return chunks
 
-Текст видео:
-{full_text}
+    # --- Map-reduce ---
+
+    async def _summarize_chunk(self, chunk: Dict, index: int, total: int, language: str) -> str:
+        """Саммари одного фрагмента (map)"""
+        async with self._semaphore:
+            response = await create_completion(
+                self.openai,
+                model=self.map_model,
+                messages=[
+                    {"role": "system", "content": "Ты конспектируешь видео. Пиши сжато, только факты и мысли из текста."},
+                    {"role": "user", "content": (
+                        f"Фрагмент {index + 1}/{total} видео "
+                        f"[{_timestamp(chunk['start'])}-{_timestamp(chunk['end'])}].\n\n"
+                        f"{chunk['text']}\n\n"
+                        f"Перечисли ключевые мысли, факты, цифры и советы этого фрагмента (5-10 пунктов). "
+                        f"Язык: {language}"
+                    )}
+                ],
+                temperature=0.3
+            )
+            return response.choices[0].message.content
+
+    async def _reduce(self, chunks: List[Dict], notes: List[str], language: str) -> str:
+        """Итоговый отчет по конспектам фрагментов (reduce)"""
+        if len(chunks) == 1:
+            material = f"Текст видео:\n{chunks[0]['text']}"
+        else:
+            material = "Конспект видео по фрагментам:\n\n" + "\n\n".join(
+                f"[{_timestamp(c['start'])}-{_timestamp(c['end'])}]\n{note}"
+                for c, note in zip(chunks, notes)
+            )
+
+        prompt = f"""Проанализируй это YouTube видео и сделай подробное саммари.
+
+{material}
 
 Задача:
 1. 📝 **Краткое содержание** (в 3-5 предложениях).
 2. 🔑 **Ключевые идеи/инсайты** (списком).
 3. 💡 **Практические советы** (если есть).
-4. 🎯 **Для кого это видео?** (целевая аудитория).
-5. 📱 **Пост для соцсетей** (напиши короткий пост об этом видео).
+4. ⏱ **Таймкоды** (главные моменты видео).
+5. 🎯 **Для кого это видео?** (целевая аудитория).
+6. 📱 **Пост для соцсетей** (напиши короткий пост об этом видео).
 
 Язык ответа: {language}
 """
-            response = self.openai.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": "Ты профессиональный контент-аналитик. Ты умеешь выделять суть из видео."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7
-            )
-            
-            summary = response.choices[0].message.content
-            
+        response = await create_completion(
+            self.openai,
+            model=self.reduce_model,
+            messages=[
+                {"role": "system", "content": "Ты профессиональный контент-аналитик. Ты умеешь выделять суть из видео."},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.7
+        )
+        return response.choices[0].message.content
+
+    async def get_video_summary(self, url: str, language: str = 'ru') -> Dict:
+        """
+        Получает транскрипцию и делает саммари видео
+
+        Длинные субтитры режутся на фрагменты по таймкодам, фрагменты
+        конспектируются параллельно, затем сводятся в один отчет.
+
+        Args:
+            url: Ссылка на видео
+            language: Язык отчета
+
+        Returns:
+            {'success': True, 'video_id', 'title', 'summary', 'full_text_preview',
+             'chunks', 'duration', 'cached'} или ошибка
+        """
+        video_id = self._get_video_id(url)
+        if not video_id:
+            return {"success": False, "error": "Некорректная ссылка на YouTube"}
+
+        # Один и тот же ролик, запрошенный одновременно, анализируется один раз
+        return await self._flight.do((video_id, language), lambda: self._analyze(video_id, language))
+
+    async def _analyze(self, video_id: str, language: str) -> Dict:
+        try:
+            cache = await asyncio.to_thread(self._load_cache, video_id)
+
+            if language in cache.get('summaries', {}):
+                print(f"💾 Саммари видео {video_id} из кеша")
+                summary = cache['summaries'][language]
+                return {
+                    "success": True,
+                    "video_id": video_id,
+                    "title": f"Анализ видео {video_id}",
+                    "summary": summary,
+                    "full_text_preview": cache.get('preview', ''),
+                    "chunks": cache.get('chunk_count', 1),
+                    "duration": cache.get('duration', 0),
+                    "cached": True
+                }
+
+            # Получаем субтитры (пробуем разные языки)
+            segments = cache.get('transcript')
+            if segments is None:
+                try:
+                    segments = await asyncio.to_thread(self._fetch_transcript, video_id)
+                except Exception as e:
+                    return {"success": False, "error": f"Не удалось получить субтитры: {str(e)}"}
+                cache['transcript'] = segments
+
+            chunks = self.split_transcript(segments)
+            if not chunks:
+                return {"success": False, "error": "Субтитры пустые"}
+
+            # Map: конспекты фрагментов параллельно (готовые берем из кеша)
+            notes_cache = cache.setdefault('notes', {})
+            keys = [
+                hashlib.sha256(f"{self.map_model}\0{language}\0{c['text']}".encode('utf-8')).hexdigest()
+                for c in chunks
+            ]
+            if len(chunks) > 1:
+                missing = [i for i, key in enumerate(keys) if key not in notes_cache]
+                print(f"🎬 Видео {video_id}: {len(chunks)} фрагментов, конспектирую {len(missing)}")
+                results = await asyncio.gather(*[
+                    self._summarize_chunk(chunks[i], i, len(chunks), language) for i in missing
+                ], return_exceptions=True)
+                errors = [r for r in results if isinstance(r, Exception)]
+                for i, note in zip(missing, results):
+                    if not isinstance(note, Exception):
+                        notes_cache[keys[i]] = note
+                if errors:
+                    # Готовые конспекты сохраняем - повторный запрос доделает только упавшие
+                    await asyncio.to_thread(self._save_cache, video_id, cache)
+                    raise errors[0]
+            notes = [notes_cache.get(key, '') for key in keys]
+
+            # Reduce: итоговый отчет
+            summary = await self._reduce(chunks, notes, language)
+
+            preview = chunks[0]['text'][:200]
+            cache.setdefault('summaries', {})[language] = summary
+            cache['preview'] = preview
+            cache['chunk_count'] = len(chunks)
+            cache['duration'] = chunks[-1]['end']
+            await asyncio.to_thread(self._save_cache, video_id, cache)
+
             return {
                 "success": True,
+                "video_id": video_id,
                 "title": f"Анализ видео {video_id}",
                 "summary": summary,
-                "full_text_preview": full_text[:200]
+                "full_text_preview": preview,
+                "chunks": len(chunks),
+                "duration": chunks[-1]['end'],
+                "cached": False
             }
 
         except Exception as e:
             return {"success": False, "error": str(e)}
+
+    async def analyze_batch(
+        self,
+        urls: List[str],
+        language: str = 'ru',
+        limit: int = 20,
+        progress=None
+    ) -> Dict:
+        """
+        Пакетный анализ: несколько видео, плейлист или канал и сравнительный отчет
+
+        Видео анализируются параллельно (не больше batch_concurrency одновременно,
+        запросы к модели ограничены общим лимитом), готовые саммари берутся из кеша.
+
+        Args:
+            urls: Ссылки на видео / плейлисты / каналы
+            language: Язык отчета
+            limit: Максимум видео
+            progress: Колбэк progress(готово, всего, результат_видео), может быть корутиной
+
+        Returns:
+            {'success': True, 'videos': [...], 'report': ...} или ошибка
+        """
+        try:
+            video_ids = await self.resolve_videos(urls, limit)
+        except Exception as e:
+            return {"success": False, "error": f"Не удалось получить список видео: {e}"}
+        if not video_ids:
+            return {"success": False, "error": "Не найдено ни одного видео"}
+
+        semaphore = asyncio.Semaphore(self.batch_concurrency)
+        videos: List[Optional[Dict]] = [None] * len(video_ids)
+        done = 0
+
+        async def run(index: int, video_id: str):
+            nonlocal done
+            async with semaphore:
+                result = await self._flight.do((video_id, language), lambda: self._analyze(video_id, language))
+            result = {**result, 'video_id': video_id, 'url': f"https://youtu.be/{video_id}"}
+            videos[index] = result
+            done += 1
+            if progress is not None:
+                maybe = progress(done, len(video_ids), result)
+                if inspect.isawaitable(maybe):
+                    await maybe
+
+        await asyncio.gather(*[run(i, video_id) for i, video_id in enumerate(video_ids)])
+
+        ok = [v for v in videos if v['success']]
+        if not ok:
+            return {"success": False, "error": "Ни одно видео не удалось проанализировать", "videos": videos}
+
+        report = await self._compare(ok, language) if len(ok) > 1 else ok[0]['summary']
+        return {"success": True, "videos": videos, "report": report}
+
+    async def _compare(self, videos: List[Dict], language: str) -> str:
+        """Сравнительный отчет по саммари нескольких видео"""
+        material = "\n\n".join(
+            f"=== Видео {i + 1} ({v['url']}, {_timestamp(v.get('duration', 0))}) ===\n{v['summary'][:2000]}"
+            for i, v in enumerate(videos)
+        )
+        response = await create_completion(
+            self.openai,
+            model=self.reduce_model,
+            messages=[
+                {"role": "system", "content": "Ты профессиональный контент-аналитик и маркетолог."},
+                {"role": "user", "content": f"""Сравни эти YouTube видео по их саммари.
+
+{material}
+
+Задача:
+1. 📊 **Общая картина** - о чем этот набор видео, общие темы.
+2. 🏆 **Сильнейшие видео** - какие и почему.
+3. 🔁 **Повторяющиеся идеи** и **уникальные** инсайты отдельных видео.
+4. 🕳 **Пробелы** - какие темы не раскрыты (идеи для нашего контента).
+5. 📱 **Контент-идеи** - 5 постов/роликов на основе этого набора.
+
+Ссылайся на видео по номеру. Язык ответа: {language}"""}
+            ],
+            temperature=0.7
+        )
+        return response.choices[0].message.content
@@ -28,19 +28,82 @@ class Config:
     CACHE_ENABLED = os.getenv('CACHE_ENABLED', 'true').lower() == 'true'
     CACHE_TTL = int(os.getenv('CACHE_TTL', '3600'))
     
+    # Сколько апдейтов обрабатывать параллельно (голосовые, долгие запросы к AI)
+    CONCURRENT_UPDATES = int(os.getenv('CONCURRENT_UPDATES', '16'))
+    
+    # Голосовые: предобработка через ffmpeg перед Whisper
+    VOICE_PREPROCESS = os.getenv('VOICE_PREPROCESS', 'true').lower() == 'true'
+    VOICE_CHUNK_SECONDS = int(os.getenv('VOICE_CHUNK_SECONDS', '120'))
+    
+    # Автопостинг: одновременных публикаций на платформу
+    SCHEDULER_CONCURRENCY = os.getenv('SCHEDULER_CONCURRENCY', 'Instagram=1,Facebook=5')
+    
     # Context
     MAX_CONTEXT_MESSAGES = int(os.getenv('MAX_CONTEXT_MESSAGES', '20'))  # Увеличено с 5 до 20
 
+    # Долгосрочная память (векторное хранилище на диске, на Railway - путь к Volume)
+    MEMORY_DIR = os.getenv('MEMORY_DIR', 'data/memory')
+    
+    # Эмбеддинги (микро-батчинг + кеш векторов на диске)
+    # EMBEDDING_BACKEND: openai (API) | local (CPU, без сети)
+    EMBEDDING_BACKEND = os.getenv('EMBEDDING_BACKEND', 'openai').lower()
+    EMBEDDING_DIM = int(os.getenv('EMBEDDING_DIM', '512'))  # Для локального бэкенда
+    EMBEDDING_MODEL = os.getenv('EMBEDDING_MODEL', 'text-embedding-3-small')
+    EMBEDDING_CACHE_PATH = os.getenv('EMBEDDING_CACHE_PATH', 'data/embeddings.sqlite3')
+    EMBEDDING_BATCH_WINDOW_MS = int(os.getenv('EMBEDDING_BATCH_WINDOW_MS', '10'))
+    EMBEDDING_MAX_BATCH = int(os.getenv('EMBEDDING_MAX_BATCH', '64'))
     
     # Optional APIs (с fallback)
     ELEVENLABS_API_KEY = os.getenv('ELEVENLABS_API_KEY')
     INSTAGRAM_USERNAME = os.getenv('INSTAGRAM_USERNAME')
     INSTAGRAM_PASSWORD = os.getenv('INSTAGRAM_PASSWORD')
-    YOUTUBE_API_KEY = os.getenv('YOUTUBE_API_KEY')
-    TIKTOK_SESSION_ID = os.getenv('TIKTOK_SESSION_ID')
+    INSTAGRAM_WORKERS = int(os.getenv('INSTAGRAM_WORKERS', '2'))  # Потоков для instagrapi
+    # Файл сессии instagrapi; пусто - сессия хранится в БД (переживает редеплой)
+    INSTAGRAM_SETTINGS_PATH = os.getenv('INSTAGRAM_SETTINGS_PATH', '')
+    # Кеш медиа из Telegram и подготовка фото для Instagram
+    MEDIA_CACHE_DIR = os.getenv('MEDIA_CACHE_DIR', 'data/media')
+    MEDIA_CACHE_MAX_MB = int(os.getenv('MEDIA_CACHE_MAX_MB', '500'))
+    MEDIA_PROCESS_WORKERS = int(os.getenv('MEDIA_PROCESS_WORKERS', '2'))
+    INSTAGRAM_IMAGE_WIDTH = int(os.getenv('INSTAGRAM_IMAGE_WIDTH', '1080'))
+    # Фоновая синхронизация постов и метрик Instagram в БД
+    INSTAGRAM_SYNC_INTERVAL_MIN = int(os.getenv('INSTAGRAM_SYNC_INTERVAL_MIN', '60'))
+    INSTAGRAM_SYNC_REFRESH_DAYS = int(os.getenv('INSTAGRAM_SYNC_REFRESH_DAYS', '7'))  # Обновлять метрики свежих постов
+    INSTAGRAM_SYNC_BACKFILL = int(os.getenv('INSTAGRAM_SYNC_BACKFILL', '300'))  # Постов при первой синхронизации
+    # Загрузка видео (OAuth токены со scope youtube.upload / video.publish)
+    YOUTUBE_ACCESS_TOKEN = os.getenv('YOUTUBE_ACCESS_TOKEN')
+    YOUTUBE_UPLOAD_URL = os.getenv('YOUTUBE_UPLOAD_URL', 'https://www.googleapis.com')
+    TIKTOK_ACCESS_TOKEN = os.getenv('TIKTOK_ACCESS_TOKEN')
+    TIKTOK_API_URL = os.getenv('TIKTOK_API_URL', 'https://open.tiktokapis.com')
+    UPLOAD_CHUNK_MB = int(os.getenv('UPLOAD_CHUNK_MB', '8'))  # Размер куска при загрузке видео
     FACEBOOK_ACCESS_TOKEN = os.getenv('FACEBOOK_ACCESS_TOKEN')
+    FACEBOOK_GRAPH_URL = os.getenv('FACEBOOK_GRAPH_URL', 'https://graph.facebook.com')
+    FACEBOOK_API_VERSION = os.getenv('FACEBOOK_API_VERSION', 'v18.0')
+    # Анализ кода из файлов: фрагменты по границам функций/классов параллельно
+    CODE_CHUNK_CHARS = int(os.getenv('CODE_CHUNK_CHARS', '8000'))
+    CODE_CONCURRENCY = int(os.getenv('CODE_CONCURRENCY', '4'))
+    CODE_MAX_FILE_KB = int(os.getenv('CODE_MAX_FILE_KB', '512'))
     GITHUB_TOKEN = os.getenv('GITHUB_TOKEN')
+    # Глубокий анализ репозитория (/github_info <repo> deep): кеш по git blob SHA
+    REPO_ANALYSIS_CACHE_PATH = os.getenv('REPO_ANALYSIS_CACHE_PATH', 'data/repo_analysis.json')
+    REPO_ANALYSIS_MAX_FILES = int(os.getenv('REPO_ANALYSIS_MAX_FILES', '150'))
+    REPO_ANALYSIS_CONCURRENCY = int(os.getenv('REPO_ANALYSIS_CONCURRENCY', '4'))
+    GITHUB_API_URL = os.getenv('GITHUB_API_URL', 'https://api.github.com')  # GitHub Enterprise - свой адрес
+    ARCHITECT_CONCURRENCY = int(os.getenv('ARCHITECT_CONCURRENCY', '4'))  # Файлов сайта генерируется одновременно
     TAVILY_API_KEY = os.getenv('TAVILY_API_KEY')  # Web Search
+    # YouTube анализ: длинные субтитры конспектируются по фрагментам параллельно
+    YOUTUBE_CACHE_DIR = os.getenv('YOUTUBE_CACHE_DIR', 'data/youtube')  # Субтитры и саммари по id видео
+    YOUTUBE_CHUNK_CHARS = int(os.getenv('YOUTUBE_CHUNK_CHARS', '6000'))
+    YOUTUBE_CONCURRENCY = int(os.getenv('YOUTUBE_CONCURRENCY', '4'))
+    YOUTUBE_BATCH_CONCURRENCY = int(os.getenv('YOUTUBE_BATCH_CONCURRENCY', '3'))  # Видео одновременно в пакете
+    YOUTUBE_DATA_API_KEY = os.getenv('YOUTUBE_DATA_API_KEY')  # Плейлисты целиком (без ключа - первая страница)
+    # Аудит сайта: обход страниц одного домена
+    AUDIT_MAX_PAGES = int(os.getenv('AUDIT_MAX_PAGES', '20'))
+    AUDIT_MAX_DEPTH = int(os.getenv('AUDIT_MAX_DEPTH', '2'))
+    AUDIT_CONCURRENCY = int(os.getenv('AUDIT_CONCURRENCY', '5'))  # Одновременных загрузок
+    AUDIT_CACHE_PATH = os.getenv('AUDIT_CACHE_PATH', 'data/audit_cache.json')  # ETag/Last-Modified и анализ страниц
+    SEARCH_DEPTH = os.getenv('SEARCH_DEPTH', 'basic')  # basic (1 кредит) | advanced (2 кредита)
+    SEARCH_CACHE_TTL = int(os.getenv('SEARCH_CACHE_TTL', '1800'))  # Секунды
+    SEARCH_CACHE_SIZE = int(os.getenv('SEARCH_CACHE_SIZE', '256'))
     
     @classmethod
     def validate(cls):
@@ -56,13 +56,49 @@ class ScheduledPost(Base):
     __tablename__ = 'scheduled_posts'
 
     id = Column(Integer, primary_key=True)
-    platform = Column(String(50), nullable=False)  # 'Instagram' | 'Facebook'
+    platform = Column(String(50), nullable=False)  # 'Instagram' | 'Facebook' | 'Multi'
+    platforms = Column(JSON)  # Кросс-постинг: ['Instagram', 'Facebook']
     caption = Column(Text, nullable=False)
     telegram_file_id = Column(String(255))  # Для Instagram фото
+    telegram_file_unique_id = Column(String(100))  # Ключ файла в кеше медиа
     scheduled_at = Column(DateTime(timezone=True), nullable=False)
-    status = Column(String(20), default='pending')  # pending | posted | failed | canceled
+    status = Column(String(20), default='pending')  # pending | in_progress | posted | partial | failed | canceled
+    results = Column(JSON)  # Результат по каждой платформе: {'Instagram': {...}, ...}
     attempt_count = Column(Integer, default=0)
     last_error = Column(Text)
+    lease_owner = Column(String(100))  # Воркер, который забрал задачу
+    lease_expires_at = Column(DateTime(timezone=True), index=True)  # После - задача возвращается в очередь
     created_by = Column(Integer)  # Telegram ID автора задачи
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+
+class InstagramMedia(Base):
+    """Медиа нашего Instagram аккаунта (синхронизируются в фоне)"""
+    __tablename__ = 'instagram_media'
+    
+    id = Column(Integer, primary_key=True)
+    owner_pk = Column(String(64), nullable=False, index=True)  # pk аккаунта Instagram
+    media_pk = Column(String(64), unique=True, nullable=False, index=True)
+    code = Column(String(64))
+    media_type = Column(Integer)  # 1=Photo, 2=Video, 8=Album
+    product_type = Column(String(30))  # feed | clips | igtv
+    caption = Column(Text)
+    taken_at = Column(DateTime(timezone=True), index=True)
+    like_count = Column(Integer, default=0)  # Последние известные значения
+    comment_count = Column(Integer, default=0)
+    view_count = Column(Integer, default=0)
+    synced_at = Column(DateTime(timezone=True))
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class InstagramMetricSnapshot(Base):
+    """Срез метрик поста на момент синхронизации (временной ряд)"""
+    __tablename__ = 'instagram_metric_snapshots'
+    
+    id = Column(Integer, primary_key=True)
+    media_pk = Column(String(64), nullable=False, index=True)
+    like_count = Column(Integer, default=0)
+    comment_count = Column(Integer, default=0)
+    view_count = Column(Integer, default=0)
+    captured_at = Column(DateTime(timezone=True), nullable=False, index=True)
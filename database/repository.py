@@ -4,11 +4,13 @@ Database repository для работы с БД
 import hashlib
 from datetime import datetime, timedelta
 from typing import Optional, List, Dict
-from sqlalchemy import create_engine, select, and_
+from sqlalchemy import create_engine, select, and_, inspect, text, func
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.pool import NullPool
 
-from .models import Base, User, Message, Cache, ScheduledPost
+from .models import (
+    Base, User, Message, Cache, ScheduledPost, InstagramMedia, InstagramMetricSnapshot
+)
 
 
 class DatabaseRepository:
@@ -31,8 +33,31 @@ class DatabaseRepository:
         
         # Создание таблиц
         Base.metadata.create_all(self.engine)
+        self._add_missing_columns()
         print("✅ База данных инициализирована")
     
+    def _add_missing_columns(self):
+        """
+        Добавляет в существующие таблицы колонки, появившиеся в моделях
+        (create_all создает только новые таблицы)
+        """
+        inspector = inspect(self.engine)
+        existing_tables = set(inspector.get_table_names())
+        
+        with self.engine.begin() as conn:
+            for table in Base.metadata.sorted_tables:
+                if table.name not in existing_tables:
+                    continue
+                existing = {c['name'] for c in inspector.get_columns(table.name)}
+                for column in table.columns:
+                    if column.name in existing:
+                        continue
+                    column_type = column.type.compile(dialect=self.engine.dialect)
+                    conn.execute(text(
+                        f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'
+                    ))
+                    print(f"✅ БД: добавлена колонка {table.name}.{column.name}")
+    
     def get_session(self) -> Session:
         """Получить сессию БД"""
         return self.SessionLocal()
@@ -291,13 +316,17 @@ class DatabaseRepository:
         scheduled_at,
         created_by: Optional[int] = None,
         telegram_file_id: Optional[str] = None,
+        platforms: Optional[List[str]] = None,
+        telegram_file_unique_id: Optional[str] = None,
     ) -> ScheduledPost:
-        """Создать задачу на отложенную публикацию"""
+        """Создать задачу на отложенную публикацию (platforms - для кросс-постинга)"""
         with self.get_session() as session:
             task = ScheduledPost(
                 platform=platform,
+                platforms=platforms,
                 caption=caption,
                 telegram_file_id=telegram_file_id,
+                telegram_file_unique_id=telegram_file_unique_id,
                 scheduled_at=scheduled_at,
                 status='pending',
                 created_by=created_by,
@@ -317,17 +346,120 @@ class DatabaseRepository:
                 )
             ).order_by(ScheduledPost.scheduled_at.asc()).limit(limit).all()
 
-    def mark_scheduled_post_result(self, task_id: int, status: str, error: Optional[str] = None, increment_attempt: bool = True):
-        """Обновить статус задачи"""
+    def get_pending_schedule(self) -> List[tuple]:
+        """Время публикации всех ожидающих задач: [(id, scheduled_at), ...]"""
         with self.get_session() as session:
-            task = session.query(ScheduledPost).filter(ScheduledPost.id == task_id).first()
+            return [
+                (task_id, scheduled_at)
+                for task_id, scheduled_at in session.query(
+                    ScheduledPost.id, ScheduledPost.scheduled_at
+                ).filter(ScheduledPost.status == 'pending').all()
+            ]
+
+    def claim_due_scheduled_posts(
+        self,
+        owner: str,
+        now_dt,
+        limit: int = 5,
+        lease_seconds: int = 600
+    ) -> List[ScheduledPost]:
+        """
+        Атомарно забрать задачи к исполнению (pending -> in_progress)
+        
+        SELECT ... FOR UPDATE SKIP LOCKED: параллельные воркеры получают
+        разные задачи и не ждут друг друга.
+        
+        Args:
+            owner: Идентификатор воркера
+            now_dt: Текущее время
+            limit: Максимум задач
+            lease_seconds: Срок аренды; после него задача вернется в очередь
+            
+        Returns:
+            Забранные задачи
+        """
+        self.recover_expired_leases(now_dt)
+        
+        with self.get_session() as session:
+            tasks = session.query(ScheduledPost).filter(
+                and_(
+                    ScheduledPost.status == 'pending',
+                    ScheduledPost.scheduled_at <= now_dt
+                )
+            ).order_by(
+                ScheduledPost.scheduled_at.asc()
+            ).limit(limit).with_for_update(skip_locked=True).all()
+            
+            lease_expires_at = now_dt + timedelta(seconds=lease_seconds)
+            for task in tasks:
+                task.status = 'in_progress'
+                task.lease_owner = owner
+                task.lease_expires_at = lease_expires_at
+            session.commit()
+            
+            for task in tasks:
+                session.refresh(task)
+            return tasks
+
+    def recover_expired_leases(self, now_dt) -> int:
+        """
+        Вернуть в очередь задачи, воркер которых не уложился в аренду
+        
+        Returns:
+            Количество возвращенных задач
+        """
+        with self.get_session() as session:
+            recovered = session.query(ScheduledPost).filter(
+                and_(
+                    ScheduledPost.status == 'in_progress',
+                    ScheduledPost.lease_expires_at < now_dt
+                )
+            ).update({
+                ScheduledPost.status: 'pending',
+                ScheduledPost.lease_owner: None,
+                ScheduledPost.lease_expires_at: None,
+            }, synchronize_session=False)
+            session.commit()
+            if recovered:
+                print(f"♻️ Возвращено в очередь задач с истекшей арендой: {recovered}")
+            return recovered
+
+    def mark_scheduled_post_result(
+        self,
+        task_id: int,
+        status: str,
+        error: Optional[str] = None,
+        increment_attempt: bool = True,
+        owner: Optional[str] = None,
+        results: Optional[Dict] = None
+    ) -> bool:
+        """
+        Обновить статус задачи
+        
+        Args:
+            owner: Если указан - обновляем только пока аренда принадлежит этому воркеру
+            results: Результаты по платформам (кросс-постинг)
+            
+        Returns:
+            False если задача не найдена или аренда потеряна
+        """
+        with self.get_session() as session:
+            task = session.query(ScheduledPost).filter(ScheduledPost.id == task_id).with_for_update().first()
             if not task:
-                return
+                return False
+            if owner is not None and task.lease_owner != owner:
+                print(f"⚠️ Задача #{task_id}: аренда принадлежит другому воркеру, результат не записан")
+                return False
             if increment_attempt:
                 task.attempt_count += 1
             task.status = status
             task.last_error = error
+            if results is not None:
+                task.results = results
+            task.lease_owner = None
+            task.lease_expires_at = None
             session.commit()
+            return True
 
     def cancel_scheduled_post(self, task_id: int) -> bool:
         with self.get_session() as session:
@@ -344,10 +476,14 @@ class DatabaseRepository:
             pending = session.query(ScheduledPost).filter(ScheduledPost.status == 'pending').count()
             posted = session.query(ScheduledPost).filter(ScheduledPost.status == 'posted').count()
             failed = session.query(ScheduledPost).filter(ScheduledPost.status == 'failed').count()
+            in_progress = session.query(ScheduledPost).filter(ScheduledPost.status == 'in_progress').count()
+            partial = session.query(ScheduledPost).filter(ScheduledPost.status == 'partial').count()
             return {
                 'total': total,
                 'pending': pending,
+                'in_progress': in_progress,
                 'posted': posted,
+                'partial': partial,
                 'failed': failed,
             }
 
@@ -369,3 +505,109 @@ class DatabaseRepository:
             return session.query(ScheduledPost).filter(
                 ScheduledPost.status == 'pending'
             ).order_by(ScheduledPost.scheduled_at.asc()).limit(limit).all()
+
+    # === INSTAGRAM METRICS ===
+
+    def get_instagram_latest_taken_at(self, owner_pk: str):
+        """Время самой свежей сохраненной публикации (курсор синхронизации)"""
+        with self.get_session() as session:
+            return session.query(func.max(InstagramMedia.taken_at)).filter(
+                InstagramMedia.owner_pk == owner_pk
+            ).scalar()
+
+    def save_instagram_media(self, owner_pk: str, medias: List[Dict], captured_at) -> Dict:
+        """
+        Сохранить медиа и срезы метрик
+        
+        Срез пишется только для новых постов и при изменении метрик,
+        чтобы временной ряд не раздувался одинаковыми точками.
+        
+        Args:
+            owner_pk: pk аккаунта
+            medias: Словари с полями media_pk, code, media_type, product_type,
+                caption, taken_at, like_count, comment_count, view_count
+            captured_at: Время среза
+            
+        Returns:
+            {'new': новых постов, 'snapshots': записанных срезов}
+        """
+        if not medias:
+            return {'new': 0, 'snapshots': 0}
+        
+        metric_fields = ('like_count', 'comment_count', 'view_count')
+        
+        with self.get_session() as session:
+            existing = {
+                media.media_pk: media
+                for media in session.query(InstagramMedia).filter(
+                    InstagramMedia.media_pk.in_([m['media_pk'] for m in medias])
+                ).all()
+            }
+            
+            new_count = 0
+            snapshots = []
+            for data in medias:
+                media = existing.get(data['media_pk'])
+                if media is None:
+                    media = InstagramMedia(owner_pk=owner_pk, media_pk=data['media_pk'])
+                    session.add(media)
+                    existing[data['media_pk']] = media
+                    new_count += 1
+                    changed = True
+                else:
+                    changed = any(getattr(media, f) != data.get(f, 0) for f in metric_fields)
+                
+                for field in ('code', 'media_type', 'product_type', 'caption', 'taken_at') + metric_fields:
+                    setattr(media, field, data.get(field))
+                media.synced_at = captured_at
+                
+                if changed:
+                    snapshots.append(InstagramMetricSnapshot(
+                        media_pk=data['media_pk'],
+                        captured_at=captured_at,
+                        **{f: data.get(f, 0) for f in metric_fields}
+                    ))
+            
+            session.add_all(snapshots)
+            session.commit()
+            return {'new': new_count, 'snapshots': len(snapshots)}
+
+    def get_instagram_media(self, owner_pk: str, limit: int = 100) -> List[Dict]:
+        """Сохраненные посты аккаунта, от новых к старым"""
+        with self.get_session() as session:
+            medias = session.query(InstagramMedia).filter(
+                InstagramMedia.owner_pk == owner_pk
+            ).order_by(InstagramMedia.taken_at.desc()).limit(limit).all()
+            return [
+                {
+                    'media_pk': m.media_pk,
+                    'code': m.code,
+                    'media_type': m.media_type,
+                    'product_type': m.product_type,
+                    'caption': m.caption or '',
+                    'taken_at': m.taken_at,
+                    'like_count': m.like_count or 0,
+                    'comment_count': m.comment_count or 0,
+                    'view_count': m.view_count or 0,
+                    'synced_at': m.synced_at,
+                }
+                for m in medias
+            ]
+
+    def get_instagram_store_stats(self, owner_pk: str) -> Dict:
+        """Объем локального хранилища метрик"""
+        with self.get_session() as session:
+            media_count = session.query(InstagramMedia).filter(
+                InstagramMedia.owner_pk == owner_pk
+            ).count()
+            snapshot_count = session.query(InstagramMetricSnapshot).join(
+                InstagramMedia, InstagramMedia.media_pk == InstagramMetricSnapshot.media_pk
+            ).filter(InstagramMedia.owner_pk == owner_pk).count()
+            last_sync = session.query(func.max(InstagramMedia.synced_at)).filter(
+                InstagramMedia.owner_pk == owner_pk
+            ).scalar()
+            return {
+                'media': media_count,
+                'snapshots': snapshot_count,
+                'last_sync': last_sync,
+            }
@@ -17,6 +17,7 @@ from telegram.error import Conflict
 from config import Config
 from database import DatabaseRepository
 from bot.ai_handler import AIHandler
+from bot.services.audio_processing import AudioPreprocessor
 from bot.services.content_generator import ContentGenerator
 from bot.services.analytics import AnalyticsService
 from bot.services.code_generator import CodeGenerator
@@ -25,14 +26,20 @@ from bot.services.github_manager import GitHubManager
 # New Services
 from bot.services.web_search import WebSearchService
 from bot.services.memory import MemoryService
+from bot.services.embeddings import EmbeddingService, create_embedding_backend
 from bot.services.image_generation import ImageGenerationService
 from bot.services.social_media_real import SocialMediaManager as RealSocialMediaManager
 from bot.services.smm_marketing import SMMMarketingService
 from bot.services.mind_sync import MindSyncService
 from bot.services.project_architect import ProjectArchitectService
+from bot.services.repo_analyzer import RepoAnalyzerService, BlobCache
 from bot.services.site_auditor import SiteAuditorService
+from bot.services.site_crawler import SiteCrawler, HttpCache
 from bot.services.youtube_analyst import YouTubeAnalystService
 from bot.services.report_generator import ReportGeneratorService
+from bot.services.post_scheduler import PostScheduler, parse_platform_limits
+from bot.services.instagram_sync import InstagramSyncService
+from bot.services.media_cache import MediaCache
 
 # Handlers
 from bot.handlers.commands import (
@@ -65,7 +72,8 @@ from bot.handlers.code_commands import (
     explain_code_command,
     refactor_code_command,
     generate_tests_command,
-    github_status_command
+    github_status_command,
+    code_document_handler
 )
 from bot.handlers.github_commands import (
     github_repos_command,
@@ -94,13 +102,16 @@ from bot.handlers.smm_commands import (
     hashtags_command,
     competitor_command
 )
-from bot.handlers.web_commands import create_site_command, audit_site_command
+from bot.handlers.web_commands import create_site_command, edit_site_command, audit_site_command
 from bot.handlers.business_commands import youtube_analyze_command, excel_report_command
 from bot.handlers.social_scheduler import (
     schedule_instagram_command,
+    schedule_post_command,
     autopost_status_command,
     cancel_post_command,
-    scheduled_posts_worker,
+    publish_scheduled_post,
+    publish_scheduled_facebook_batch,
+    autonomy_enabled,
     list_posts_command,
     post_now_command,
 )
@@ -133,13 +144,60 @@ async def post_init(application):
     # Удаляем webhook если есть
     await application.bot.delete_webhook(drop_pending_updates=True)
     print("✅ Webhook очищен")
-    # Запускаем фоновый воркер автопостинга
+    
+    # Вход в Instagram в фоне: polling стартует сразу, не дожидаясь сети
+    social = application.bot_data.get('social_media_real')
+    if social:
+        connect_task = asyncio.create_task(social.connect_instagram())
+        application.bot_data['instagram_connect_task'] = connect_task
+        
+        # Инкрементальная синхронизация постов и метрик после подключения
+        instagram_sync = application.bot_data.get('instagram_sync')
+        if instagram_sync:
+            await instagram_sync.start(wait_for=connect_task)
+    
+    # Запускаем планировщик автопостинга (просыпается точно к сроку публикации)
     try:
-        # Интервал 120 секунд (2 минуты) для надежности, чтобы избежать пропусков
-        application.job_queue.run_repeating(scheduled_posts_worker, interval=120, first=10)
-        print("✅ Автопостинг воркер запущен (каждые 2 минуты)")
+        db = application.bot_data['db']
+        scheduler = PostScheduler(
+            db,
+            publish=lambda task: publish_scheduled_post(application, task),
+            platform_limits=parse_platform_limits(Config.SCHEDULER_CONCURRENCY),
+            is_enabled=lambda: autonomy_enabled(db),
+            # Facebook: все созревшие посты - одним batch-запросом Graph API
+            batch_publishers={
+                'Facebook': lambda tasks: publish_scheduled_facebook_batch(application, tasks)
+            }
+        )
+        application.bot_data['post_scheduler'] = scheduler
+        await scheduler.start()
     except Exception as e:
-        print(f"⚠️ Не удалось запустить воркер автопостинга: {e}")
+        print(f"⚠️ Не удалось запустить планировщик автопостинга: {e}")
+
+
+async def post_shutdown(application):
+    """Остановка фоновых задач"""
+    scheduler = application.bot_data.get('post_scheduler')
+    if scheduler:
+        await scheduler.stop()
+    
+    instagram_sync = application.bot_data.get('instagram_sync')
+    if instagram_sync:
+        await instagram_sync.stop()
+    
+    social = application.bot_data.get('social_media_real')
+    if social:
+        social.instagram_executor.shutdown()
+        if social.facebook:
+            await social.facebook.close()
+    
+    media_cache = application.bot_data.get('media_cache')
+    if media_cache:
+        media_cache.shutdown()
+    
+    github_manager = application.bot_data.get('github_manager')
+    if github_manager:
+        await github_manager.close()
 
 
 def main():
@@ -168,7 +226,11 @@ def main():
             api_key=Config.OPENAI_API_KEY,
             model_mini=Config.OPENAI_MODEL_MINI,
             model_full=Config.OPENAI_MODEL_FULL,
-            gpt4o_probability=Config.GPT4O_PROBABILITY
+            gpt4o_probability=Config.GPT4O_PROBABILITY,
+            audio_preprocessor=(
+                AudioPreprocessor(max_chunk_seconds=Config.VOICE_CHUNK_SECONDS)
+                if Config.VOICE_PREPROCESS else None
+            )
         )
         print("✅ AI обработчик инициализирован")
     except Exception as e:
@@ -178,29 +240,101 @@ def main():
     # Инициализация сервисов (Этапы 2-4)
     content_generator = ContentGenerator(Config.OPENAI_API_KEY)
     analytics = AnalyticsService(db)
-    ai_code_generator = CodeGenerator(Config.OPENAI_API_KEY)
-    github_manager = GitHubManager(Config.GITHUB_TOKEN)
+    ai_code_generator = CodeGenerator(
+        Config.OPENAI_API_KEY,
+        chunk_chars=Config.CODE_CHUNK_CHARS,
+        concurrency=Config.CODE_CONCURRENCY
+    )
+    github_manager = GitHubManager(Config.GITHUB_TOKEN, base_url=Config.GITHUB_API_URL)
+    repo_analyzer = RepoAnalyzerService(
+        ai_code_generator,
+        github_manager,
+        cache=BlobCache(Config.REPO_ANALYSIS_CACHE_PATH),
+        concurrency=Config.REPO_ANALYSIS_CONCURRENCY,
+        max_files=Config.REPO_ANALYSIS_MAX_FILES
+    )
     
     # Инициализация НОВЫХ сервисов (Этап 5+)
-    web_search = WebSearchService(Config.TAVILY_API_KEY)
-    memory = MemoryService(Config.OPENAI_API_KEY)
+    web_search = WebSearchService(
+        Config.TAVILY_API_KEY,
+        search_depth=Config.SEARCH_DEPTH,
+        cache_ttl=Config.SEARCH_CACHE_TTL,
+        cache_size=Config.SEARCH_CACHE_SIZE
+    )
+    embedding_backend = create_embedding_backend(
+        Config.EMBEDDING_BACKEND,
+        openai_client=ai.client,
+        model=Config.EMBEDDING_MODEL,
+        dim=Config.EMBEDDING_DIM
+    )
+    embeddings = EmbeddingService(
+        embedding_backend,
+        cache_path=Config.EMBEDDING_CACHE_PATH,
+        batch_window=Config.EMBEDDING_BATCH_WINDOW_MS / 1000,
+        max_batch_size=Config.EMBEDDING_MAX_BATCH
+    )
+    memory = MemoryService(Config.OPENAI_API_KEY, storage_dir=Config.MEMORY_DIR, embeddings=embeddings)
     image_gen = ImageGenerationService(Config.OPENAI_API_KEY)
     
     social_media_real = RealSocialMediaManager(
         instagram_username=Config.INSTAGRAM_USERNAME,
         instagram_password=Config.INSTAGRAM_PASSWORD,
-        facebook_token=Config.FACEBOOK_ACCESS_TOKEN
+        facebook_token=Config.FACEBOOK_ACCESS_TOKEN,
+        instagram_workers=Config.INSTAGRAM_WORKERS,
+        db=None if Config.INSTAGRAM_SETTINGS_PATH else db,
+        instagram_settings_path=Config.INSTAGRAM_SETTINGS_PATH or None,
+        facebook_graph_url=Config.FACEBOOK_GRAPH_URL,
+        facebook_api_version=Config.FACEBOOK_API_VERSION
+    )
+    
+    instagram_sync = InstagramSyncService(
+        db,
+        social_media_real,
+        interval=Config.INSTAGRAM_SYNC_INTERVAL_MIN * 60,
+        refresh_days=Config.INSTAGRAM_SYNC_REFRESH_DAYS,
+        backfill_limit=Config.INSTAGRAM_SYNC_BACKFILL
+    )
+    
+    media_cache = MediaCache(
+        Config.MEDIA_CACHE_DIR,
+        max_bytes=Config.MEDIA_CACHE_MAX_MB * 1024 * 1024,
+        process_workers=Config.MEDIA_PROCESS_WORKERS,
+        instagram_width=Config.INSTAGRAM_IMAGE_WIDTH
     )
     
     smm_marketing = SMMMarketingService(ai.client)
     mind_sync = MindSyncService(ai.client, memory)
-    project_architect = ProjectArchitectService(ai.client, github_manager)
-    site_auditor = SiteAuditorService(ai.client)
-    youtube_analyst = YouTubeAnalystService(ai.client)
+    # Асинхронный клиент: параллельность генерации не ограничена пулом потоков
+    project_architect = ProjectArchitectService(
+        ai.async_client,
+        github_manager,
+        concurrency=Config.ARCHITECT_CONCURRENCY
+    )
+    site_crawler = SiteCrawler(
+        cache=HttpCache(Config.AUDIT_CACHE_PATH),
+        max_pages=Config.AUDIT_MAX_PAGES,
+        max_depth=Config.AUDIT_MAX_DEPTH,
+        concurrency=Config.AUDIT_CONCURRENCY
+    )
+    site_auditor = SiteAuditorService(ai.client, crawler=site_crawler)
+    youtube_analyst = YouTubeAnalystService(
+        ai.client,
+        cache_dir=Config.YOUTUBE_CACHE_DIR,
+        chunk_chars=Config.YOUTUBE_CHUNK_CHARS,
+        concurrency=Config.YOUTUBE_CONCURRENCY,
+        batch_concurrency=Config.YOUTUBE_BATCH_CONCURRENCY,
+        data_api_key=Config.YOUTUBE_DATA_API_KEY
+    )
     report_generator = ReportGeneratorService()
     
     # Создание приложения
-    application = ApplicationBuilder().token(Config.TELEGRAM_BOT_TOKEN).build()
+    # concurrent_updates: сообщения разных пользователей не ждут друг друга
+    application = (
+        ApplicationBuilder()
+        .token(Config.TELEGRAM_BOT_TOKEN)
+        .concurrent_updates(Config.CONCURRENT_UPDATES)
+        .build()
+    )
     
     # Сохраняем зависимости в bot_data
     application.bot_data['db'] = db
@@ -210,12 +344,16 @@ def main():
     application.bot_data['analytics'] = analytics
     application.bot_data['code_generator'] = ai_code_generator
     application.bot_data['github_manager'] = github_manager
+    application.bot_data['repo_analyzer'] = repo_analyzer
     
     # Новые сервисы
     application.bot_data['web_search'] = web_search
     application.bot_data['memory'] = memory
+    application.bot_data['embeddings'] = embeddings
     application.bot_data['image_generation'] = image_gen
     application.bot_data['social_media_real'] = social_media_real
+    application.bot_data['instagram_sync'] = instagram_sync
+    application.bot_data['media_cache'] = media_cache
     application.bot_data['smm_marketing'] = smm_marketing
     application.bot_data['mind_sync'] = mind_sync
     application.bot_data['project_architect'] = project_architect
@@ -276,6 +414,7 @@ def main():
     application.add_handler(CommandHandler("social_status", social_status_real_command))
     # Автопостинг
     application.add_handler(CommandHandler("schedule_instagram", schedule_instagram_command))
+    application.add_handler(CommandHandler("schedule_post", schedule_post_command))
     application.add_handler(CommandHandler("autopost_status", autopost_status_command))
     application.add_handler(CommandHandler("cancel_post", cancel_post_command))
     application.add_handler(CommandHandler("list_posts", list_posts_command))
@@ -295,6 +434,7 @@ def main():
     
     # Web Architect
     application.add_handler(CommandHandler("create_site", create_site_command))
+    application.add_handler(CommandHandler("edit_site", edit_site_command))
     application.add_handler(CommandHandler("audit_site", audit_site_command))
     
     # Business & Analytics
@@ -308,12 +448,19 @@ def main():
     application.add_handler(
         MessageHandler(filters.VOICE, handle_voice_message)
     )
+    application.add_handler(
+        MessageHandler(
+            filters.Document.ALL & filters.CaptionRegex(r'^/(analyze|explain|refactor)_code\b'),
+            code_document_handler
+        )
+    )
     
     # Обработчик ошибок
     application.add_error_handler(error_handler)
     
     # Post-init callback
     application.post_init = post_init
+    application.post_shutdown = post_shutdown
     
     # Запуск бота
     print("⏳ Запуск polling...")